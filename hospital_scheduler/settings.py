@@ -53,9 +53,12 @@ INSTALLED_APPS = [
 
     # Eksterni paketi
     "import_export", 
+    "rest_framework",
+    "django_filters",
 ]
 
 MIDDLEWARE = [
+    'nurse.metrics.QueryMetricsMiddleware',  # Radi samo uz NURSE_METRICS_ENABLED
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +68,51 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Mjerenje upita po zahtjevu (Server-Timing header, /metrics); isključeno ako nije zadano
+NURSE_METRICS_ENABLED = os.environ.get('NURSE_METRICS') == '1'
+# Vršna memorija po zahtjevu (tracemalloc usporava sve alokacije); streaming odgovori se ne prate
+NURSE_METRICS_TRACE_MEMORY = os.environ.get('NURSE_METRICS_TRACE_MEMORY') == '1'
+# Budžeti upita za viewove bez @query_budget dekoratora (ključ je naziv URL-a)
+NURSE_QUERY_BUDGETS = {
+    'admin:nurse_shift_changelist': 25,
+    'admin:nurse_employee_changelist': 25,
+}
+
+# REST API (/nurse/api/v1/): JWT za tablete, sesija za preglednik
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+}
+
+# Izvještaji generiranja rasporeda (JSON po pokretanju) i profiliranje sporih generiranja
+NURSE_SCHEDULE_REPORT_DIR = os.environ.get('NURSE_SCHEDULE_REPORT_DIR')
+NURSE_SCHEDULE_PROFILER = os.environ.get('NURSE_SCHEDULE_PROFILER')  # "cprofile" ili "pyinstrument"
+NURSE_SCHEDULE_PROFILE_THRESHOLD = 5.0  # sekundi
+NURSE_SCHEDULE_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Pozadinski poslovi generiranja: heartbeat posla koji radi i kada se smatra da je worker pao
+NURSE_SCHEDULE_JOB_HEARTBEAT = 30  # sekundi
+NURSE_SCHEDULE_JOB_STALE_AFTER = 300  # sekundi bez heartbeata → FAILED
+
+# Live promjene rasporeda (SSE, samo pod ASGI): "memory" za jedan worker, "poll" za više
+NURSE_LIVE_BACKEND = os.environ.get('NURSE_LIVE_BACKEND', 'memory')
+NURSE_LIVE_POLL_INTERVAL = 2.0  # sekundi, za "poll"
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'nurse': {'handlers': ['console'], 'level': os.environ.get('NURSE_LOG_LEVEL', 'INFO')},
+    },
+}
+
 ROOT_URLCONF = 'hospital_scheduler.urls'
 
 TEMPLATES = [
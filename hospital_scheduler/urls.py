@@ -16,8 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from nurse.metrics import metrics_view
 
 urlpatterns = [
     path('', include('core.urls')),  # Dodaj core URL-ove
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus (samo uz NURSE_METRICS_ENABLED)
 ]
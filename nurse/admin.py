@@ -1,20 +1,85 @@
+from django import forms
 from django.contrib import admin
-from django.http import HttpResponse
-import csv
-import pandas as pd
+from django.http import HttpResponse, HttpResponseRedirect
 from django.apps import apps
-from .models import Department, Role, ShiftType, Employee, ShiftRequirement, Shift, TimeOff, Day
-from nurse.utils import generate_nurse_schedule
+from django.db.models import Sum
+from .models import Department, Role, ShiftType, Employee, ShiftRequirement, RequirementTemplate, Shift, TimeOff, Day, ScheduleJob
+from nurse.utils import date_runs
+from nurse.jobs import submit_schedule_job
+from nurse.intervals import shift_conflict
+from nurse.repair import repair_availability, repair_time_off
+from nurse.exports import shift_rows, stream_csv, xlsx_response
 from django.utils.timezone import now
-from datetime import timedelta
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from datetime import date, timedelta
+from nurse.pdf import render_rosters, week_start
+from nurse.imports import IMPORTERS, import_file
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+import io
+import zipfile
+
+# === 📌 BULK IMPORT (CSV/XLSX) ===
+class BulkImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV (UTF-8) ili XLSX")
+    dry_run = forms.BooleanField(required=False, initial=True, label="Dry run (samo prikaži razliku, ništa ne spremaj)")
+
+class BulkImportMixin:
+    """Dodaje changelistu gumb i stranicu za skupni uvoz (vidi nurse/imports.py)."""
+    import_kind = None
+    change_list_template = "admin/nurse/change_list_bulk_import.html"
+
+    def get_urls(self):
+        name = f"{self.opts.app_label}_{self.opts.model_name}_bulk_import"
+        return [path('import/', self.admin_site.admin_view(self.bulk_import_view), name=name)] + super().get_urls()
+
+    def bulk_import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = BulkImportForm(request.POST or None, request.FILES or None)
+        report = None
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data['file']
+            report = import_file(self.import_kind, upload, upload.name, dry_run=form.cleaned_data['dry_run'])
+            self.message_user(request, report.summary(), messages.SUCCESS if report.ok else messages.ERROR)
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.opts,
+            "title": f"Bulk import: {self.opts.verbose_name_plural}",
+            "form": form,
+            "report": report,
+            "columns": IMPORTERS[self.import_kind].columns,
+        }
+        return TemplateResponse(request, "admin/nurse/bulk_import.html", context)
 
 # === 📌 DEPARTMENT ADMIN ===
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ('name',)
     search_fields = ('name',)
+    actions = ['print_weekly_roster']
+
+    @admin.action(description="🖨️ Print roster for this week (PDF)")
+    def print_weekly_roster(self, request, queryset):
+        monday = week_start(now().date())
+        paths = render_rosters(monday, list(queryset.values_list('pk', flat=True)))
+        names = dict(queryset.values_list('pk', 'name'))
+        if len(paths) == 1:
+            (department_id, path), = paths.items()
+            response = HttpResponse(path.read_bytes(), content_type="application/pdf")
+            response["Content-Disposition"] = f'attachment; filename="roster_{names[department_id]}_{monday}.pdf"'
+            return response
+
+        # Više odjela -> jedan ZIP s PDF-om po odjelu
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for department_id, path in paths.items():
+                archive.write(path, f"roster_{names[department_id]}_{monday}.pdf")
+        response = HttpResponse(buffer.getvalue(), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="rosters_{monday}.zip"'
+        return response
 
 # === 📌 ROLE ADMIN ===
 @admin.register(Role)
@@ -31,7 +96,8 @@ class ShiftTypeAdmin(admin.ModelAdmin):
 
 # === 📌 EMPLOYEE ADMIN ===
 @admin.register(Employee)
-class EmployeeAdmin(admin.ModelAdmin):
+class EmployeeAdmin(BulkImportMixin, admin.ModelAdmin):
+    import_kind = "employees"
     list_display = ('get_full_name', 'get_departments', 'get_roles', 'max_weekly_hours', 'max_daily_hours', 'priority', 'get_total_hours_last_week')
     search_fields = ('first_name', 'last_name', 'departments__name', 'roles__name')
     list_filter = ('departments', 'roles', 'available_days', 'can_work_shifts')
@@ -42,6 +108,9 @@ class EmployeeAdmin(admin.ModelAdmin):
         return f"{obj.first_name} {obj.last_name}"
     get_full_name.short_description = "Full Name"
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_hours_last_week().prefetch_related('departments', 'roles')
+
     def get_departments(self, obj):
         return ", ".join([d.name for d in obj.departments.all()])
     get_departments.short_description = "Departments"
@@ -51,21 +120,31 @@ class EmployeeAdmin(admin.ModelAdmin):
     get_roles.short_description = "Roles"
 
     def get_total_hours_last_week(self, obj):
-        Shift = apps.get_model('nurse', 'Shift')
-        last_week_shifts = Shift.objects.filter(employee=obj, date__gte=now().date() - timedelta(days=7))
-        total_hours = sum(shift.calculate_total_hours() for shift in last_week_shifts)
-        return max(total_hours, 0.0)
+        return obj.get_total_hours_last_week()
     get_total_hours_last_week.short_description = "Total Hours Last 7 Days"
+    get_total_hours_last_week.admin_order_field = 'minutes_last_week'
+
+    def save_related(self, request, form, formsets, change):
+        obj = form.instance
+        days_before = set(obj.available_days.values_list('pk', flat=True)) if change else None
+        super().save_related(request, form, formsets, change)
+
+        # Promjena dostupnih dana popravlja samo pogođene buduće smjene
+        if change and days_before != set(obj.available_days.values_list('pk', flat=True)):
+            changes = repair_availability(obj)
+            if changes:
+                self.message_user(request, f"🔁 Raspored popravljen: {len(changes)} promijenjenih smjena.")
 
     def changelist_view(self, request, extra_context=None):
         Employee = apps.get_model('nurse', 'Employee')
-        all_employees = Employee.objects.all()
-
-        # ✅ Ukupni max weekly hours svih zaposlenika
-        total_max_weekly_hours = sum(emp.max_weekly_hours for emp in all_employees)
 
-        # ✅ Ukupni Total Hours Last 7 Days svih zaposlenika
-        total_hours_last_week = sum(emp.get_total_hours_last_week() for emp in all_employees)
+        # ✅ Ukupni max weekly hours i Total Hours Last 7 Days svih zaposlenika - jedan agregat
+        # (aliasi se ne smiju zvati kao anotacija, inače Django izbaci podupit iz SELECT-a)
+        totals = Employee.objects.with_hours_last_week().aggregate(
+            total_max_weekly_hours=Sum('max_weekly_hours'), total_minutes_last_week=Sum('minutes_last_week')
+        )
+        total_max_weekly_hours = totals['total_max_weekly_hours'] or 0
+        total_hours_last_week = round((totals['total_minutes_last_week'] or 0) / 60, 2)
 
         # ✅ Dodaj statistiku u Django admin panel za Employees
         extra_context = extra_context or {}
@@ -78,14 +157,41 @@ class EmployeeAdmin(admin.ModelAdmin):
 
 from django.contrib import admin
 from django.http import HttpResponse
-import csv
-import pandas as pd
 from django.apps import apps
+from django.contrib.admin.views.main import ChangeList
 from .models import Shift
+from nurse import coverage
+
+class ShiftAdminForm(forms.ModelForm):
+    class Meta:
+        model = Shift
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('date'):
+            conflict = shift_conflict(
+                cleaned_data.get('employee'), cleaned_data['date'],
+                cleaned_data.get('start_time'), cleaned_data.get('end_time'),
+                exclude_pk=self.instance.pk,
+            )
+            if conflict:
+                raise forms.ValidationError(conflict)
+        return cleaned_data
+
+class ShiftChangeList(ChangeList):
+    """Changelist koji smjenama na stranici dodaje `day_total_hours` (jedan upit nad zbirnom tablicom)."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        totals = coverage.hours_by_day({shift.date for shift in self.result_list})
+        for shift in self.result_list:
+            shift.day_total_hours = totals.get(shift.date, 0)
 
 # === 📌 SHIFT ADMIN ===
 @admin.register(Shift)
 class ShiftAdmin(admin.ModelAdmin):
+    form = ShiftAdminForm
     list_display = (
         'get_employee_full_name', 
         'department', 
@@ -100,6 +206,7 @@ class ShiftAdmin(admin.ModelAdmin):
     search_fields = ('employee__first_name', 'employee__last_name', 'department__name', 'role__name', 'date')
     list_filter = ('department', 'role', 'date', 'start_time', 'end_time')
     ordering = ('date', 'start_time')
+    list_select_related = ('employee', 'department', 'role')
     actions = ['export_schedule_to_csv', 'export_schedule_to_excel']
 
     def get_employee_full_name(self, obj):
@@ -111,17 +218,14 @@ class ShiftAdmin(admin.ModelAdmin):
     get_role_name.short_description = "Role"
 
     def corrected_total_hours(self, obj):
-        if obj.start_time > obj.end_time:
-            total_seconds = ((24 - obj.start_time.hour) + obj.end_time.hour) * 3600 + (obj.end_time.minute - obj.start_time.minute) * 60
-        else:
-            total_seconds = (obj.end_time.hour * 3600 + obj.end_time.minute * 60) - (obj.start_time.hour * 3600 + obj.start_time.minute * 60)
-        return round(total_seconds / 3600, 2)
+        return obj.calculate_total_hours()
     corrected_total_hours.short_description = "Total Hours"
 
     def display_shift_configuration(self, obj):
-        Shift = apps.get_model('nurse', 'Shift')
-        shifts_for_day = Shift.objects.filter(date=obj.date)
-        total_hours = sum(shift.calculate_total_hours() for shift in shifts_for_day)
+        # Zbroj po datumu računa ShiftChangeList jednim grupiranim upitom za cijelu stranicu
+        total_hours = getattr(obj, 'day_total_hours', None)
+        if total_hours is None:
+            total_hours = Shift.objects.filter(date=obj.date).total_hours()
         return f"Total: {total_hours}h"
     display_shift_configuration.short_description = "Daily Shift Configuration"
 
@@ -129,18 +233,18 @@ class ShiftAdmin(admin.ModelAdmin):
         return "⚠️ Worker Needed" if obj.employee is None else "✅ Filled"
     display_missing_worker.short_description = "Shift Status"
 
+    def get_changelist(self, request, **kwargs):
+        return ShiftChangeList
+
     def changelist_view(self, request, extra_context=None):
-        Shift = apps.get_model('nurse', 'Shift')
         Employee = apps.get_model('nurse', 'Employee')
 
-        # ✅ Izračunaj ukupne sate u rasporedu
-        total_shift_hours = sum(shift.calculate_total_hours() for shift in Shift.objects.all())
-
-        # ✅ Izračunaj ukupan max weekly hours svih zaposlenika
-        total_employee_max_hours = sum(emp.max_weekly_hours for emp in Employee.objects.all())
-
-        # ✅ Izračunaj ukupan Total Hours Last 7 Days svih zaposlenika
-        total_hours_last_week = sum(emp.get_total_hours_last_week() for emp in Employee.objects.all())
+        # ✅ Ukupni sati rasporeda i sati zadnjih 7 dana iz zbirne tablice (red po odjelu i danu), jednim upitom;
+        # potrebni sati (i predlošci) ovdje nisu potrebni
+        totals = coverage.shift_totals(date.min, date.max, since=now().date() - timedelta(days=7))
+        total_shift_hours = totals["total_hours"]
+        total_employee_max_hours = Employee.objects.aggregate(total=Sum('max_weekly_hours'))['total'] or 0
+        total_hours_last_week = totals["assigned_hours_since"]
 
         # ✅ Dodaj ove vrijednosti u Django admin (da budu vidljive)
         extra_context = extra_context or {}
@@ -152,45 +256,17 @@ class ShiftAdmin(admin.ModelAdmin):
 
     @admin.action(description="📄 Export schedule to CSV")
     def export_schedule_to_csv(self, request, queryset):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="shifts.csv"'
-        writer = csv.writer(response)
-        writer.writerow(["Employee", "Department", "Role", "Date", "Start Time", "End Time", "Total Hours"])
-        for shift in queryset:
-            writer.writerow([
-                self.get_employee_full_name(shift),  # Poziv metode unutar Admin klase
-                shift.department, 
-                self.get_role_name(shift), 
-                shift.date, 
-                shift.start_time, 
-                shift.end_time, 
-                self.corrected_total_hours(shift)
-            ])
-        return response
+        return stream_csv(shift_rows(queryset), "shifts.csv")
 
     @admin.action(description="📊 Export schedule to Excel")
     def export_schedule_to_excel(self, request, queryset):
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="shifts.xlsx"'
-        df = pd.DataFrame([
-            [
-                self.get_employee_full_name(shift),  # Poziv metode unutar Admin klase
-                shift.department, 
-                self.get_role_name(shift), 
-                shift.date, 
-                shift.start_time, 
-                shift.end_time, 
-                self.corrected_total_hours(shift)
-            ]
-            for shift in queryset
-        ], columns=["Employee", "Department", "Role", "Date", "Start Time", "End Time", "Total Hours"])
-        df.to_excel(response, index=False)
-        return response
+        return xlsx_response(queryset, "shifts.xlsx")
 
 
 # === 📌 SHIFT REQUIREMENT ADMIN ===
 @admin.register(ShiftRequirement)
-class ShiftRequirementAdmin(admin.ModelAdmin):
+class ShiftRequirementAdmin(BulkImportMixin, admin.ModelAdmin):
+    import_kind = "requirements"
     list_display = ('department', 'date', 'required_hours', 'get_shift_types', 'get_roles')
     search_fields = ('department__name', 'date', 'required_roles__name')
     list_filter = ('department', 'date')
@@ -208,6 +284,62 @@ class ShiftRequirementAdmin(admin.ModelAdmin):
 
     @admin.action(description="✅ Generate schedule for selected shifts")
     def generate_schedule(self, request, queryset):
-        for requirement in queryset:
-            generate_nurse_schedule(requirement.date)
-        self.message_user(request, "✅ Schedule generated successfully.")
+        # Svaki dan se generira samo jednom, bez obzira koliko je zahtjeva odabrano za taj dan;
+        # generiranje ide u pozadinske poslove (jedan po neprekinutom rasponu), ne u request
+        dates = queryset.values_list('date', flat=True).distinct()
+        jobs = [
+            submit_schedule_job(start_date, end_date, user=request.user)
+            for start_date, end_date in date_runs(dates)
+        ]
+        self.message_user(
+            request, f"⏳ Generiranje rasporeda pokrenuto: {len(jobs)} poslova (#{', #'.join(str(job.pk) for job in jobs)})."
+        )
+        return HttpResponseRedirect(reverse('admin:nurse_schedulejob_changelist'))
+
+
+# === 📌 REQUIREMENT TEMPLATE ADMIN ===
+@admin.register(RequirementTemplate)
+class RequirementTemplateAdmin(admin.ModelAdmin):
+    list_display = ('department', 'weekday', 'every_weeks', 'valid_from', 'valid_until', 'required_hours', 'get_shift_types', 'get_roles')
+    list_filter = ('department', 'weekday')
+    search_fields = ('department__name',)
+    ordering = ('department', 'valid_from')
+    list_select_related = ('department',)
+    filter_horizontal = ('shift_types', 'required_roles')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('shift_types', 'required_roles')
+
+    def get_shift_types(self, obj):
+        return ", ".join([s.name for s in obj.shift_types.all()])
+    get_shift_types.short_description = "Shift Types"
+
+    def get_roles(self, obj):
+        return ", ".join([r.name for r in obj.required_roles.all()])
+    get_roles.short_description = "Required Roles"
+
+
+# === 📌 TIME OFF ADMIN ===
+@admin.register(TimeOff)
+class TimeOffAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'reason', 'start_date', 'end_date')
+    search_fields = ('employee__first_name', 'employee__last_name')
+    list_filter = ('reason', 'start_date')
+    list_select_related = ('employee',)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+
+        # Preraspoređuju se samo smjene radnika u periodu odsustva
+        changes = repair_time_off(obj)
+        if changes:
+            self.message_user(request, f"🔁 Raspored popravljen: {len(changes)} promijenjenih smjena.")
+
+
+# === 📌 SCHEDULE JOB ADMIN ===
+@admin.register(ScheduleJob)
+class ScheduleJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'start_date', 'end_date', 'strategy', 'parallel', 'percent_complete', 'unfilled_slots', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'strategy')
+    readonly_fields = ('started_at', 'heartbeat_at', 'finished_at', 'summary', 'error')
+    ordering = ('-created_at',)
@@ -0,0 +1,198 @@
+"""
+REST API v1 (`/nurse/api/v1/`) za tablete na odjelima.
+
+- Prijava preko JWT (`token/`, `token/refresh/`) ili sesije.
+- Liste smjena i zahtjeva: cursor paginacija (`limit`, `cursor`), filteri i
+  ETag / If-None-Match (304 kad se stranica nije promijenila).
+- `shifts/bulk/`: upsert i brisanje smjena u jednoj transakciji.
+- `requirements/bulk/`: skupno stvaranje zahtjeva s ulogama i tipovima smjena.
+
+Skupni upisi provjeravaju postojanje svih referenci jednim upitom po modelu, a
+preklapanja smjena istog radnika odbija baza (vidi migraciju 0011) - tada se
+ništa ne sprema i vraća se 409.
+"""
+import hashlib
+import json
+
+import django_filters
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+
+from . import coverage
+from .models import Department, Employee, Role, Shift, ShiftRequirement, ShiftType
+from .serializers import (
+    ShiftBulkSerializer, ShiftRequirementSerializer, ShiftRequirementWriteSerializer, ShiftSerializer,
+)
+
+SHIFT_WRITE_FIELDS = ['employee', 'department', 'role', 'date', 'start_time', 'end_time']
+
+
+class ScheduleCursorPagination(CursorPagination):
+    ordering = ('date', 'id')
+    page_size = 200
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+
+class ETagListMixin:
+    """ETag liste je hash sadržaja stranice; isti `If-None-Match` dobiva 304 bez tijela."""
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        payload = json.dumps(response.data, cls=DjangoJSONEncoder, sort_keys=True)
+        etag = quote_etag(hashlib.sha256(payload.encode()).hexdigest()[:32])
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response['ETag'] = etag
+        return response
+
+
+def missing_references(items, references):
+    """{polje: [nepostojeći ID-evi]} za sve reference u zahtjevu (jedan upit po modelu)."""
+    missing = {}
+    for name, model in references.items():
+        ids = set()
+        for item in items:
+            value = item.get(name)
+            ids.update(value if isinstance(value, list) else [value])
+        ids.discard(None)
+        unknown = ids - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if unknown:
+            missing[name] = sorted(unknown)
+    return missing
+
+
+# === 📌 SMJENE ===
+class ShiftFilter(django_filters.FilterSet):
+    # NumberFilter umjesto ModelChoiceFilter: bez upita za provjeru izbora
+    date = django_filters.DateFromToRangeFilter()
+    department = django_filters.NumberFilter()
+    employee = django_filters.NumberFilter()
+    role = django_filters.NumberFilter()
+    unfilled = django_filters.BooleanFilter(field_name='employee', lookup_expr='isnull')
+
+    class Meta:
+        model = Shift
+        fields = ['date', 'department', 'employee', 'role', 'unfilled']
+
+
+class ShiftViewSet(ETagListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Shift.objects.all()
+    serializer_class = ShiftSerializer
+    pagination_class = ScheduleCursorPagination
+    filterset_class = ShiftFilter
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        {"upsert": [{"id"?, "employee", "department", "role", "date", "start_time", "end_time"}, ...],
+         "delete": [id, ...]} - sve ili ništa. Stavke s `id` zamjenjuju cijelu smjenu
+        (izostavljena polja postaju prazna), ostale se stvaraju.
+        """
+        serializer = ShiftBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upsert, delete = serializer.validated_data['upsert'], serializer.validated_data['delete']
+
+        missing = missing_references(upsert, {'employee': Employee, 'department': Department, 'role': Role})
+        existing = Shift.objects.in_bulk([item['id'] for item in upsert if 'id' in item])
+        unknown = sorted({item['id'] for item in upsert if 'id' in item} - set(existing))
+        if unknown:
+            missing['id'] = unknown
+        if missing:
+            return Response({"missing": missing}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated, created = [], []
+        for item in upsert:
+            shift = existing[item['id']] if 'id' in item else Shift()
+            for name in SHIFT_WRITE_FIELDS:
+                if name in ('employee', 'department', 'role'):
+                    setattr(shift, f"{name}_id", item.get(name))
+                else:
+                    setattr(shift, name, item.get(name))
+            (updated if shift.pk else created).append(shift)
+
+        try:
+            with transaction.atomic(), coverage.batched():
+                # Brisanje prvo, da nova smjena može zauzeti termin obrisane
+                deleted, _ = Shift.objects.filter(pk__in=delete).delete()
+                if updated:
+                    Shift.objects.bulk_update(updated, SHIFT_WRITE_FIELDS)
+                Shift.objects.bulk_create(created)
+        except IntegrityError as error:
+            return Response({"detail": str(error)}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            "created": [shift.pk for shift in created],
+            "updated": [shift.pk for shift in updated],
+            "deleted": deleted,
+            "shifts": ShiftSerializer(updated + created, many=True).data,
+        })
+
+
+# === 📌 ZAHTJEVI ===
+class ShiftRequirementFilter(django_filters.FilterSet):
+    date = django_filters.DateFromToRangeFilter()
+    department = django_filters.NumberFilter()
+
+    class Meta:
+        model = ShiftRequirement
+        fields = ['date', 'department']
+
+
+class ShiftRequirementViewSet(ETagListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ShiftRequirement.objects.prefetch_related('required_roles', 'shift_types')
+    serializer_class = ShiftRequirementSerializer
+    pagination_class = ScheduleCursorPagination
+    filterset_class = ShiftRequirementFilter
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Lista zahtjeva `{department, date, required_hours, required_roles, shift_types}` - sve ili ništa."""
+        serializer = ShiftRequirementWriteSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+
+        missing = missing_references(items, {
+            'department': Department, 'required_roles': Role, 'shift_types': ShiftType,
+        })
+        if missing:
+            return Response({"missing": missing}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            requirements = ShiftRequirement.objects.bulk_create([
+                ShiftRequirement(
+                    department_id=item['department'], date=item['date'], required_hours=item['required_hours']
+                )
+                for item in items
+            ])
+            ShiftRequirement.required_roles.through.objects.bulk_create([
+                ShiftRequirement.required_roles.through(shiftrequirement_id=requirement.pk, role_id=role_id)
+                for requirement, item in zip(requirements, items) for role_id in set(item['required_roles'])
+            ])
+            ShiftRequirement.shift_types.through.objects.bulk_create([
+                ShiftRequirement.shift_types.through(shiftrequirement_id=requirement.pk, shifttype_id=shift_type_id)
+                for requirement, item in zip(requirements, items) for shift_type_id in set(item['shift_types'])
+            ])
+
+        return Response([
+            {
+                "id": requirement.pk,
+                "department": requirement.department_id,
+                "date": requirement.date,
+                "required_hours": requirement.required_hours,
+                "required_roles": sorted(set(item['required_roles'])),
+                "shift_types": sorted(set(item['shift_types'])),
+            }
+            for requirement, item in zip(requirements, items)
+        ], status=status.HTTP_201_CREATED)
+
+
+router = DefaultRouter()
+router.register('shifts', ShiftViewSet, basename='api-shift')
+router.register('requirements', ShiftRequirementViewSet, basename='api-requirement')
@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class NurseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'nurse'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save, pre_delete
+
+        from . import changes, coverage
+
+        # Dnevnik promjena smjena - prije coverage.refresh_instance, koji pamti novi ključ
+        post_save.connect(changes.shift_saved, sender=self.get_model('Shift'), dispatch_uid='changes_Shift')
+        for model in coverage.CASCADE_FIELDS:
+            post_delete.connect(changes.record_cascade, sender=self.get_model(model), dispatch_uid=f'changes_cascade_{model}')
+
+        # Zbirna statistika pokrivenosti (skupne operacije osvježavaju querysetovi u models.py)
+        for model in ('Shift', 'ShiftRequirement'):
+            post_save.connect(coverage.refresh_instance, sender=self.get_model(model), dispatch_uid=f'coverage_{model}')
+        for model in coverage.CASCADE_FIELDS:
+            pre_delete.connect(coverage.collect_cascade, sender=self.get_model(model), dispatch_uid=f'coverage_collect_{model}')
+            post_delete.connect(coverage.refresh_cascade, sender=self.get_model(model), dispatch_uid=f'coverage_cascade_{model}')
@@ -0,0 +1,166 @@
+"""
+Dnevnik promjena smjena za delta-sinkronizaciju klijenata.
+
+Svaki upis, izmjena i brisanje smjene (save/delete, `ShiftQuerySet` skupne
+operacije, regeneriranje i kaskadna brisanja) dodaje redove u `ShiftChange`.
+Autoincrement `version` je token: `changes_since(token)` vraća samo smjene
+promijenjene nakon njega - trenutno stanje za postojeće i tombstone (ID) za
+obrisane. Izmjena koja premješta smjenu (drugi odjel, dan ili radnik) bilježi i
+stari ključ, pa klijent koji prati stari prozor dobije tombstone.
+
+Verzija se dodjeljuje pri upisu, ne pri commitu. Da klijent ne preskoči promjenu
+transakcije s nižom verzijom koja se commita nakon više, upisi u dnevnik su
+serijalizirani do commita: PostgreSQL advisory lock (`pg_advisory_xact_lock`) u
+`record`, SQLite ionako ima jednog pisača. Lock se drži do kraja vanjske transakcije,
+pa paralelna spremanja smjena čekaju jedno drugo (PostgreSQL rijetke deadlockove
+prekida i javlja grešku).
+
+Stari redovi se brišu s `python manage.py prune_shift_changes`; token stariji od
+najstarijeg sačuvanog reda više ne vrijedi i klijent mora ponovno učitati raspored.
+"""
+from django.apps import apps
+from django.db import connections, router, transaction
+from django.db.models import Max, Min
+
+from . import live
+
+DEFAULT_LIMIT = 1000
+# Ključ advisory locka dnevnika promjena ("nurs")
+CHANGE_LOG_LOCK = 0x6E757273
+
+
+def shift_json(shift):
+    """Smjena kao red rasporeda (schedule_data, schedule_changes i live stream)."""
+    return {
+        "id": shift.id,
+        "employee_id": shift.employee_id,
+        "employee": f"{shift.employee.first_name} {shift.employee.last_name}" if shift.employee else None,
+        "department_id": shift.department_id,
+        "department": shift.department.name,
+        "role_id": shift.role_id,
+        "role": shift.role.name if shift.role else None,
+        "date": shift.date.isoformat(),
+        "start_time": shift.start_time.strftime("%H:%M") if shift.start_time else None,
+        "end_time": shift.end_time.strftime("%H:%M") if shift.end_time else None,
+        "total_hours": round(shift.duration_minutes / 60, 2),
+    }
+
+
+def record(rows, deleted=False):
+    """Dodaje promjene za retke (shift_id, department_id, date, employee_id)."""
+    ShiftChange = apps.get_model('nurse', 'ShiftChange')
+    using = router.db_for_write(ShiftChange)
+    # Bez savepointa: lock i upis samo moraju biti u istoj transakciji - pozivatelji (`models.atomic_write`)
+    # je već otvaraju oko upisa smjene, pa se smjena i njezina promjena commitaju zajedno
+    with transaction.atomic(using=using, savepoint=False):
+        # Verzije se dodjeljuju redom kojim se transakcije commitaju
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHANGE_LOG_LOCK])
+        ShiftChange.objects.using(using).bulk_create([
+            ShiftChange(shift_id=shift_id, department_id=department_id, date=day, employee_id=employee_id, deleted=deleted)
+            for shift_id, department_id, day, employee_id in rows
+        ], batch_size=2000)
+    # Otvoreni live streamovi u ovom procesu (vidi live.py) - tek kad su promjene vidljive
+    transaction.on_commit(live.notify)
+
+
+def shift_row(shift):
+    return (shift.pk, shift.department_id, shift.date, shift.employee_id)
+
+
+def record_saved(shifts):
+    """Bilježi spremljene smjene; uz trenutni i stari ključ ako je smjena premještena."""
+    rows = []
+    for shift in shifts:
+        rows.append(shift_row(shift))
+        original = getattr(shift, '_coverage_key', None)
+        if original is not None and original != rows[-1][1:]:
+            rows.append((shift.pk, *original))
+    record(rows)
+
+
+def shift_saved(sender, instance, **kwargs):
+    # Spojen prije coverage.refresh_instance, koji `_coverage_key` postavlja na novi ključ
+    record_saved([instance])
+
+
+def record_cascade(sender, instance, **kwargs):
+    rows = getattr(instance, '_cascade_shifts', ())
+    if rows:
+        record(rows, deleted=True)
+
+
+def current_version():
+    ShiftChange = apps.get_model('nurse', 'ShiftChange')
+    return ShiftChange.objects.aggregate(version=Max('version'))['version'] or 0
+
+
+def changes_since(since, start_date, end_date, department_id=None, employee_id=None, limit=DEFAULT_LIMIT):
+    """
+    Promjene smjena u prozoru nakon verzije `since`:
+    {"version", "has_more", "shifts": [Shift], "deleted": [id]}; `None` ako token više ne
+    vrijedi (obrisan dio dnevnika ili token iz druge baze).
+    """
+    ShiftChange = apps.get_model('nurse', 'ShiftChange')
+    Shift = apps.get_model('nurse', 'Shift')
+
+    bounds = ShiftChange.objects.aggregate(oldest=Min('version'), latest=Max('version'))
+    latest = bounds['latest'] or 0
+    if since > latest or (bounds['oldest'] is not None and since < bounds['oldest'] - 1):
+        return None
+
+    changes = ShiftChange.objects.filter(version__gt=since, version__lte=latest, date__range=(start_date, end_date))
+    if department_id:
+        changes = changes.filter(department_id=department_id)
+    if employee_id:
+        changes = changes.filter(employee_id=employee_id)
+    rows = list(changes.order_by('version').values_list('version', 'shift_id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Kod djelomičnog odgovora token je zadnja vraćena promjena, inače najnovija verzija
+    version = rows[-1][0] if has_more else latest
+    shift_ids = list(dict.fromkeys(shift_id for _, shift_id in rows))
+
+    shifts = Shift.objects.filter(pk__in=shift_ids, date__range=(start_date, end_date))
+    if department_id:
+        shifts = shifts.filter(department_id=department_id)
+    if employee_id:
+        shifts = shifts.filter(employee_id=employee_id)
+    shifts = list(shifts.select_related('employee', 'department', 'role').order_by('date', 'start_time', 'id'))
+    current = {shift.pk for shift in shifts}
+
+    return {
+        "version": version,
+        "has_more": has_more,
+        "shifts": shifts,
+        # Obrisane ili premještene izvan prozora
+        "deleted": [shift_id for shift_id in shift_ids if shift_id not in current],
+    }
+
+
+def recent(since, limit=DEFAULT_LIMIT):
+    """
+    Sve promjene nakon `since` neovisno o prozoru (za live stream):
+    (zadnja verzija, [(shift_id, department_id, date, employee_id)], {id: Shift}) - dva upita.
+    """
+    ShiftChange = apps.get_model('nurse', 'ShiftChange')
+    Shift = apps.get_model('nurse', 'Shift')
+    rows = list(
+        ShiftChange.objects.filter(version__gt=since).order_by('version')
+        .values_list('version', 'shift_id', 'department_id', 'date', 'employee_id')[:limit]
+    )
+    if not rows:
+        return since, [], {}
+    shifts = Shift.objects.select_related('employee', 'department', 'role').in_bulk({row[1] for row in rows})
+    return rows[-1][0], [row[1:] for row in rows], shifts
+
+
+def prune(before):
+    """Briše promjene starije od `before`; najnovija se uvijek čuva da verzije nastave rasti."""
+    ShiftChange = apps.get_model('nurse', 'ShiftChange')
+    latest = current_version()
+    deleted, _ = ShiftChange.objects.filter(changed_at__lt=before, version__lt=latest).delete()
+    return deleted
@@ -0,0 +1,327 @@
+"""
+Zbirna statistika pokrivenosti rasporeda.
+
+`DepartmentDayCoverage` drži potrebne (samo iz `ShiftRequirement`; predloške dodaje
+`window_totals`, vidi requirements.py), dodijeljene i nepopunjene sate po (odjel, datum),
+a `EmployeeWeekHours` odrađene minute po (radnik, ISO tjedan). Pregledi čitaju te
+tablice (O(dana) redova) umjesto zbrajanja svih smjena.
+
+Tablice se osvježavaju samo za ključeve koje je promjena dotakla: `post_save` za
+`Shift`/`ShiftRequirement`, te `delete`, `bulk_create`, `bulk_update` i `update` na
+njihovim querysetovima (vidi models.py). Brisanje smjena namjerno ne koristi
+`post_delete` signal jer bi Django tada svaku smjenu učitavao i brisao pojedinačno.
+Unutar `batched()` se ključevi skupljaju i osvježavaju jednom na kraju bloka.
+Promjene mimo ORM-a (sirovi SQL) popravlja `python manage.py rebuild_coverage`.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from . import requirements
+
+BATCH_SIZE = 2000
+
+_pending = threading.local()
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+# === 📌 OSVJEŽAVANJE ===
+def shift_keys(rows):
+    """Ključevi (odjel, datum) i (radnik, tjedan) za retke (department_id, date, employee_id)."""
+    days, weeks = set(), set()
+    for department_id, day, employee_id in rows:
+        days.add((department_id, day))
+        if employee_id is not None:
+            weeks.add((employee_id, week_start(day)))
+    return days, weeks
+
+
+@contextmanager
+def batched():
+    """Skuplja ključeve promjena u bloku i osvježava ih jednom (npr. brisanje + upis rasporeda)."""
+    if getattr(_pending, 'keys', None) is not None:
+        yield
+        return
+    _pending.keys = (set(), set())
+    try:
+        yield
+        days, weeks = _pending.keys
+    finally:
+        _pending.keys = None
+    refresh(days, weeks)
+
+
+def refresh(days=(), weeks=()):
+    """Ponovno računa zadane ključeve iz smjena i zahtjeva (u `batched()` bloku odgađa do kraja)."""
+    pending = getattr(_pending, 'keys', None)
+    if pending is not None:
+        pending[0].update(days)
+        pending[1].update(weeks)
+        return
+    if days:
+        refresh_days(days)
+    if weeks:
+        refresh_weeks(weeks)
+
+
+def refresh_shifts(rows):
+    refresh(*shift_keys(rows))
+
+
+def refresh_days(keys):
+    Shift = apps.get_model('nurse', 'Shift')
+    ShiftRequirement = apps.get_model('nurse', 'ShiftRequirement')
+    DepartmentDayCoverage = apps.get_model('nurse', 'DepartmentDayCoverage')
+
+    keys = set(keys)
+    dates = [day for _, day in keys]
+    window = Q(department_id__in={department_id for department_id, _ in keys}, date__range=(min(dates), max(dates)))
+    values = {
+        key: {"required_hours": 0, "assigned_minutes": 0, "unfilled_minutes": 0, "shift_count": 0, "unfilled_count": 0}
+        for key in keys
+    }
+
+    open_shift = Q(employee__isnull=True)
+    for row in (
+        Shift.objects.filter(window).values('department_id', 'date').annotate(
+            assigned_minutes=Sum('duration_minutes', filter=~open_shift),
+            unfilled_minutes=Sum('duration_minutes', filter=open_shift),
+            shift_count=Count('pk'),
+            unfilled_count=Count('pk', filter=open_shift),
+        ).order_by()
+    ):
+        key = (row.pop('department_id'), row.pop('date'))
+        if key in values:
+            values[key].update({name: value or 0 for name, value in row.items()})
+    for row in ShiftRequirement.objects.filter(window).values('department_id', 'date').annotate(
+        required_hours=Sum('required_hours')
+    ).order_by():
+        key = (row['department_id'], row['date'])
+        if key in values:
+            values[key]["required_hours"] = row['required_hours']
+
+    # Prazni ključevi (sve obrisano) se brišu, ostali upisuju ili ažuriraju
+    empty = [key for key, row in values.items() if not row["required_hours"] and not row["shift_count"]]
+    if empty:
+        _delete_keys(DepartmentDayCoverage, 'department_id', 'date', empty)
+    DepartmentDayCoverage.objects.bulk_create(
+        [
+            DepartmentDayCoverage(department_id=department_id, date=day, **row)
+            for (department_id, day), row in values.items() if row["required_hours"] or row["shift_count"]
+        ],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['department', 'date'],
+        update_fields=['required_hours', 'assigned_minutes', 'unfilled_minutes', 'shift_count', 'unfilled_count'],
+    )
+
+
+def refresh_weeks(keys):
+    Shift = apps.get_model('nurse', 'Shift')
+    EmployeeWeekHours = apps.get_model('nurse', 'EmployeeWeekHours')
+
+    keys = set(keys)
+    weeks = [week for _, week in keys]
+    values = {key: {"minutes": 0, "shift_count": 0} for key in keys}
+    for employee_id, day, minutes, shift_count in (
+        Shift.objects.filter(
+            employee_id__in={employee_id for employee_id, _ in keys},
+            date__range=(min(weeks), max(weeks) + timedelta(days=6)),
+        ).values('employee_id', 'date').annotate(minutes=Sum('duration_minutes'), shift_count=Count('pk'))
+        .order_by().values_list('employee_id', 'date', 'minutes', 'shift_count')
+    ):
+        key = (employee_id, week_start(day))
+        if key in values:
+            values[key]["minutes"] += minutes
+            values[key]["shift_count"] += shift_count
+
+    empty = [key for key, row in values.items() if not row["shift_count"]]
+    if empty:
+        # Grupirano po tjednu: tjedana je u pravilu manje nego radnika
+        _delete_keys(EmployeeWeekHours, 'week_start', 'employee_id', [(week, employee_id) for employee_id, week in empty])
+    EmployeeWeekHours.objects.bulk_create(
+        [
+            EmployeeWeekHours(employee_id=employee_id, week_start=week, **row)
+            for (employee_id, week), row in values.items() if row["shift_count"]
+        ],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['employee', 'week_start'],
+        update_fields=['minutes', 'shift_count'],
+    )
+
+
+def _delete_keys(model, first, second, keys):
+    """Briše redove za parove ključeva, grupirano po prvom ključu (jedan upit po grupi)."""
+    grouped = {}
+    for key, value in keys:
+        grouped.setdefault(key, []).append(value)
+    for key, values in grouped.items():
+        model.objects.filter(**{first: key, f"{second}__in": values}).delete()
+
+
+def rebuild():
+    """Briše i ponovno računa sve zbirne redove (nakon uvoza ili promjena mimo ORM-a)."""
+    Shift = apps.get_model('nurse', 'Shift')
+    ShiftRequirement = apps.get_model('nurse', 'ShiftRequirement')
+    DepartmentDayCoverage = apps.get_model('nurse', 'DepartmentDayCoverage')
+    EmployeeWeekHours = apps.get_model('nurse', 'EmployeeWeekHours')
+
+    days = set(Shift.objects.values_list('department_id', 'date').distinct())
+    days |= set(ShiftRequirement.objects.values_list('department_id', 'date').distinct())
+    weeks = {
+        (employee_id, week_start(day))
+        for employee_id, day in Shift.objects.filter(employee__isnull=False)
+        .values_list('employee_id', 'date').distinct()
+    }
+    DepartmentDayCoverage.objects.all().delete()
+    EmployeeWeekHours.objects.all().delete()
+    if days:
+        refresh_days(days)
+    if weeks:
+        refresh_weeks(weeks)
+    return len(days), len(weeks)
+
+
+# === 📌 ČITANJE ===
+def _coverage_rows(start_date, end_date, department_id=None):
+    DepartmentDayCoverage = apps.get_model('nurse', 'DepartmentDayCoverage')
+    rows = DepartmentDayCoverage.objects.filter(date__range=(start_date, end_date))
+    if department_id:
+        rows = rows.filter(department_id=department_id)
+    return rows
+
+
+def _hours(totals):
+    assigned_minutes = totals['assigned_minutes'] or 0
+    unfilled_minutes = totals['unfilled_minutes'] or 0
+    return {
+        "assigned_hours": round(assigned_minutes / 60, 2),
+        "unfilled_hours": round(unfilled_minutes / 60, 2),
+        "total_hours": round((assigned_minutes + unfilled_minutes) / 60, 2),
+        "unfilled_shifts": totals['unfilled_count'] or 0,
+    }
+
+
+def shift_totals(start_date, end_date, department_id=None, since=None):
+    """
+    Dodijeljeni, nepopunjeni i ukupni sati smjena u rasponu, bez potrebnih sati (i predložaka) -
+    jedan upit. Uz `since` isti upit vraća i `assigned_hours_since` (dodijeljeni sati od tog datuma).
+    """
+    # Filtrirani zbroj ide prvi: kasnije bi 'assigned_minutes' značilo alias agregata, a ne polje
+    aggregates = {"assigned_minutes_since": Sum('assigned_minutes', filter=Q(date__gte=since))} if since is not None else {}
+    aggregates.update(
+        assigned_minutes=Sum('assigned_minutes'),
+        unfilled_minutes=Sum('unfilled_minutes'),
+        unfilled_count=Sum('unfilled_count'),
+    )
+    totals = _coverage_rows(start_date, end_date, department_id).aggregate(**aggregates)
+    result = _hours(totals)
+    if since is not None:
+        result["assigned_hours_since"] = round((totals['assigned_minutes_since'] or 0) / 60, 2)
+    return result
+
+
+def window_totals(start_date, end_date, department_id=None):
+    """Potrebni, dodijeljeni, nepopunjeni i ukupni sati smjena u rasponu (po želji za jedan odjel)."""
+    totals = _coverage_rows(start_date, end_date, department_id).aggregate(
+        required_hours=Sum('required_hours'),
+        assigned_minutes=Sum('assigned_minutes'),
+        unfilled_minutes=Sum('unfilled_minutes'),
+        unfilled_count=Sum('unfilled_count'),
+    )
+    # Tablica drži samo konkretne zahtjeve; predlošci se zbrajaju aritmetički
+    required = (totals['required_hours'] or 0) + requirements.template_hours(start_date, end_date, department_id)
+    hours = _hours(totals)
+    return {
+        "required_hours": required,
+        **hours,
+        "percent_filled": hours["assigned_hours"] / required * 100 if required else 0,
+    }
+
+
+def hours_by_day(dates, department_id=None):
+    """{datum: ukupni sati svih smjena tog dana}."""
+    DepartmentDayCoverage = apps.get_model('nurse', 'DepartmentDayCoverage')
+    rows = DepartmentDayCoverage.objects.filter(date__in=dates)
+    if department_id:
+        rows = rows.filter(department_id=department_id)
+    return {
+        row['date']: round((row['minutes'] or 0) / 60, 2)
+        for row in rows.values('date').annotate(minutes=Sum('assigned_minutes') + Sum('unfilled_minutes')).order_by()
+    }
+
+
+def employee_week_hours(start_date, end_date, employee_id=None):
+    """
+    Sati po radniku za raspon koji pokriva cijele ISO tjedne (ponedjeljak - nedjelja):
+    [{employee_id, first_name, last_name, hours}] kao `ShiftQuerySet.hours_by_employee()`.
+    Za raspon koji nije poravnat s tjednima vraća `None`.
+    """
+    EmployeeWeekHours = apps.get_model('nurse', 'EmployeeWeekHours')
+    if start_date.weekday() != 0 or end_date.weekday() != 6:
+        return None
+    rows = EmployeeWeekHours.objects.filter(week_start__range=(start_date, end_date))
+    if employee_id:
+        rows = rows.filter(employee_id=employee_id)
+    return [
+        {
+            "employee_id": row['employee_id'],
+            "first_name": row['employee__first_name'],
+            "last_name": row['employee__last_name'],
+            "hours": round(row['minutes'] / 60, 2),
+        }
+        for row in rows.values('employee_id', 'employee__first_name', 'employee__last_name')
+        .annotate(minutes=Sum('minutes')).order_by('employee__first_name', 'employee__last_name')
+    ]
+
+
+# === 📌 SIGNALI ===
+def coverage_key(instance):
+    return (instance.department_id, instance.date, getattr(instance, 'employee_id', None))
+
+
+def remember_key(instance):
+    """Pamti ključ učitanog/spremljenog reda, da se nakon promjene osvježi i stari ključ."""
+    # Čita se iz __dict__ da odgođena (.only/.defer) polja ne pokrenu dodatne upite
+    fields = instance.__dict__
+    if 'department_id' in fields and 'date' in fields:
+        instance._coverage_key = (fields['department_id'], fields['date'], fields.get('employee_id'))
+
+
+def refresh_instance(sender, instance, **kwargs):
+    rows = [coverage_key(instance)]
+    original = getattr(instance, '_coverage_key', None)
+    if original is not None and original != rows[0]:
+        rows.append(original)
+    refresh_shifts(rows)
+    remember_key(instance)
+
+
+# === 📌 KASKADNO BRISANJE ===
+# Smjene koje baza briše kaskadno (radnik, odjel ili uloga) ne prolaze kroz ShiftQuerySet.delete
+CASCADE_FIELDS = {'Employee': 'employee', 'Department': 'department', 'Role': 'role'}
+
+
+def collect_cascade(sender, instance, **kwargs):
+    """Pamti smjene koje će kaskada obrisati: (id, department_id, date, employee_id); koristi ih i changes.py."""
+    Shift = apps.get_model('nurse', 'Shift')
+    field = CASCADE_FIELDS[sender.__name__]
+    instance._cascade_shifts = list(
+        Shift.objects.filter(**{field: instance}).values_list('pk', 'department_id', 'date', 'employee_id')
+    )
+
+
+def refresh_cascade(sender, instance, **kwargs):
+    # Tek nakon commita: kaskada briše i zbirne redove, pa bi upis usred brisanja ostavio
+    # redove za već obrisan odjel/radnika
+    rows = {row[1:] for row in getattr(instance, '_cascade_shifts', ())}
+    if rows:
+        transaction.on_commit(lambda: refresh_shifts(rows))
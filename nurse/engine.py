@@ -0,0 +1,396 @@
+"""
+In-memory engine za generiranje rasporeda.
+
+Svi podaci potrebni za raspored (radnici, uloge, dostupnost, godišnji/bolovanja,
+tipovi smjena i zahtjevi) učitavaju se jednom s nekoliko upita u `ScheduleData`,
+dodjela smjena radi se nad običnim Python strukturama, a rezultat se sprema
+jednim `bulk_create` unutar transakcije.
+
+Napredak se logira (`nurse.engine`, detalji po zahtjevu na DEBUG razini), a
+trajanje faza bilježi `RunReport` (vidi `profiling.py`).
+"""
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from django.apps import apps
+from django.db import transaction
+
+from . import coverage
+from . import requirements as requirements_module
+from .intervals import IntervalIndex
+from .profiling import RunReport
+
+logger = logging.getLogger('nurse.engine')
+
+
+def shift_hours(start_time, end_time):
+    """Trajanje smjene u satima (smjene preko ponoći se ispravno računaju)."""
+    if start_time is None or end_time is None:
+        return 0
+    start = datetime.combine(date.min, start_time)
+    end = datetime.combine(date.min, end_time)
+    if end < start:
+        end += timedelta(days=1)
+    return round((end - start).total_seconds() / 3600, 2)
+
+
+def department_id_set(departments):
+    """Pretvara listu odjela (instance ili ID-eve) u set ID-eva; `None` znači svi odjeli."""
+    if departments is None:
+        return None
+    return {getattr(department, 'pk', department) for department in departments}
+
+
+def filter_departments(queryset, department_ids):
+    if department_ids is None:
+        return queryset
+    return queryset.filter(department_id__in=department_ids)
+
+
+# === 📌 STRUKTURE PODATAKA ===
+@dataclass
+class EmployeeInfo:
+    id: int
+    first_name: str
+    last_name: str
+    max_weekly_hours: int
+    max_daily_hours: int
+    priority: int
+    department_ids: set = field(default_factory=set)
+    role_ids: list = field(default_factory=list)
+    day_names: set = field(default_factory=set)
+    shift_type_ids: set = field(default_factory=set)
+    time_off: list = field(default_factory=list)
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    def is_off(self, day):
+        return any(start <= day <= end for start, end in self.time_off)
+
+    def can_work(self, shift_type):
+        # Prazan `can_work_shifts` znači da radnik može raditi sve smjene
+        return not self.shift_type_ids or shift_type.id in self.shift_type_ids
+
+    def role_for(self, requirement):
+        """Prva uloga radnika koju zahtjev traži (ili prva uloga radnika)."""
+        for role_id in self.role_ids:
+            if role_id in requirement.role_ids:
+                return role_id
+        return self.role_ids[0] if self.role_ids else None
+
+
+@dataclass
+class ShiftTypeInfo:
+    id: int
+    name: str
+    start_time: object
+    end_time: object
+    duration_hours: int
+
+
+@dataclass
+class RequirementInfo:
+    id: int
+    department_id: int
+    department_name: str
+    date: date
+    required_hours: int
+    role_ids: frozenset = frozenset()
+    shift_type_ids: frozenset = frozenset()
+    template_id: object = None  # zahtjev iz RequirementTemplate (tada je `id` None)
+
+
+@dataclass
+class PlannedShift:
+    employee_id: object
+    department_id: int
+    role_id: object
+    date: date
+    start_time: object = None
+    end_time: object = None
+    # Zahtjev iz kojeg je smjena nastala (za popravke nakon planiranja dana), ne sprema se
+    requirement: object = field(default=None, repr=False, compare=False)
+
+    @property
+    def is_missing(self):
+        return self.employee_id is None
+
+    @property
+    def hours(self):
+        return shift_hours(self.start_time, self.end_time)
+
+    def to_model(self):
+        Shift = apps.get_model('nurse', 'Shift')
+        return Shift(
+            employee_id=self.employee_id,
+            department_id=self.department_id,
+            role_id=self.role_id,
+            date=self.date,
+            start_time=self.start_time,
+            end_time=self.end_time,
+        )
+
+
+# === 📌 UČITAVANJE PODATAKA ===
+def load_employees(start_date, end_date, department_ids=None):
+    """Učitava radnike (po želji samo iz zadanih odjela) s M2M vezama i odsustvima u rasponu."""
+    Employee = apps.get_model('nurse', 'Employee')
+    TimeOff = apps.get_model('nurse', 'TimeOff')
+
+    queryset = Employee.objects.all()
+    if department_ids is not None:
+        queryset = queryset.filter(departments__in=department_ids).distinct()
+    employees = {
+        row['id']: EmployeeInfo(**row)
+        # Redoslijed po ID-u: isti seed daje isti raspored na svakoj bazi (shuffle kandidata ovisi o redoslijedu)
+        for row in queryset.order_by('id').values(
+            'id', 'first_name', 'last_name', 'max_weekly_hours', 'max_daily_hours', 'priority'
+        )
+    }
+
+    def related(model):
+        if department_ids is None:
+            return model.objects.all()
+        return model.objects.filter(employee_id__in=list(employees))
+
+    # M2M veze čitamo direktno iz through tablica (jedan upit po vezi)
+    for employee_id, department_id in related(Employee.departments.through).values_list('employee_id', 'department_id'):
+        employees[employee_id].department_ids.add(department_id)
+    for employee_id, role_id in related(Employee.roles.through).order_by('role_id').values_list('employee_id', 'role_id'):
+        employees[employee_id].role_ids.append(role_id)
+    for employee_id, day_name in related(Employee.available_days.through).values_list('employee_id', 'day__name'):
+        employees[employee_id].day_names.add(day_name)
+    for employee_id, shift_type_id in related(Employee.can_work_shifts.through).values_list('employee_id', 'shifttype_id'):
+        employees[employee_id].shift_type_ids.add(shift_type_id)
+    for employee_id, start, end in related(TimeOff).filter(
+        start_date__lte=end_date, end_date__gte=start_date
+    ).values_list('employee_id', 'start_date', 'end_date'):
+        employees[employee_id].time_off.append((start, end))
+    return employees
+
+
+def load_shift_types():
+    ShiftType = apps.get_model('nurse', 'ShiftType')
+    return {
+        row['id']: ShiftTypeInfo(**row)
+        for row in ShiftType.objects.order_by('id').values('id', 'name', 'start_time', 'end_time', 'duration_hours')
+    }
+
+
+class ScheduleData:
+    """Snapshot svih podataka potrebnih za generiranje rasporeda u zadanom rasponu."""
+
+    def __init__(self, start_date, end_date, employees, shift_types, requirements, index, department_ids=None,
+                 report=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.department_ids = department_ids
+        self.employees = employees
+        self.shift_types = shift_types
+        self.shift_types_by_name = {st.name: st for st in shift_types.values()}
+        self.requirements = requirements
+
+        # Smjene koje ostaju u bazi (± tjedan oko raspona); planiranje dodaje nove u isti indeks
+        self.index = index
+        self.report = report or RunReport(start_date, end_date)
+
+        self._requirements_by_date = defaultdict(list)
+        for requirement in requirements:
+            self._requirements_by_date[requirement.date].append(requirement)
+
+        self._by_department = defaultdict(list)
+        for employee in employees.values():
+            for department_id in employee.department_ids:
+                self._by_department[department_id].append(employee)
+
+    @classmethod
+    def load(cls, start_date, end_date, departments=None, report=None):
+        ShiftRequirement = apps.get_model('nurse', 'ShiftRequirement')
+        Shift = apps.get_model('nurse', 'Shift')
+
+        department_ids = department_id_set(departments)
+
+        # Samo radnici odjela koji se generiraju (i njihove smjene u indeksu, u svim odjelima)
+        employees = load_employees(start_date, end_date, department_ids)
+
+        shift_types = load_shift_types()
+
+        requirements = [
+            RequirementInfo(
+                id=req.id,
+                department_id=req.department_id,
+                department_name=req.department.name,
+                date=req.date,
+                required_hours=req.required_hours,
+                role_ids=frozenset(role.id for role in req.required_roles.all()),
+                shift_type_ids=frozenset(st.id for st in req.shift_types.all()),
+            )
+            for req in filter_departments(ShiftRequirement.objects.filter(date__range=(start_date, end_date)), department_ids)
+            .select_related('department')
+            .prefetch_related('required_roles', 'shift_types')
+            .order_by('date', 'id')
+        ]
+
+        # Predlošci za dane bez konkretnog zahtjeva; zahtjev s 0 sati samo isključuje predloške
+        overridden = {(requirement.department_id, requirement.date) for requirement in requirements}
+        requirements = [requirement for requirement in requirements if requirement.required_hours]
+        requirements += [
+            RequirementInfo(
+                id=None,
+                department_id=template.department_id,
+                department_name=template.department.name,
+                date=day,
+                required_hours=template.required_hours,
+                role_ids=frozenset(role.id for role in template.required_roles.all()),
+                shift_type_ids=frozenset(st.id for st in template.shift_types.all()),
+                template_id=template.pk,
+            )
+            for template, day in requirements_module.expand(start_date, end_date, department_ids, overridden)
+        ]
+        # Konkretni zahtjevi pa predlošci, unutar dana po ID-u
+        requirements.sort(key=lambda requirement: (
+            requirement.date, requirement.template_id is not None, requirement.id or requirement.template_id,
+        ))
+
+        # Smjene koje ostaju (sve izvan raspona i odjela koji se generiraju), tjedan prije i poslije
+        regenerated = filter_departments(Shift.objects.filter(date__range=(start_date, end_date)), department_ids)
+        index = IntervalIndex.around(
+            start_date, end_date, employee_ids=None if department_ids is None else list(employees),
+            exclude=regenerated.values('pk'),
+        )
+
+        return cls(
+            start_date, end_date, employees, shift_types, requirements, index,
+            department_ids=department_ids, report=report,
+        )
+
+    def subset(self, department_ids):
+        """Podskup podataka za zadane odjele (radnici, zahtjevi i njihovi intervali)."""
+        employees = {
+            employee_id: employee for employee_id, employee in self.employees.items()
+            if employee.department_ids & department_ids
+        }
+        requirements = [requirement for requirement in self.requirements if requirement.department_id in department_ids]
+        return ScheduleData(
+            self.start_date, self.end_date, employees, self.shift_types, requirements,
+            self.index.subset(employees), department_ids=department_ids,
+        )
+
+    @property
+    def dates(self):
+        return [self.start_date + timedelta(days=n) for n in range((self.end_date - self.start_date).days + 1)]
+
+    def requirements_for(self, day):
+        return self._requirements_by_date.get(day, [])
+
+    def candidates(self, requirement):
+        """Radnici odjela koji rade taj dan, imaju traženu ulogu i nisu na godišnjem/bolovanju."""
+        day_name = requirement.date.strftime('%A')
+        return [
+            employee for employee in self._by_department.get(requirement.department_id, [])
+            if day_name in employee.day_names
+            and requirement.role_ids.intersection(employee.role_ids)
+            and not employee.is_off(requirement.date)
+        ]
+
+
+# === 📌 DODJELA SMJENA ===
+def pick_employee(candidates, shift_type, day, index, report=None):
+    """Prvi kandidat koji poštuje tjedni i dnevni limit i nema preklapanja."""
+    hours = shift_hours(shift_type.start_time, shift_type.end_time)
+    evaluated = 0
+    picked = None
+    for employee in candidates:
+        evaluated += 1
+        # Jedna smjena po radniku po danu
+        if index.shifts_on(employee.id, day) or not employee.can_work(shift_type):
+            continue
+        if index.max_week_hours(employee.id, day) + hours > employee.max_weekly_hours:
+            continue
+        if index.hours_on(employee.id, day) + hours > employee.max_daily_hours:
+            continue
+        if index.overlaps(employee.id, day, shift_type.start_time, shift_type.end_time):
+            continue
+        picked = employee
+        break
+    if report is not None:
+        report.slot(evaluated, picked is not None)
+    return picked
+
+
+def plan_day(data, day, rng=random):
+    """Raspoređuje sve zahtjeve jednog dana; vraća listu `PlannedShift` (uključujući nepopunjene)."""
+    from .utils import determine_shift_structure
+
+    planned = []
+    index = data.index
+    report = data.report
+
+    requirements = data.requirements_for(day)
+    if not requirements:
+        logger.debug("⚠️ Nema ShiftRequirement unosa za %s!", day)
+        return planned
+
+    for requirement in requirements:
+        assigned_hours = 0
+        logger.debug("📌 Obrada %s za %s (%s), potrebno sati: %sh",
+                     requirement.department_name, day.strftime('%A'), day, requirement.required_hours)
+
+        with report.phase("candidates"):
+            candidates = data.candidates(requirement)
+            # Nasumičan redoslijed, ali prioritet imaju radnici s najmanje sati u zadnjih 7 dana
+            rng.shuffle(candidates)
+            candidates.sort(key=lambda e: index.hours_in_week(e.id, day))
+
+        if not candidates:
+            logger.debug("⚠️ NEMA DOSTUPNIH RADNIKA! Ostavlja se oznaka nedostajućeg radnika u shifts tabeli.")
+            planned.append(PlannedShift(None, requirement.department_id, None, day))
+            report.slot(0, False)
+            continue
+
+        for shift_name in determine_shift_structure(requirement.required_hours, rng):
+            shift_type = data.shift_types_by_name.get(shift_name)
+            if shift_type is None:
+                logger.warning("⚠️ Smjena '%s' ne postoji u bazi!", shift_name)
+                continue
+
+            with report.phase("overlap"):
+                employee = pick_employee(candidates, shift_type, day, index, report)
+            if employee is None:
+                logger.debug("⚠️ Nema radnika za smjenu %s. Ostavlja se nepopunjeno!", shift_name)
+                planned.append(PlannedShift(
+                    None, requirement.department_id, None, day, shift_type.start_time, shift_type.end_time
+                ))
+                continue
+
+            planned.append(PlannedShift(
+                employee.id, requirement.department_id, employee.role_for(requirement),
+                day, shift_type.start_time, shift_type.end_time,
+            ))
+            index.add(employee.id, day, shift_type.start_time, shift_type.end_time)
+            assigned_hours += shift_hours(shift_type.start_time, shift_type.end_time)
+
+        logger.debug("📊 Ukupno sati pokriveno: %s/%s", assigned_hours, requirement.required_hours)
+
+    return planned
+
+
+# === 📌 SPREMANJE ===
+def persist_schedule(planned, start_date, end_date, department_ids=None):
+    """Briše postojeće smjene u rasponu i sprema nove jednim `bulk_create` u transakciji."""
+    Shift = apps.get_model('nurse', 'Shift')
+
+    # Zbirna statistika se osvježava jednom, za brisanje i upis zajedno
+    with transaction.atomic(), coverage.batched():
+        deleted_count, _ = filter_departments(
+            Shift.objects.filter(date__range=(start_date, end_date)), department_ids
+        ).delete()
+        created = Shift.objects.bulk_create([shift.to_model() for shift in planned], batch_size=500)
+
+    logger.info("🗑️ Obrisano %d smjena, spremljeno %d novih (%s - %s)", deleted_count, len(created), start_date, end_date)
+    return created
@@ -0,0 +1,153 @@
+"""
+Izvoz rasporeda.
+
+Redovi se čitaju `values_list(...).iterator(chunk_size=...)` s već spojenim radnikom,
+odjelom i ulogom, pa izvoz troši konstantnu memoriju i fiksan broj upita bez obzira
+na broj smjena, a odgovor se šalje kao stream čim je prvi red spreman.
+"""
+import csv
+import tempfile
+from collections import defaultdict
+from datetime import date
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+
+EXPORT_COLUMNS = ["Employee", "Department", "Role", "Date", "Start Time", "End Time", "Total Hours"]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-buffer za csv.writer: `write` samo vraća vrijednost."""
+
+    def write(self, value):
+        return value
+
+
+def filter_shifts(queryset, params):
+    """Filtrira smjene po `start_date`, `end_date` i `department` iz GET parametara."""
+    try:
+        if params.get("start_date"):
+            queryset = queryset.filter(date__gte=date.fromisoformat(params["start_date"]))
+        if params.get("end_date"):
+            queryset = queryset.filter(date__lte=date.fromisoformat(params["end_date"]))
+    except ValueError:
+        raise ValueError("Invalid date format!")
+    if params.get("department"):
+        if not params["department"].isdigit():
+            raise ValueError("Invalid department!")
+        queryset = queryset.filter(department_id=int(params["department"]))
+    return queryset
+
+
+def shift_records(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Sirovi redovi (bez instanciranja modela, jedan JOIN upit, čita se u komadima)."""
+    return queryset.values_list(
+        "employee__first_name", "employee__last_name", "department__name", "role__name",
+        "date", "start_time", "end_time", "duration_minutes",
+    ).iterator(chunk_size=chunk_size)
+
+
+def shift_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Generira redove za izvoz u istom obliku kao do sada."""
+    for first_name, last_name, department, role, day, start_time, end_time, minutes in shift_records(queryset, chunk_size):
+        yield [
+            f"{first_name} {last_name}" if first_name is not None else "⚠️ Worker Missing",
+            department or "N/A",
+            role or "⚠️ Role Missing",
+            day,
+            start_time or "",
+            end_time or "",
+            round(minutes / 60, 2),
+        ]
+
+
+def stream_csv(rows, filename):
+    writer = csv.writer(Echo())
+
+    def content():
+        yield writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(content(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def sheet_title(name, used):
+    """Excel naziv lista: najviše 31 znak, bez zabranjenih znakova, jedinstven."""
+    title = "".join("_" if char in '[]:*?/\\' else char for char in name)[:31] or "Sheet"
+    candidate, counter = title, 2
+    while candidate in used:
+        suffix = f" ({counter})"
+        candidate = title[:31 - len(suffix)] + suffix
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def write_xlsx(queryset, per_department=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Piše xlsx u privremenu datoteku preko write-only openpyxl radne knjige: redovi idu
+    direktno na disk pa memorija ne raste s brojem smjena. Uz `per_department` svaki
+    odjel dobiva svoj list. Zadnji list "Summary" sadrži zbrojeve po odjelu.
+    Vraća otvorenu privremenu datoteku (pozicioniranu na početak).
+    """
+    workbook = Workbook(write_only=True)
+    used_titles = {"Summary"}
+    sheets = {}
+    if not per_department:
+        sheets[None] = workbook.create_sheet(sheet_title("Schedule", used_titles))
+        sheets[None].append(EXPORT_COLUMNS)
+
+    totals = defaultdict(lambda: {"shifts": 0, "unfilled": 0, "hours": 0})
+    for first_name, last_name, department, role, day, start_time, end_time, minutes in shift_records(queryset, chunk_size):
+        department = department or "N/A"
+        key = department if per_department else None
+        if key not in sheets:
+            sheets[key] = workbook.create_sheet(sheet_title(department, used_titles))
+            sheets[key].append(EXPORT_COLUMNS)
+
+        hours = round(minutes / 60, 2)
+        sheets[key].append([
+            f"{first_name} {last_name}" if first_name is not None else "⚠️ Worker Missing",
+            department,
+            role or "⚠️ Role Missing",
+            day,
+            start_time,
+            end_time,
+            hours,
+        ])
+
+        department_totals = totals[department]
+        department_totals["shifts"] += 1
+        department_totals["unfilled"] += first_name is None
+        department_totals["hours"] += hours
+
+    summary = workbook.create_sheet("Summary")
+    summary.append(["Department", "Shifts", "Unfilled Shifts", "Total Hours"])
+    for department in sorted(totals):
+        row = totals[department]
+        summary.append([department, row["shifts"], row["unfilled"], round(row["hours"], 2)])
+    summary.append([
+        "Total",
+        sum(row["shifts"] for row in totals.values()),
+        sum(row["unfilled"] for row in totals.values()),
+        round(sum(row["hours"] for row in totals.values()), 2),
+    ])
+
+    output = tempfile.TemporaryFile(suffix=".xlsx")
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def xlsx_response(queryset, filename, per_department=False):
+    return FileResponse(
+        write_xlsx(queryset, per_department=per_department),
+        as_attachment=True,
+        filename=filename,
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
@@ -0,0 +1,398 @@
+"""
+Skupni uvoz radnika i zahtjeva smjena iz CSV/XLSX datoteka.
+
+Datoteka se čita kao stream (csv.reader / openpyxl read_only) i obrađuje u
+serijama od `BATCH_SIZE` redova: validacija, jedan upit za postojeće redove serije,
+pa `bulk_create` / `bulk_update` i skupni upis u M2M through tablice. Nazivi
+(odjeli, uloge, dani, tipovi smjena) pretvaraju se u ID-eve preko mapa učitanih
+jednom na početku. Više vrijednosti u ćeliji odvaja se s ";".
+
+Red s istim ključem kao postojeći (radnik: ime i prezime; zahtjev: odjel i datum)
+ažurira postojeći, ostali se stvaraju. Stupci kojih nema u datoteci ostaju
+nepromijenjeni. Uvoz je sve ili ništa: ako ijedan red nije ispravan, ništa se ne
+sprema. `dry_run` samo vraća razliku (što bi se stvorilo i promijenilo).
+
+Postojeći raspored se ne popravlja (za to vidi repair.py i admin radnika).
+"""
+import codecs
+import csv
+from datetime import date, datetime
+from itertools import islice
+from time import perf_counter
+
+from django.apps import apps
+from django.db import transaction
+
+from . import coverage
+
+BATCH_SIZE = 2000
+LIST_SEPARATOR = ";"
+MAX_REPORTED = 100  # redova razlike i grešaka u izvještaju
+
+
+class ImportReport:
+    def __init__(self, kind, dry_run=False):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []  # [(redak, poruka)]
+        self.diff = []  # [(redak, "create"/"update", naziv, {polje: (staro, novo)})]
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return not self.error_count
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds) if self.seconds else 0
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED:
+            self.errors.append((line, message))
+
+    def change(self, line, action, label, fields):
+        if action == "create":
+            self.created += 1
+        else:
+            self.updated += 1
+        if len(self.diff) < MAX_REPORTED:
+            self.diff.append((line, action, label, fields))
+
+    def summary(self):
+        if not self.ok:
+            outcome = f"❌ {self.error_count} neispravnih redova, ništa nije spremljeno"
+        elif self.dry_run:
+            outcome = "🔍 probni uvoz, ništa nije spremljeno"
+        else:
+            outcome = "✅ spremljeno"
+        return (
+            f"{outcome}: {self.rows} redova ({self.kind}), {self.created} novih, {self.updated} promijenjenih, "
+            f"{self.unchanged} bez promjene - {self.seconds:.2f}s, {self.rows_per_second} redova/s"
+        )
+
+    def as_dict(self):
+        return {
+            "kind": self.kind,
+            "dry_run": self.dry_run,
+            "ok": self.ok,
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "errors": self.error_count,
+            "seconds": round(self.seconds, 4),
+            "rows_per_second": self.rows_per_second,
+        }
+
+
+# === 📌 ČITANJE DATOTEKA ===
+def column_name(value):
+    return str(value or "").strip().lower().replace(" ", "_")
+
+
+def read_rows(file, name):
+    """(redak, {stupac: vrijednost}) za CSV ili XLSX datoteku otvorenu u binarnom načinu."""
+    if name.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        rows = csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+
+    header = [column_name(value) for value in next(rows, ())]
+    for line, values in enumerate(rows, start=2):
+        if all(value in (None, "") for value in values):
+            continue
+        yield line, dict(zip(header, values))
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+# === 📌 PRETVORBA VRIJEDNOSTI ===
+def cell(row, column):
+    value = row.get(column)
+    return value.strip() if isinstance(value, str) else value
+
+
+def text(row, column, max_length=100):
+    value = cell(row, column)
+    if value in (None, ""):
+        raise ValueError(f"{column}: obavezno polje")
+    value = str(value)
+    if len(value) > max_length:
+        raise ValueError(f"{column}: najviše {max_length} znakova")
+    return value
+
+
+def integer(row, column, required=True):
+    value = cell(row, column)
+    if value in (None, ""):
+        if required:
+            raise ValueError(f"{column}: obavezno polje")
+        return None
+    try:
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{column}: '{value}' nije cijeli broj") from None
+    if number < 0:
+        raise ValueError(f"{column}: ne smije biti negativan")
+    return number
+
+
+def day_value(row, column):
+    value = cell(row, column)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value or ""))
+    except ValueError:
+        raise ValueError(f"{column}: '{value or ''}' nije datum (YYYY-MM-DD)") from None
+
+
+class Importer:
+    """
+    Zajednički tijek uvoza; podklase zadaju model, ključ, stupce (`parse`) te M2M i
+    FK polja čiji se nazivi pretvaraju u ID ({polje: naziv povezanog modela}).
+    """
+    kind = None
+    model_name = None
+    columns = ()  # stupci datoteke, za upute u adminu
+    key_fields = ()
+    scalar_fields = ()
+    m2m_fields = {}
+    fk_fields = {}
+
+    def __init__(self, dry_run=False, batch_size=BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.model = apps.get_model('nurse', self.model_name)
+        self.seen = set()
+
+    def run(self, rows):
+        report = ImportReport(self.kind, self.dry_run)
+        started = perf_counter()
+        self.load_names()
+        with transaction.atomic(), coverage.batched():
+            for batch in batched(rows, self.batch_size):
+                items = []
+                for line, row in batch:
+                    report.rows += 1
+                    try:
+                        items.append((line, self.parse(row)))
+                    except ValueError as error:
+                        report.error(line, str(error))
+                # Nakon prve greške ostatak datoteke se samo validira
+                if report.ok:
+                    self.apply(items, report)
+            if not report.ok or self.dry_run:
+                transaction.set_rollback(True)
+        report.seconds = perf_counter() - started
+        return report
+
+    # --- nazivi → ID ---
+    def load_names(self):
+        self.names = {
+            model: dict(apps.get_model('nurse', model).objects.order_by().values_list('name', 'pk'))
+            for model in set(self.m2m_fields.values()) | set(self.fk_fields.values())
+        }
+        self.labels = {model: {pk: name for name, pk in names.items()} for model, names in self.names.items()}
+
+    def resolve(self, row, column, model, required=False):
+        """ID-evi za nazive odvojene s ";"; `None` ako stupca nema u datoteci."""
+        if column not in row:
+            if required:
+                raise ValueError(f"{column}: obavezan stupac")
+            return None
+        value = cell(row, column)
+        names = [name.strip() for name in str(value or "").split(LIST_SEPARATOR) if name.strip()]
+        if required and not names:
+            raise ValueError(f"{column}: obavezno polje")
+        unknown = [name for name in names if name not in self.names[model]]
+        if unknown:
+            raise ValueError(f"{column}: nepoznato {', '.join(unknown)}")
+        return frozenset(self.names[model][name] for name in names)
+
+    def display(self, field, value):
+        if field in self.m2m_fields and value is not None:
+            return sorted(self.labels[self.m2m_fields[field]][pk] for pk in value)
+        return value
+
+    # --- usporedba s postojećim redovima ---
+    def key(self, item):
+        return tuple(item[name] for name in self.key_fields)
+
+    def label(self, item):
+        return " ".join(str(value) for value in self.key(item))
+
+    def existing_rows(self, keys):
+        """Queryset postojećih redova koji bi mogli imati neki od ključeva serije."""
+        raise NotImplementedError
+
+    def existing(self, keys):
+        """{ključ: stanje} za postojeće redove serije; `None` za ključ s više redova."""
+        states = {}
+        for row in self.existing_rows(keys).values('pk', *self.key_fields, *self.scalar_fields):
+            key = tuple(row[name] for name in self.key_fields)
+            if key in keys:
+                states[key] = None if key in states else row
+        by_pk = {state['pk']: state for state in states.values() if state}
+        for field in self.m2m_fields:
+            for state in by_pk.values():
+                state[field] = set()
+            relation = self.model._meta.get_field(field)
+            through = relation.remote_field.through
+            owner, target = relation.m2m_column_name(), relation.m2m_reverse_name()
+            for owner_id, target_id in through.objects.filter(**{f"{owner}__in": list(by_pk)}).values_list(owner, target):
+                by_pk[owner_id][field].add(target_id)
+        return states
+
+    def apply(self, items, report):
+        states = self.existing({self.key(item) for _, item in items})
+        created, updated = [], []
+        for line, item in items:
+            key = self.key(item)
+            if key in self.seen:
+                report.error(line, f"{self.label(item)}: ponovljen red")
+                continue
+            self.seen.add(key)
+            if key in states and states[key] is None:
+                report.error(line, f"{self.label(item)}: u bazi postoji više redova s istim ključem")
+                continue
+            state = states.get(key)
+            provided = {field: value for field, value in item.items() if value is not None}
+            if state is None:
+                created.append(provided)
+                report.change(line, "create", self.label(item), {
+                    field: (None, self.display(field, value)) for field, value in provided.items()
+                    if field not in self.key_fields
+                })
+                continue
+            changed = {field: value for field, value in provided.items() if state[field] != value}
+            if not changed:
+                report.unchanged += 1
+                continue
+            updated.append((state, changed))
+            report.change(line, "update", self.label(item), {
+                field: (self.display(field, state[field]), self.display(field, value)) for field, value in changed.items()
+            })
+
+        if report.ok and not self.dry_run:
+            self.write(created, updated)
+
+    # --- upis ---
+    def write(self, created, updated):
+        objects = self.model.objects.bulk_create([
+            self.model(**{field: value for field, value in item.items() if field not in self.m2m_fields})
+            for item in created
+        ], batch_size=self.batch_size)
+
+        changed_scalars = sorted({field for _, changed in updated for field in changed if field in self.scalar_fields})
+        if changed_scalars:
+            self.model.objects.bulk_update([
+                # S ključem, da skupni upis zna koji dan/odjel osvježiti u zbirnoj statistici
+                self.model(pk=state['pk'], **{
+                    field: changed.get(field, state[field]) for field in self.key_fields + self.scalar_fields
+                })
+                for state, changed in updated if set(changed) & set(changed_scalars)
+            ], changed_scalars, batch_size=self.batch_size)
+
+        for field in self.m2m_fields:
+            relation = self.model._meta.get_field(field)
+            through = relation.remote_field.through
+            owner, target = relation.m2m_column_name(), relation.m2m_reverse_name()
+            replaced = [(state['pk'], changed[field]) for state, changed in updated if field in changed]
+            if replaced:
+                through.objects.filter(**{f"{owner}__in": [pk for pk, _ in replaced]}).delete()
+            links = replaced + [(obj.pk, item.get(field, ())) for obj, item in zip(objects, created)]
+            through.objects.bulk_create([
+                through(**{owner: pk, target: target_id}) for pk, values in links for target_id in values
+            ], batch_size=self.batch_size)
+
+
+# === 📌 RADNICI ===
+class EmployeeImporter(Importer):
+    kind = "employees"
+    columns = (
+        "first_name", "last_name", "departments", "roles", "max_weekly_hours", "max_daily_hours",
+        "available_days", "can_work_shifts", "priority",
+    )
+    model_name = "Employee"
+    key_fields = ("first_name", "last_name")
+    scalar_fields = ("max_weekly_hours", "max_daily_hours", "priority")
+    m2m_fields = {
+        "departments": "Department", "roles": "Role", "available_days": "Day", "can_work_shifts": "ShiftType",
+    }
+
+    def parse(self, row):
+        return {
+            "first_name": text(row, "first_name"),
+            "last_name": text(row, "last_name"),
+            "max_weekly_hours": integer(row, "max_weekly_hours"),
+            "max_daily_hours": integer(row, "max_daily_hours"),
+            "priority": integer(row, "priority", required=False),
+            "departments": self.resolve(row, "departments", "Department", required=True),
+            "roles": self.resolve(row, "roles", "Role"),
+            "available_days": self.resolve(row, "available_days", "Day"),
+            "can_work_shifts": self.resolve(row, "can_work_shifts", "ShiftType"),
+        }
+
+    def existing_rows(self, keys):
+        return self.model.objects.filter(
+            first_name__in={first for first, _ in keys}, last_name__in={last for _, last in keys},
+        )
+
+
+# === 📌 ZAHTJEVI ===
+class ShiftRequirementImporter(Importer):
+    kind = "requirements"
+    columns = ("department", "date", "required_hours", "shift_types", "required_roles")
+    model_name = "ShiftRequirement"
+    key_fields = ("department_id", "date")
+    scalar_fields = ("required_hours",)
+    m2m_fields = {"shift_types": "ShiftType", "required_roles": "Role"}
+    fk_fields = {"department": "Department"}
+
+    def parse(self, row):
+        department = text(row, "department")
+        if department not in self.names["Department"]:
+            raise ValueError(f"department: nepoznato {department}")
+        return {
+            "department_id": self.names["Department"][department],
+            "date": day_value(row, "date"),
+            "required_hours": integer(row, "required_hours"),
+            "shift_types": self.resolve(row, "shift_types", "ShiftType"),
+            "required_roles": self.resolve(row, "required_roles", "Role"),
+        }
+
+    def label(self, item):
+        return f"{self.labels['Department'][item['department_id']]} {item['date']}"
+
+    def existing_rows(self, keys):
+        return self.model.objects.filter(
+            department_id__in={department for department, _ in keys}, date__in={day for _, day in keys},
+        )
+
+
+IMPORTERS = {"employees": EmployeeImporter, "requirements": ShiftRequirementImporter}
+
+
+def import_file(kind, file, name, dry_run=False, batch_size=BATCH_SIZE):
+    """Uvozi CSV/XLSX datoteku (`kind`: "employees" ili "requirements") i vraća ImportReport."""
+    if kind not in IMPORTERS:
+        raise ValueError(f"Unknown import '{kind}' (choose from: {', '.join(IMPORTERS)})")
+    return IMPORTERS[kind](dry_run=dry_run, batch_size=batch_size).run(read_rows(file, name))
@@ -0,0 +1,187 @@
+"""
+Indeks intervala smjena po radniku.
+
+Za svakog radnika čuva sortiranu listu [početak, kraj) datetime intervala i minute
+po danu početka. "Sati na dan D" i "sati u 7-dnevnom prozoru" čitaju se iz zbroja
+po danu (O(dana) bez obzira na broj smjena), a "preklapa li se [a, b)" je binarno
+pretraživanje plus provjera samo intervala koji počinju unutar najdulje smjene
+radnika prije `a`. Dodavanje ne poništava ništa, pa generator i popravak mogu
+naizmjence dodavati i pitati bez ponovnog građenja. Smjene preko ponoći (npr.
+"20-08") završavaju sljedeći dan, a pripadaju danu u kojem počinju.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+
+
+def min_rest():
+    """Minimalni odmor između dviju smjena istog radnika (`NURSE_MIN_REST_HOURS`, default 0)."""
+    return timedelta(hours=getattr(settings, 'NURSE_MIN_REST_HOURS', 0))
+
+
+def shift_interval(day, start_time, end_time):
+    """Pretvara (datum, početak, kraj) u [start, end) datetime; kraj prije početka znači sljedeći dan."""
+    start = datetime.combine(day, start_time)
+    end = datetime.combine(day, end_time)
+    if end < start:
+        end += timedelta(days=1)
+    return start, end
+
+
+class _EmployeeIntervals:
+    __slots__ = ('starts', 'ends', 'longest', 'minutes_by_day', 'count_by_day')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.longest = timedelta(0)
+        self.minutes_by_day = {}
+        self.count_by_day = {}
+
+    def add(self, start, end):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.longest = max(self.longest, end - start)
+        day = start.date()
+        self.minutes_by_day[day] = self.minutes_by_day.get(day, 0) + (end - start).total_seconds() / 60
+        self.count_by_day[day] = self.count_by_day.get(day, 0) + 1
+
+    def remove(self, start, end):
+        # `longest` ostaje gornja granica, pa provjera preklapanja ostaje točna
+        position = bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self.ends[position] == end:
+                del self.starts[position], self.ends[position]
+                day = start.date()
+                self.minutes_by_day[day] -= (end - start).total_seconds() / 60
+                self.count_by_day[day] -= 1
+                return
+            position += 1
+        raise ValueError(f"Interval {start} - {end} nije u indeksu")
+
+    def copy(self):
+        intervals = _EmployeeIntervals()
+        intervals.starts, intervals.ends, intervals.longest = list(self.starts), list(self.ends), self.longest
+        intervals.minutes_by_day, intervals.count_by_day = dict(self.minutes_by_day), dict(self.count_by_day)
+        return intervals
+
+    def minutes_between(self, first_day, last_day):
+        """Zbroj minuta intervala koji počinju od `first_day` do `last_day` (uključivo)."""
+        days = (last_day - first_day).days + 1
+        if days > len(self.minutes_by_day):
+            return sum(minutes for day, minutes in self.minutes_by_day.items() if first_day <= day <= last_day)
+        return sum(self.minutes_by_day.get(first_day + timedelta(days=n), 0) for n in range(days))
+
+    def count_on(self, day):
+        return self.count_by_day.get(day, 0)
+
+    def overlaps(self, start, end, gap):
+        """Postoji li interval koji počinje prije `end + gap` i završava poslije `start - gap`."""
+        # Interval koji počinje prije `start - gap - longest` završava prije `start - gap`
+        lo = bisect_left(self.starts, start - gap - self.longest)
+        hi = bisect_left(self.starts, end + gap, lo)
+        return any(self.ends[position] > start - gap for position in range(lo, hi))
+
+
+class IntervalIndex:
+    """Sortirani intervali smjena, ključ je ID radnika."""
+
+    def __init__(self, rest=None):
+        self.rest = min_rest() if rest is None else rest
+        self._employees = defaultdict(_EmployeeIntervals)
+
+    def __contains__(self, employee_id):
+        return employee_id in self._employees
+
+    def add(self, employee_id, day, start_time, end_time):
+        if employee_id is None or start_time is None or end_time is None:
+            return
+        self._employees[employee_id].add(*shift_interval(day, start_time, end_time))
+
+    def remove(self, employee_id, day, start_time, end_time):
+        """Uklanja smjenu dodanu s `add` (npr. kad je planiranje prebaci drugom radniku)."""
+        if employee_id is None or start_time is None or end_time is None:
+            return
+        self._employees[employee_id].remove(*shift_interval(day, start_time, end_time))
+
+    def hours_between(self, employee_id, first_day, last_day):
+        """Sati smjena radnika koje počinju od `first_day` do `last_day` (uključivo)."""
+        if employee_id not in self._employees:
+            return 0
+        return round(self._employees[employee_id].minutes_between(first_day, last_day) / 60, 2)
+
+    def hours_on(self, employee_id, day):
+        return self.hours_between(employee_id, day, day)
+
+    def shifts_on(self, employee_id, day):
+        if employee_id not in self._employees:
+            return 0
+        return self._employees[employee_id].count_on(day)
+
+    def hours_in_week(self, employee_id, day):
+        """Sati u 7-dnevnom prozoru koji završava na `day`."""
+        return self.hours_between(employee_id, day - timedelta(days=6), day)
+
+    def max_week_hours(self, employee_id, day):
+        """Najveći broj sati u bilo kojem 7-dnevnom prozoru koji sadrži `day`."""
+        if employee_id not in self._employees:
+            return 0
+        # 13 dnevnih zbrojeva, pa klizni prozor od 7 dana
+        minutes_by_day = self._employees[employee_id].minutes_by_day
+        daily = [minutes_by_day.get(day + timedelta(days=offset), 0) for offset in range(-6, 7)]
+        window = sum(daily[:7])
+        best = window
+        for offset in range(7, 13):
+            window += daily[offset] - daily[offset - 7]
+            best = max(best, window)
+        return round(best / 60, 2)
+
+    def overlaps(self, employee_id, day, start_time, end_time, rest=None):
+        """Preklapa li se smjena s postojećim smjenama radnika (uz minimalni odmor između smjena)."""
+        if employee_id not in self._employees:
+            return False
+        start, end = shift_interval(day, start_time, end_time)
+        return self._employees[employee_id].overlaps(start, end, self.rest if rest is None else rest)
+
+    def subset(self, employee_ids):
+        """Novi indeks samo s intervalima zadanih radnika."""
+        index = IntervalIndex(rest=self.rest)
+        for employee_id in employee_ids:
+            if employee_id in self._employees:
+                index._employees[employee_id] = self._employees[employee_id].copy()
+        return index
+
+    @classmethod
+    def from_queryset(cls, queryset, rest=None):
+        index = cls(rest=rest)
+        for employee_id, day, start_time, end_time in queryset.filter(
+            employee__isnull=False, start_time__isnull=False, end_time__isnull=False
+        ).values_list('employee_id', 'date', 'start_time', 'end_time'):
+            index.add(employee_id, day, start_time, end_time)
+        return index
+
+    @classmethod
+    def around(cls, first_day, last_day, employee_ids=None, exclude=None):
+        """Indeks smjena u rasponu proširenom za tjedan s obje strane (za tjedne limite i smjene preko ponoći)."""
+        Shift = apps.get_model('nurse', 'Shift')
+        queryset = Shift.objects.filter(date__range=(first_day - timedelta(days=7), last_day + timedelta(days=7)))
+        if employee_ids is not None:
+            queryset = queryset.filter(employee_id__in=employee_ids)
+        if exclude is not None:
+            queryset = queryset.exclude(pk__in=exclude)
+        return cls.from_queryset(queryset)
+
+
+def shift_conflict(employee, day, start_time, end_time, exclude_pk=None):
+    """Vraća opis greške ako se smjena preklapa s drugim smjenama radnika, inače `None`."""
+    if employee is None or start_time is None or end_time is None:
+        return None
+    employee_id = getattr(employee, 'pk', employee)
+    index = IntervalIndex.around(day, day, employee_ids=[employee_id], exclude=[exclude_pk] if exclude_pk else None)
+    if index.overlaps(employee_id, day, start_time, end_time):
+        return "Shift overlaps another shift of this employee (or breaks the minimum rest period)."
+    return None
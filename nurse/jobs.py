@@ -0,0 +1,167 @@
+"""
+Pozadinsko generiranje rasporeda.
+
+Zahtjev za generiranje sprema se kao `ScheduleJob` red i odmah vraća ID posla.
+Poslove obrađuje lokalni thread pool (`NURSE_SCHEDULE_JOB_BACKEND = "thread"`, default)
+ili management komanda `process_schedule_jobs` (`"queue"`). Posao smije krenuti tek
+kad su završeni svi stariji poslovi s preklapajućim rasponom, pa si poslovi ne brišu
+smjene međusobno — i kad ih obrađuje više procesa.
+
+Posao koji radi javlja heartbeat svakih `NURSE_SCHEDULE_JOB_HEARTBEAT` sekundi. Ako
+worker padne (crash, deploy, OOM), posao bez heartbeata dulje od
+`NURSE_SCHEDULE_JOB_STALE_AFTER` sekundi označava se kao FAILED prije traženja
+sljedećeg posla, pa više ne blokira preklapajuće poslove.
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import ScheduleJob
+from .utils import generate_nurse_schedule_range
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'NURSE_SCHEDULE_JOB_WORKERS', 1),
+            thread_name_prefix='schedule-job',
+        )
+    return _executor
+
+
+def submit_schedule_job(start_date, end_date, departments=None, strategy='greedy', seed=None, parallel=False,
+                        workers=None, user=None):
+    """Sprema posao u red i (uz thread backend) pokreće obradu u pozadini."""
+    job = ScheduleJob.objects.create(
+        start_date=start_date,
+        end_date=end_date,
+        strategy=strategy,
+        seed=seed,
+        parallel=parallel,
+        workers=workers,
+        days_total=(end_date - start_date).days + 1,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    if departments:
+        job.departments.set(departments)
+
+    if getattr(settings, 'NURSE_SCHEDULE_JOB_BACKEND', 'thread') == 'thread':
+        get_executor().submit(_drain_in_thread)
+    return job
+
+
+def blocking_jobs(job):
+    """Stariji nedovršeni poslovi čiji se raspon preklapa s ovim poslom."""
+    return ScheduleJob.objects.filter(
+        Q(status=ScheduleJob.QUEUED) | Q(status=ScheduleJob.RUNNING),
+        pk__lt=job.pk,
+        start_date__lte=job.end_date,
+        end_date__gte=job.start_date,
+    )
+
+
+def fail_stale_jobs():
+    """Označava RUNNING poslove bez heartbeata dulje od `NURSE_SCHEDULE_JOB_STALE_AFTER` kao FAILED."""
+    cutoff = now() - timedelta(seconds=getattr(settings, 'NURSE_SCHEDULE_JOB_STALE_AFTER', 300))
+    return ScheduleJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=ScheduleJob.RUNNING,
+    ).update(
+        status=ScheduleJob.FAILED,
+        error="Worker stopped sending heartbeats (crashed or was stopped); job marked as failed.",
+        finished_at=now(),
+    )
+
+
+def claim_next_job():
+    """Preuzima najstariji posao koji smije krenuti; `None` ako takvog nema."""
+    fail_stale_jobs()
+    for job in ScheduleJob.objects.filter(status=ScheduleJob.QUEUED).order_by('pk'):
+        if blocking_jobs(job).exists():
+            continue
+        # Uvjetni update: samo jedan proces može preuzeti isti posao
+        claimed = ScheduleJob.objects.filter(pk=job.pk, status=ScheduleJob.QUEUED).update(
+            status=ScheduleJob.RUNNING, started_at=now(), heartbeat_at=now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+@contextmanager
+def heartbeat(job):
+    """Dok blok traje, zasebna dretva osvježava `heartbeat_at` (i kad generator ne javlja napredak, npr. uz parallel)."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(getattr(settings, 'NURSE_SCHEDULE_JOB_HEARTBEAT', 30)):
+                ScheduleJob.objects.filter(pk=job.pk, status=ScheduleJob.RUNNING).update(heartbeat_at=now())
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'schedule-job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    # Posao koji je u međuvremenu označen kao zastario ostaje FAILED
+    running = ScheduleJob.objects.filter(pk=job.pk, status=ScheduleJob.RUNNING)
+
+    def progress(day, shifts):
+        job.days_done = (day - job.start_date).days + 1
+        job.unfilled_slots += sum(1 for shift in shifts if shift.employee_id is None)
+        running.update(days_done=job.days_done, unfilled_slots=job.unfilled_slots, heartbeat_at=now())
+
+    try:
+        departments = list(job.departments.values_list('pk', flat=True)) or None
+        with heartbeat(job):
+            result = generate_nurse_schedule_range(
+                job.start_date, job.end_date, departments,
+                strategy=job.strategy, seed=job.seed, parallel=job.parallel, workers=job.workers,
+                progress=progress,
+            )
+    except Exception:
+        running.update(status=ScheduleJob.FAILED, error=traceback.format_exc(), finished_at=now())
+        return
+
+    running.update(
+        status=ScheduleJob.DONE,
+        days_done=job.days_total,
+        summary=result.summary(),
+        finished_at=now(),
+    )
+
+
+def process_jobs():
+    """Obrađuje poslove dok god ima onih koji smiju krenuti; vraća broj obrađenih."""
+    processed = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            return processed
+        run_job(job)
+        processed += 1
+
+
+def _drain_in_thread():
+    try:
+        process_jobs()
+    finally:
+        connections.close_all()
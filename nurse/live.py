@@ -0,0 +1,159 @@
+"""
+Live promjene rasporeda za otvorene ekrane (Server-Sent Events preko ASGI).
+
+Svaki otvoreni `schedule/stream/` je pretplata na odjel/prozor datuma. Jedan
+`Broadcaster` po procesu čita nove redove dnevnika promjena (changes.py) jednom za
+sve pretplatnike i svakome šalje samo smjene iz njegovog prozora - stotine ekrana
+ne znače stotine upita.
+
+`NURSE_LIVE_BACKEND`:
+- "memory": broadcaster se budi samo na promjene spremljene u istom procesu
+  (`changes.record` → `notify`); dovoljno za jedan ASGI worker.
+- "poll": uz to provjerava dnevnik svakih `NURSE_LIVE_POLL_INTERVAL` sekundi (jedan
+  upit po procesu), pa vidi i promjene iz drugih workera, admina i naredbi.
+
+Stream radi samo pod ASGI serverom (npr. `uvicorn hospital_scheduler.asgi:application`);
+schedule.html se pod WSGI vraća na periodički `schedule_changes`.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import changes
+
+logger = logging.getLogger('nurse.live')
+
+BACKENDS = ("memory", "poll")
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    """Jedan otvoreni stream; red poruka je ograničen, spori klijent dobiva `reset`."""
+
+    def __init__(self, start_date, end_date, department_id=None, employee_id=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.department_id = department_id
+        self.employee_id = employee_id
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def matches(self, department_id, day, employee_id):
+        return (
+            self.start_date <= day <= self.end_date
+            and (not self.department_id or department_id == self.department_id)
+            and (not self.employee_id or employee_id == self.employee_id)
+        )
+
+    def offer(self, version, rows, shifts, payloads):
+        """Šalje promjene iz prozora: smjena koja je i dalje u prozoru ide kao red, ostale kao brisanje."""
+        results, deleted = {}, {}
+        for shift_id, department_id, day, employee_id in rows:
+            if not self.matches(department_id, day, employee_id):
+                continue
+            shift = shifts.get(shift_id)
+            if shift and self.matches(shift.department_id, shift.date, shift.employee_id):
+                results[shift_id] = payloads[shift_id]
+                deleted.pop(shift_id, None)
+            else:
+                deleted[shift_id] = shift_id
+                results.pop(shift_id, None)
+        if not results and not deleted:
+            return
+        try:
+            self.queue.put_nowait({"version": version, "results": list(results.values()), "deleted": list(deleted)})
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broadcaster:
+    def __init__(self):
+        self.subscriptions = set()
+        self.version = None
+        self.loop = None
+        self._wakeup = None
+        self._task = None
+
+    @property
+    def backend(self):
+        backend = getattr(settings, 'NURSE_LIVE_BACKEND', 'memory')
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown live backend '{backend}' (choose from: {', '.join(BACKENDS)})")
+        return backend
+
+    async def subscribe(self, filters):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Prvi stream u procesu (ili nova petlja, npr. u testovima)
+            self.loop, self.subscriptions, self._wakeup, self._task = loop, set(), asyncio.Event(), None
+            self.version = None
+        if self.version is None:
+            self.version = await sync_to_async(changes.current_version)()
+        subscription = Subscription(**filters)
+        self.subscriptions.add(subscription)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    def notify(self):
+        """Budi broadcaster; sigurno iz bilo koje dretve (poziva se iz sinkronog koda nakon commita)."""
+        loop, wakeup = self.loop, self._wakeup
+        if loop is None or not self.subscriptions:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # Petlja je zatvorena
+            self.loop = None
+
+    async def _run(self):
+        timeout = getattr(settings, 'NURSE_LIVE_POLL_INTERVAL', 2.0) if self.backend == "poll" else None
+        while self.subscriptions:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.dispatch()
+            except Exception:
+                logger.exception("Live stream: čitanje promjena nije uspjelo")
+        self._task = None
+
+    async def dispatch(self):
+        """Čita sve nove promjene (u stranicama) i dijeli ih pretplatnicima."""
+        while True:
+            version, rows, shifts = await sync_to_async(changes.recent)(self.version)
+            if not rows:
+                return
+            self.version = version
+            # JSON smjene jednom za sve pretplatnike
+            payloads = {shift_id: changes.shift_json(shift) for shift_id, shift in shifts.items()}
+            for subscription in list(self.subscriptions):
+                subscription.offer(version, rows, shifts, payloads)
+            if len(rows) < changes.DEFAULT_LIMIT:
+                return
+
+
+broadcaster = Broadcaster()
+
+
+def notify():
+    broadcaster.notify()
+
+
+def sse(event, data, event_id=None):
+    """Jedna SSE poruka."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, cls=DjangoJSONEncoder)}"]
+    return "\n".join(lines) + "\n\n"
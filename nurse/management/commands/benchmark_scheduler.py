@@ -0,0 +1,165 @@
+import gc
+import json
+import logging
+import subprocess
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment
+from django.urls import reverse
+
+from nurse.models import Department, Employee, RequirementTemplate, Shift, ShiftRequirement
+from nurse.utils import generate_nurse_schedule_range
+
+
+class Command(BaseCommand):
+    help = (
+        "Mjeri generiranje rasporeda, stranicu rasporeda, admin liste i izvoze nad trenutnom bazom "
+        "(vrijeme, broj upita, vršna memorija). Sve promjene se na kraju poništavaju."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Prvi dan mjerenog tjedna (YYYY-MM-DD), default tekući tjedan.")
+        parser.add_argument('--days', type=int, default=7, help="Broj dana za generiranje i stranicu rasporeda.")
+        parser.add_argument('--strategies', default="greedy", help="Strategije generiranja, odvojene zarezom.")
+        parser.add_argument('--repeat', type=int, default=3, help="Ponavljanja po scenariju (uzima se najbrže).")
+        parser.add_argument('--only', help="Samo scenariji čiji naziv sadrži ovaj tekst.")
+        parser.add_argument('--output', help="Spremi rezultate u JSON datoteku.")
+        parser.add_argument('--compare', help="JSON s ranijim rezultatima za usporedbu.")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else date.today() - timedelta(days=date.today().weekday())
+        except ValueError:
+            raise CommandError("--start mora biti u formatu YYYY-MM-DD")
+        end = start + timedelta(days=options['days'] - 1)
+
+        # Test Client treba 'testserver' u ALLOWED_HOSTS
+        setup_test_environment()
+        # Log enginea po svakom generiranju samo bi zatrpao ispis mjerenja
+        logging.getLogger('nurse.engine').setLevel(logging.WARNING)
+
+        results = {}
+        with transaction.atomic():
+            client = Client()
+            client.force_login(User.objects.create_superuser("benchmark-runner", "", None))
+
+            for name, scenario in self.scenarios(client, start, end, options).items():
+                if options['only'] and options['only'] not in name:
+                    continue
+                results[name] = self.measure(scenario, options['repeat'])
+                self.stdout.write(
+                    f"⏱️ {name:<28} {results[name]['seconds'] * 1000:10.1f} ms "
+                    f"{results[name]['queries']:6d} upita {results[name]['peak_kb']:10.0f} KB"
+                )
+            transaction.set_rollback(True)
+
+        report = {
+            "commit": self.commit(),
+            "vendor": connection.vendor,
+            "range": [start.isoformat(), end.isoformat()],
+            "dataset": {
+                "departments": Department.objects.count(),
+                "employees": Employee.objects.count(),
+                "requirements": ShiftRequirement.objects.count(),
+                "templates": RequirementTemplate.objects.count(),
+                "shifts": Shift.objects.count(),
+            },
+            "results": results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Rezultati spremljeni u {options['output']}"))
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def scenarios(self, client, start, end, options):
+        window = {"start_date": start.isoformat(), "end_date": end.isoformat()}
+        department = Department.objects.order_by('pk').first()
+
+        def get(url, params=None):
+            def run():
+                response = client.get(url, params or {})
+                if response.status_code != 200:
+                    raise CommandError(f"{url} je vratio {response.status_code}")
+                # Streaming odgovori (CSV, Excel, PDF) se moraju pročitati do kraja
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            return run
+
+        def generate(strategy):
+            def run():
+                generate_nurse_schedule_range(start, end, strategy=strategy, seed=0)
+            return run
+
+        def pdf():
+            # Prazan cache za svako mjerenje, da se mjeri crtanje a ne čitanje s diska
+            with tempfile.TemporaryDirectory() as directory, override_settings(NURSE_PDF_CACHE_DIR=directory):
+                get(reverse('export_schedule_pdf'), {"department": department.pk, "start_date": start.isoformat()})()
+
+        scenarios = {
+            f"generate_{strategy}": generate(strategy)
+            for strategy in options['strategies'].split(',') if strategy
+        }
+        scenarios.update({
+            "schedule_page": get(reverse('nurse_schedule'), window),
+            "schedule_data": get(reverse('schedule_data'), window),
+            "admin_shift_changelist": get(reverse('admin:nurse_shift_changelist')),
+            "admin_employee_changelist": get(reverse('admin:nurse_employee_changelist')),
+            "export_csv": get(reverse('export_schedule_csv'), window),
+            "export_excel": get(reverse('export_schedule_excel'), window),
+        })
+        if department is not None:
+            scenarios["export_pdf"] = pdf
+        return scenarios
+
+    def measure(self, scenario, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            gc.collect()
+            started = perf_counter()
+            scenario()
+            timings.append(perf_counter() - started)
+
+        # Upiti i memorija se mjere u zasebnom prolazu jer tracemalloc usporava izvođenje
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                scenario()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {"seconds": round(min(timings), 4), "queries": len(queries), "peak_kb": round(peak / 1024, 1)}
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, report, path):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write(f"\n📊 Usporedba s {path} (commit {baseline.get('commit')})")
+        for name, current in report["results"].items():
+            previous = baseline.get("results", {}).get(name)
+            if previous is None:
+                self.stdout.write(f"   {name:<28} (nema u baseline)")
+                continue
+            change = (current["seconds"] - previous["seconds"]) / previous["seconds"] * 100 if previous["seconds"] else 0
+            self.stdout.write(
+                f"   {name:<28} {previous['seconds'] * 1000:9.1f} → {current['seconds'] * 1000:9.1f} ms ({change:+.0f}%)"
+                f"  upiti {previous['queries']} → {current['queries']}"
+                f"  memorija {previous['peak_kb']:.0f} → {current['peak_kb']:.0f} KB"
+            )
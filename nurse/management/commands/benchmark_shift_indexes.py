@@ -0,0 +1,146 @@
+import json
+from datetime import date, time, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from nurse.models import Department, Employee, Role, Shift, ShiftRequirement
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Uspoređuje planove i vremena glavnih upita nad Shift/ShiftRequirement sa i bez indeksa "
+        "iz Meta.indexes, na generiranim podacima. Sve se radi u transakciji koja se na kraju poništava."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shifts', type=int, default=1_000_000, help="Broj generiranih smjena.")
+        parser.add_argument('--days', type=int, default=365, help="Broj dana povijesti.")
+        parser.add_argument('--departments', type=int, default=20, help="Broj odjela.")
+        parser.add_argument('--repeat', type=int, default=5, help="Ponavljanja po upitu (uzima se najbrže).")
+        parser.add_argument('--json', dest='json_path', help="Spremi rezultate u JSON datoteku.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = perf_counter()
+            sample = self.populate(options['shifts'], options['days'], options['departments'])
+            self.stdout.write(f"📦 Generirano {options['shifts']} smjena za {perf_counter() - started:.1f}s")
+
+            queries = self.queries(sample)
+            after = self.measure(queries, options['repeat'], 'after')
+            self.drop_indexes()
+            before = self.measure(queries, options['repeat'], 'before')
+            transaction.set_rollback(True)
+
+        results = []
+        for label in queries:
+            results.append({"query": label, "before": before[label], "after": after[label]})
+            self.stdout.write(
+                f"\n🔎 {label}\n"
+                f"   bez indeksa: {before[label]['ms']:.2f} ms\n      {before[label]['plan']}\n"
+                f"   s indeksima: {after[label]['ms']:.2f} ms\n      {after[label]['plan']}"
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump({"vendor": connection.vendor, "options": {
+                    key: options[key] for key in ('shifts', 'days', 'departments', 'repeat')
+                }, "results": results}, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n✅ Rezultati spremljeni u {options['json_path']}"))
+
+    def populate(self, shift_count, days, department_count):
+        """Jedna smjena po radniku po danu (bez preklapanja); vraća uzorak ID-eva za upite."""
+        first_day = date.today() - timedelta(days=days)
+        employee_count = max(shift_count // days, 1)
+
+        departments = Department.objects.bulk_create(
+            [Department(name=f"Benchmark {n}") for n in range(department_count)]
+        )
+        role = Role.objects.create(name="Benchmark", department=departments[0])
+        employees = Employee.objects.bulk_create([
+            Employee(first_name="Bench", last_name=str(n), max_weekly_hours=40, max_daily_hours=12)
+            for n in range(employee_count)
+        ], batch_size=BATCH_SIZE)
+        Employee.departments.through.objects.bulk_create([
+            Employee.departments.through(employee_id=employee.pk, department_id=departments[n % department_count].pk)
+            for n, employee in enumerate(employees)
+        ], batch_size=BATCH_SIZE)
+
+        # Punjenje ide preko _base_managera: bez dnevnika promjena i osvježavanja zbirnih tablica
+        # (sve se ionako poništava), pa mjerenje punjenja i upita ne uključuje taj posao
+        ShiftRequirement._base_manager.bulk_create([
+            ShiftRequirement(department=department, date=first_day + timedelta(days=offset), required_hours=24)
+            for offset in range(days) for department in departments
+        ], batch_size=BATCH_SIZE)
+
+        batch = []
+        created = 0
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            for n, employee in enumerate(employees):
+                if created >= shift_count:
+                    break
+                shift = Shift(
+                    employee_id=employee.pk, department_id=departments[n % department_count].pk, role=role,
+                    date=day, start_time=time(8), end_time=time(16),
+                )
+                shift.sync_span()
+                batch.append(shift)
+                created += 1
+                if len(batch) >= BATCH_SIZE:
+                    Shift._base_manager.bulk_create(batch)
+                    batch = []
+        if batch:
+            Shift._base_manager.bulk_create(batch)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        return {
+            "day": first_day + timedelta(days=days // 2),
+            "employee_id": employees[len(employees) // 2].pk,
+            "department_id": departments[len(departments) // 2].pk,
+        }
+
+    def queries(self, sample):
+        day, week = sample["day"], (sample["day"], sample["day"] + timedelta(days=6))
+        return {
+            "Shift po datumu (stranica rasporeda)": lambda: Shift.objects.filter(
+                date__range=week).order_by('date', 'start_time', 'id')[:200],
+            "Shift po (employee, date) (preklapanja, tjedni limiti)": lambda: Shift.objects.filter(
+                employee_id=sample["employee_id"], date__range=(day - timedelta(days=7), day + timedelta(days=7))),
+            "Shift po (department, date) (generiranje, PDF)": lambda: Shift.objects.filter(
+                department_id=sample["department_id"], date__range=week),
+            "ShiftRequirement po datumu": lambda: ShiftRequirement.objects.filter(date__range=week),
+            "ShiftRequirement po (department, date)": lambda: ShiftRequirement.objects.filter(
+                department_id=sample["department_id"], date__range=week),
+        }
+
+    def measure(self, queries, repeat, phase):
+        results = {}
+        for label, build in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = perf_counter()
+                list(build())
+                timings.append((perf_counter() - started) * 1000)
+            results[label] = {"ms": round(min(timings), 3), "plan": self.explain(build(), phase)}
+        return results
+
+    def explain(self, queryset, phase):
+        # Komentar mijenja tekst upita: sqlite3 inače vrati plan iz cachea pripremljenih upita
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} /* {phase} */ {sql}", params)
+            return " | ".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+
+    def drop_indexes(self):
+        # DROP INDEX radi unutar transakcije i na SQLite i na PostgreSQL (schema_editor ne bi na SQLite)
+        with connection.cursor() as cursor:
+            for model in (Shift, ShiftRequirement):
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+
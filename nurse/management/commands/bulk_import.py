@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nurse.imports import BATCH_SIZE, IMPORTERS, import_file
+
+
+class Command(BaseCommand):
+    help = "Skupni uvoz radnika ili zahtjeva smjena iz CSV/XLSX datoteke (sve ili ništa)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help="CSV (UTF-8) ili XLSX datoteka s nazivima stupaca u prvom retku.")
+        parser.add_argument('--dry-run', action='store_true', help="Samo prikaži razliku, ništa ne spremaj.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--json', action='store_true', help="Ispiši izvještaj kao JSON.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"Datoteka {path} ne postoji.")
+        with path.open('rb') as file:
+            report = import_file(options['kind'], file, path.name, options['dry_run'], options['batch_size'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report.as_dict(), indent=2))
+        if options['dry_run']:
+            for line, action, label, fields in report.diff:
+                changes = ", ".join(f"{field}: {old} → {new}" for field, (old, new) in fields.items())
+                self.stdout.write(f"{'+' if action == 'create' else '~'} [{line}] {label} ({changes})")
+        for line, message in report.errors:
+            self.stderr.write(f"[{line}] {message}")
+
+        style = self.style.SUCCESS if report.ok else self.style.ERROR
+        self.stdout.write(style(report.summary()))
+        if not report.ok:
+            raise CommandError("Uvoz nije uspio.")
@@ -0,0 +1,49 @@
+import json
+import logging
+from datetime import date
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nurse.synthetic import clear_hospital, generate_hospital, synthetic_departments
+
+
+class Command(BaseCommand):
+    help = "Generira ponovljivu sintetičku bolnicu (odjeli, uloge, radnici, dostupnost, odsustva, zahtjevi, povijest smjena)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=10)
+        parser.add_argument('--roles', type=int, default=3, help="Broj uloga po odjelu.")
+        parser.add_argument('--employees', type=int, default=40, help="Broj radnika po odjelu.")
+        parser.add_argument('--availability', type=float, default=0.8, help="Vjerojatnost da radnik radi pojedini dan u tjednu.")
+        parser.add_argument('--time-off-rate', type=float, default=0.05, help="Vjerojatnost odsustva radnika u tjednu.")
+        parser.add_argument('--shared-rate', type=float, default=0.05, help="Udio radnika koji rade i u drugom odjelu.")
+        parser.add_argument('--weeks', type=int, default=8, help="Tjedni povijesti (popunjavaju se smjenama).")
+        parser.add_argument('--future-weeks', type=int, default=1, help="Tjedni unaprijed (samo zahtjevi).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--today', type=date.fromisoformat, default=None,
+                            help="Datum od kojeg se računaju tjedni (YYYY-MM-DD, zadano danas); isti datum i seed daju iste podatke.")
+        parser.add_argument('--prefix', default="Ward", help="Prefiks naziva generiranih odjela.")
+        parser.add_argument('--clear', action='store_true', help="Prvo obriši ranije generirane odjele s istim prefiksom.")
+        parser.add_argument('--verbose-engine', action='store_true', help="Prikaži detaljan log enginea tijekom generiranja povijesti.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear_hospital(options['prefix'])
+            self.stdout.write(f"🗑️ Obrisano {deleted} redova ranije generiranih podataka")
+        elif synthetic_departments(options['prefix']).exists():
+            raise CommandError(f"Odjeli s prefiksom '{options['prefix']}' već postoje; dodaj --clear ili drugi --prefix.")
+
+        started = perf_counter()
+        parameters = {
+            key: options[key] for key in (
+                'departments', 'roles', 'employees', 'availability', 'time_off_rate',
+                'weeks', 'future_weeks', 'shared_rate', 'seed', 'prefix', 'today',
+            )
+        }
+        if options['verbose_engine']:
+            logging.getLogger('nurse.engine').setLevel(logging.DEBUG)
+        stats = generate_hospital(**parameters)
+
+        self.stdout.write(json.dumps(stats, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"✅ Bolnica generirana za {perf_counter() - started:.1f}s"))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from nurse.jobs import process_jobs
+
+
+class Command(BaseCommand):
+    help = "Obrađuje ScheduleJob poslove iz reda (za NURSE_SCHEDULE_JOB_BACKEND = 'queue')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Radi kao worker i stalno provjerava red.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Pauza između provjera reda (sekunde).")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_jobs()
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"✅ Obrađeno poslova: {processed}"))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
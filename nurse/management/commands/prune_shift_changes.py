@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from nurse.changes import prune
+
+
+class Command(BaseCommand):
+    help = "Briše stare redove dnevnika promjena smjena; klijenti sa starijim tokenom ponovno učitavaju raspored."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Čuva promjene iz zadnjih N dana (zadano 30)")
+
+    def handle(self, *args, **options):
+        deleted = prune(now() - timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"✅ Obrisano {deleted} promjena starijih od {options['days']} dana"))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from nurse.coverage import rebuild
+
+
+class Command(BaseCommand):
+    help = "Ponovno računa zbirnu statistiku pokrivenosti (nakon uvoza ili promjena smjena mimo ORM-a)."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            days, weeks = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {days} redova (odjel, dan) i {weeks} redova (radnik, tjedan) za {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,29 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nurse.pdf import render_rosters, week_start
+
+
+class Command(BaseCommand):
+    help = "Crta PDF rasporede svih (ili zadanih) odjela za tjedan; nepromijenjeni tjedni se čitaju iz cachea."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--week', help="Bilo koji datum u tjednu (YYYY-MM-DD), default tekući tjedan.")
+        parser.add_argument('--department', type=int, action='append', help="ID odjela (može više puta).")
+        parser.add_argument('--workers', type=int, default=None, help="Broj procesa za crtanje.")
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['week']) if options['week'] else date.today()
+        except ValueError:
+            raise CommandError("--week mora biti u formatu YYYY-MM-DD")
+
+        started = time.perf_counter()
+        paths = render_rosters(day, options['department'], workers=options['workers'])
+        for department_id, path in paths.items():
+            self.stdout.write(f"📄 {department_id}: {path}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(paths)} PDF-ova za tjedan {week_start(day)} ({time.perf_counter() - started:.2f}s)"
+        ))
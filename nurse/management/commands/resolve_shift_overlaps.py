@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from nurse.repair import overlapping_shifts, resolve_overlaps
+
+
+class Command(BaseCommand):
+    help = (
+        "Razrješava smjene koje se preklapaju s drugom smjenom istog radnika (potrebno prije migracije "
+        "0011): kasnija smjena dobiva zamjenu ili ostaje nepopunjena. Promjene idu u dnevnik i zbirne tablice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Samo ispiši smjene koje se preklapaju")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            shifts = overlapping_shifts()
+            for shift in shifts:
+                self.stdout.write(f"#{shift.pk} {shift.date} {shift.start_time:%H:%M}-{shift.end_time:%H:%M} "
+                                  f"radnik {shift.employee_id}")
+            self.stdout.write(f"🔍 {len(shifts)} smjena se preklapa s ranijom smjenom istog radnika")
+            return
+
+        changes = resolve_overlaps()
+        for change in changes:
+            self.stdout.write(
+                f"#{change['shift_id']} {change['date']} {change['start_time']}-{change['end_time']}: "
+                f"{change['action']} ({change['from_employee_id']} → {change['to_employee_id']})"
+            )
+        self.stdout.write(self.style.SUCCESS(f"✅ Razriješeno {len(changes)} preklapanja"))
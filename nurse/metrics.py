@@ -0,0 +1,224 @@
+"""
+Mjerenje upita i trajanja po zahtjevu (uključuje se s `NURSE_METRICS_ENABLED = True`).
+
+`QueryMetricsMiddleware` za svaki zahtjev bilježi broj SQL upita, vrijeme u bazi,
+ponovljene upite (isti SQL više puta - tipičan N+1), Python vrijeme i, uz
+`NURSE_METRICS_TRACE_MEMORY = True`, vršnu memoriju (tracemalloc; za streaming
+odgovore samo do početka streama). Rezultat ide u `Server-Timing` header i u zbirne metrike po viewu koje
+`metrics_view` vraća u Prometheus tekstualnom formatu.
+
+Budžeti upita: `@query_budget(n)` na viewu ili `NURSE_QUERY_BUDGETS = {"url_name": n}`
+(npr. za admin). Prekoračenje se logira; uz `NURSE_QUERY_BUDGET_STRICT = True`
+(u testovima) zahtjev baca `QueryBudgetExceeded`.
+
+Kad je isključeno, middleware se ne učitava (`MiddlewareNotUsed`) pa nema troška.
+"""
+import logging
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger('nurse.metrics')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Označava view najvećim dopuštenim brojem SQL upita po zahtjevu."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return view(*args, **kwargs)
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+class QueryRecorder:
+    """`execute_wrapper` koji broji upite, mjeri vrijeme i pamti SQL po kojem se traže duplikati."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - started
+            self.count += 1
+            self.fingerprints[sql] += 1
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class MetricsRegistry:
+    """Zbirne metrike po viewu (u memoriji procesa)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.views = defaultdict(lambda: {
+            "requests": 0, "queries": 0, "db_seconds": 0.0, "seconds": 0.0,
+            "duplicate_queries": 0, "max_queries": 0, "peak_bytes": 0, "budget_exceeded": 0,
+        })
+
+    def record(self, view, sample):
+        with self._lock:
+            row = self.views[view]
+            row["requests"] += 1
+            row["queries"] += sample["queries"]
+            row["db_seconds"] += sample["db_seconds"]
+            row["seconds"] += sample["seconds"]
+            row["duplicate_queries"] += sample["duplicate_queries"]
+            row["max_queries"] = max(row["max_queries"], sample["queries"])
+            row["peak_bytes"] = max(row["peak_bytes"], sample["peak_bytes"])
+            row["budget_exceeded"] += sample["budget_exceeded"]
+
+    def prometheus(self):
+        metrics = [
+            ("nurse_requests_total", "counter", "requests", "Broj zahtjeva."),
+            ("nurse_db_queries_total", "counter", "queries", "Broj SQL upita."),
+            ("nurse_db_seconds_total", "counter", "db_seconds", "Vrijeme u bazi."),
+            ("nurse_request_seconds_total", "counter", "seconds", "Ukupno trajanje zahtjeva."),
+            ("nurse_duplicate_queries_total", "counter", "duplicate_queries", "Ponovljeni upiti (isti SQL)."),
+            ("nurse_query_budget_exceeded_total", "counter", "budget_exceeded", "Prekoračenja budžeta upita."),
+            ("nurse_max_queries", "gauge", "max_queries", "Najveći broj upita u jednom zahtjevu."),
+            ("nurse_peak_memory_bytes", "gauge", "peak_bytes", "Najveća vršna memorija zahtjeva."),
+        ]
+        with self._lock:
+            views = {view: dict(row) for view, row in self.views.items()}
+        lines = []
+        for name, kind, key, description in metrics:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for view, row in sorted(views.items()):
+                label = view.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{name}{{view="{label}"}} {row[key]}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'NURSE_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # tracemalloc usporava svaku alokaciju i globalan je za proces (točan samo kad se zahtjevi
+        # ne obrađuju paralelno), pa se uključuje samo izričito
+        self.trace_memory = getattr(settings, 'NURSE_METRICS_TRACE_MEMORY', False)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        peak = 0
+        if tracing:
+            tracemalloc.start()
+        started = perf_counter()
+        wrappers = ExitStack()
+        for alias in connections:
+            wrappers.enter_context(connections[alias].execute_wrapper(recorder))
+
+        def stop_tracing():
+            nonlocal tracing, peak
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                tracing = False
+
+        def finish():
+            wrappers.close()
+            stop_tracing()
+            self.record(request, recorder, perf_counter() - started, peak)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            finish()
+            raise
+
+        response['Server-Timing'] = ", ".join([
+            f'db;dur={recorder.seconds * 1000:.1f};desc="{recorder.count} queries"',
+            f'app;dur={(perf_counter() - started - recorder.seconds) * 1000:.1f}',
+            f'total;dur={(perf_counter() - started) * 1000:.1f}',
+        ])
+
+        if response.streaming:
+            # Upiti streaming odgovora (izvozi) se izvršavaju tek dok se sadržaj čita; memorija se
+            # ne prati dok stream traje (dugi izvozi, SSE), bilježi se samo vrh do početka streama
+            stop_tracing()
+            stream = self.astream if response.is_async else self.stream
+            response.streaming_content = stream(response.streaming_content, finish)
+        else:
+            finish()
+        return response
+
+    def stream(self, content, finish):
+        try:
+            yield from content
+        finally:
+            finish()
+
+    async def astream(self, content, finish):
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            finish()
+
+    def record(self, request, recorder, seconds, peak):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or request.path
+        budget = self.budget(match)
+        exceeded = budget is not None and recorder.count > budget
+
+        registry.record(view, {
+            "queries": recorder.count,
+            "db_seconds": recorder.seconds,
+            "seconds": seconds,
+            "duplicate_queries": sum(count - 1 for count in recorder.duplicates.values()),
+            "peak_bytes": peak,
+            "budget_exceeded": int(exceeded),
+        })
+
+        for sql, count in recorder.duplicates.items():
+            logger.warning("%s: upit ponovljen %d puta: %s", view, count, sql[:200])
+        if exceeded:
+            message = f"{view}: {recorder.count} SQL upita, budžet je {budget}"
+            if getattr(settings, 'NURSE_QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def budget(self, match):
+        if match is None:
+            return None
+        budgets = getattr(settings, 'NURSE_QUERY_BUDGETS', {})
+        if match.view_name in budgets:
+            return budgets[match.view_name]
+        return getattr(match.func, 'query_budget', None)
+
+
+def metrics_view(request):
+    """Prometheus metrike; samo kad je mjerenje uključeno i samo s dopuštenih adresa."""
+    allowed = getattr(settings, 'NURSE_METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if not getattr(settings, 'NURSE_METRICS_ENABLED', False) or request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404
+    return HttpResponse(registry.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0002_alter_shift_employee_alter_shift_end_time_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('strategy', models.CharField(default='greedy', max_length=20)),
+                ('seed', models.IntegerField(blank=True, null=True)),
+                ('days_total', models.PositiveIntegerField(default=0)),
+                ('days_done', models.PositiveIntegerField(default=0)),
+                ('unfilled_slots', models.PositiveIntegerField(default=0)),
+                ('summary', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('departments', models.ManyToManyField(blank=True, to='nurse.department')),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:09
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.timezone import make_aware
+
+
+def backfill_shift_span(apps, schema_editor):
+    """Popunjava start_at / end_at / duration_minutes za postojeće smjene (u komadima)."""
+    Shift = apps.get_model('nurse', 'Shift')
+    batch = []
+    queryset = Shift.objects.filter(start_time__isnull=False, end_time__isnull=False).only(
+        'pk', 'date', 'start_time', 'end_time'
+    )
+    for shift in queryset.iterator(chunk_size=2000):
+        start_at = datetime.combine(shift.date, shift.start_time.replace(second=0, microsecond=0))
+        end_at = datetime.combine(shift.date, shift.end_time.replace(second=0, microsecond=0))
+        if end_at < start_at:
+            end_at += timedelta(days=1)
+        shift.duration_minutes = int((end_at - start_at).total_seconds() // 60)
+        if settings.USE_TZ:
+            start_at, end_at = make_aware(start_at), make_aware(end_at)
+        shift.start_at, shift.end_at = start_at, end_at
+        batch.append(shift)
+        if len(batch) >= 2000:
+            Shift.objects.bulk_update(batch, ['start_at', 'end_at', 'duration_minutes'])
+            batch = []
+    if batch:
+        Shift.objects.bulk_update(batch, ['start_at', 'end_at', 'duration_minutes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0003_schedulejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shift',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='end_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='start_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_shift_span, migrations.RunPython.noop),
+    ]
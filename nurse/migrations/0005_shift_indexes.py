@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:10
+
+from django.db import migrations, models
+
+# Zaštita od preklapanja smjena je u migraciji 0011 (tek kad postoje dnevnik promjena i zbirne tablice)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0004_shift_duration'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['date'], name='nurse_shift_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['employee', 'date'], name='nurse_shift_emp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['department', 'date'], name='nurse_shift_dept_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shiftrequirement',
+            index=models.Index(fields=['date'], name='nurse_req_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shiftrequirement',
+            index=models.Index(fields=['department', 'date'], name='nurse_req_dept_date_idx'),
+        ),
+    ]
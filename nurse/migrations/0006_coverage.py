@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:32
+
+from collections import defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_coverage(apps, schema_editor):
+    """Popunjava zbirne tablice iz postojećih smjena i zahtjeva (grupirani upiti)."""
+    Shift = apps.get_model('nurse', 'Shift')
+    ShiftRequirement = apps.get_model('nurse', 'ShiftRequirement')
+    DepartmentDayCoverage = apps.get_model('nurse', 'DepartmentDayCoverage')
+    EmployeeWeekHours = apps.get_model('nurse', 'EmployeeWeekHours')
+
+    days = defaultdict(dict)
+    open_shift = Q(employee__isnull=True)
+    for row in Shift.objects.values('department_id', 'date').annotate(
+        assigned_minutes=Sum('duration_minutes', filter=~open_shift),
+        unfilled_minutes=Sum('duration_minutes', filter=open_shift),
+        shift_count=Count('pk'),
+        unfilled_count=Count('pk', filter=open_shift),
+    ).order_by():
+        key = (row.pop('department_id'), row.pop('date'))
+        days[key].update({name: value or 0 for name, value in row.items()})
+    for row in ShiftRequirement.objects.values('department_id', 'date').annotate(
+        required_hours=Sum('required_hours')
+    ).order_by():
+        days[(row['department_id'], row['date'])]['required_hours'] = row['required_hours']
+    DepartmentDayCoverage.objects.bulk_create([
+        DepartmentDayCoverage(department_id=department_id, date=day, **values)
+        for (department_id, day), values in days.items()
+    ], batch_size=2000)
+
+    weeks = defaultdict(lambda: {'minutes': 0, 'shift_count': 0})
+    for employee_id, day, minutes, shift_count in (
+        Shift.objects.filter(employee__isnull=False).values('employee_id', 'date')
+        .annotate(minutes=Sum('duration_minutes'), shift_count=Count('pk'))
+        .order_by().values_list('employee_id', 'date', 'minutes', 'shift_count')
+    ):
+        week = weeks[(employee_id, day - timedelta(days=day.weekday()))]
+        week['minutes'] += minutes
+        week['shift_count'] += shift_count
+    EmployeeWeekHours.objects.bulk_create([
+        EmployeeWeekHours(employee_id=employee_id, week_start=week_start, **values)
+        for (employee_id, week_start), values in weeks.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0005_shift_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentDayCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('required_hours', models.PositiveIntegerField(default=0)),
+                ('assigned_minutes', models.PositiveIntegerField(default=0)),
+                ('unfilled_minutes', models.PositiveIntegerField(default=0)),
+                ('shift_count', models.PositiveIntegerField(default=0)),
+                ('unfilled_count', models.PositiveIntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nurse.department')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='nurse_coverage_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('department', 'date'), name='nurse_coverage_dept_date_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeWeekHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('minutes', models.PositiveIntegerField(default=0)),
+                ('shift_count', models.PositiveIntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nurse.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week_start'], name='nurse_week_hours_week_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'week_start'), name='nurse_week_hours_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_coverage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0006_coverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftChange',
+            fields=[
+                ('version', models.BigAutoField(primary_key=True, serialize=False)),
+                ('shift_id', models.BigIntegerField()),
+                ('department_id', models.BigIntegerField()),
+                ('employee_id', models.BigIntegerField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
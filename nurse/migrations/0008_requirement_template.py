@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0007_shift_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequirementTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], help_text='Prazno = svaki dan.', null=True)),
+                ('every_weeks', models.PositiveSmallIntegerField(default=1, help_text='1 = svaki tjedan, 2 = svaki drugi (od valid_from)...')),
+                ('valid_from', models.DateField()),
+                ('valid_until', models.DateField(blank=True, help_text='Prazno = bez kraja.', null=True)),
+                ('required_hours', models.PositiveIntegerField()),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nurse.department')),
+                ('required_roles', models.ManyToManyField(to='nurse.role')),
+                ('shift_types', models.ManyToManyField(to='nurse.shifttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['department', 'valid_from'], name='nurse_template_dept_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0008_requirement_template'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulejob',
+            name='parallel',
+            field=models.BooleanField(default=False, help_text='Grupe odjela bez zajedničkih radnika u zasebnim procesima.'),
+        ),
+        migrations.AddField(
+            model_name='schedulejob',
+            name='workers',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Broj procesa uz parallel (prazno = broj CPU-a).', null=True),
+        ),
+    ]
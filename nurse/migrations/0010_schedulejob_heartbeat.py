@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0009_schedulejob_parallel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulejob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
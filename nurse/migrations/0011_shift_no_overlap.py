@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:20
+
+from django.db import migrations
+
+# Baza odbija smjenu koja se preklapa s drugom smjenom istog radnika.
+# Postojeća preklapanja (stari generator ih je mogao napraviti) migracija ne dira: ako ih ima,
+# prekida se s popisom ID-eva, a razrješava ih `manage.py resolve_shift_overlaps` preko običnog
+# managera (dnevnik promjena i zbirne tablice ostaju točni). Zato je ovo iza migracija 0006 i 0007.
+# PostgreSQL ne podržava NOT VALID za EXCLUDE, pa constraint mora vrijediti za sve redove.
+# PostgreSQL: exclusion constraint nad (employee_id, [start_at, end_at)) uz btree_gist.
+# SQLite: triggeri; smjene traju najviše 24h pa je dovoljno gledati susjedne datume
+# (koristi indeks (employee, date)). Ostale baze se oslanjaju na provjeru u aplikaciji.
+OVERLAP_MESSAGE = "nurse_shift_no_overlap: employee already has an overlapping shift"
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE nurse_shift ADD CONSTRAINT nurse_shift_no_overlap EXCLUDE USING gist (
+        employee_id WITH =, tstzrange(start_at, end_at, '[)') WITH &&
+    ) WHERE (employee_id IS NOT NULL AND start_at IS NOT NULL AND end_at IS NOT NULL)
+    """,
+]
+POSTGRES_BACKWARD = ["ALTER TABLE nurse_shift DROP CONSTRAINT IF EXISTS nurse_shift_no_overlap"]
+
+SQLITE_OVERLAP_CHECK = """
+    NEW.employee_id IS NOT NULL AND NEW.start_at IS NOT NULL AND NEW.end_at IS NOT NULL AND EXISTS (
+        SELECT 1 FROM nurse_shift
+        WHERE employee_id = NEW.employee_id {exclude_self}
+          AND date BETWEEN date(NEW.date, '-1 day') AND date(NEW.date, '+1 day')
+          AND start_at < NEW.end_at AND end_at > NEW.start_at
+    )
+"""
+SQLITE_FORWARD = [
+    f"""
+    CREATE TRIGGER nurse_shift_no_overlap_insert BEFORE INSERT ON nurse_shift
+    WHEN {SQLITE_OVERLAP_CHECK.format(exclude_self="")}
+    BEGIN SELECT RAISE(ABORT, '{OVERLAP_MESSAGE}'); END
+    """,
+    f"""
+    CREATE TRIGGER nurse_shift_no_overlap_update BEFORE UPDATE OF employee_id, date, start_at, end_at ON nurse_shift
+    WHEN {SQLITE_OVERLAP_CHECK.format(exclude_self="AND id != NEW.id")}
+    BEGIN SELECT RAISE(ABORT, '{OVERLAP_MESSAGE}'); END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS nurse_shift_no_overlap_insert",
+    "DROP TRIGGER IF EXISTS nurse_shift_no_overlap_update",
+]
+
+
+def check_no_overlapping_shifts(apps, schema_editor):
+    Shift = apps.get_model('nurse', 'Shift')
+    overlapping = []
+    employee_id, latest_end = None, None
+    for pk, shift_employee_id, start_at, end_at in Shift.objects.using(schema_editor.connection.alias).filter(
+        employee__isnull=False, start_at__isnull=False, end_at__isnull=False
+    ).order_by('employee_id', 'start_at', 'pk').values_list('pk', 'employee_id', 'start_at', 'end_at').iterator():
+        if shift_employee_id == employee_id and start_at < latest_end:
+            overlapping.append(pk)
+            continue
+        if shift_employee_id != employee_id or end_at > latest_end:
+            employee_id, latest_end = shift_employee_id, end_at
+    if overlapping:
+        raise RuntimeError(
+            f"{len(overlapping)} smjena se preklapa s ranijom smjenom istog radnika: "
+            f"{overlapping[:50]}{' ...' if len(overlapping) > 50 else ''}. "
+            "Pokrenite `python manage.py resolve_shift_overlaps` pa ponovno `migrate`."
+        )
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def add_overlap_guard(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD})
+
+
+def remove_overlap_guard(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0010_schedulejob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_no_overlapping_shifts, migrations.RunPython.noop),
+        migrations.RunPython(add_overlap_guard, remove_overlap_guard),
+    ]
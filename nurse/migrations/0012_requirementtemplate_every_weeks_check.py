@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:31
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse', '0011_shift_no_overlap'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='requirementtemplate',
+            name='every_weeks',
+            field=models.PositiveSmallIntegerField(default=1, help_text='1 = svaki tjedan, 2 = svaki drugi (od valid_from)...', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddConstraint(
+            model_name='requirementtemplate',
+            constraint=models.CheckConstraint(condition=models.Q(('every_weeks__gte', 1)), name='nurse_template_every_weeks_gte_1'),
+        ),
+    ]
@@ -1,6 +1,15 @@
-from django.db import models
+from functools import wraps
+
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import changes, coverage
 
 DAYS_OF_WEEK = [
     ('Monday', 'Monday'), ('Tuesday', 'Tuesday'), ('Wednesday', 'Wednesday'),
@@ -15,10 +24,17 @@ class Department(models.Model):
         return self.name
 
 # === ROLE ===
+class RoleManager(models.Manager):
+    # __str__ koristi odjel; bez ovoga admin filteri i selecti rade upit po ulozi
+    def get_queryset(self):
+        return super().get_queryset().select_related('department')
+
 class Role(models.Model):
     name = models.CharField(max_length=100, unique=True)
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
 
+    objects = RoleManager()
+
     def __str__(self):
         return f"{self.name} ({self.department.name})"
 
@@ -32,11 +48,27 @@ class ShiftType(models.Model):
     def __str__(self):
         return f"{self.name} ({self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')})"
 
-from django.utils.timezone import now
-from datetime import timedelta
+from django.utils.timezone import make_aware, now
+from datetime import date, datetime, timedelta
 from django.apps import apps
 
 # === EMPLOYEE MODEL ===
+class EmployeeQuerySet(models.QuerySet):
+    def with_hours_last_week(self):
+        """Dodaje `minutes_last_week` (minute smjena u zadnjih 7 dana) kao podupit - bez upita po radniku."""
+        Shift = apps.get_model('nurse', 'Shift')
+        minutes = (
+            Shift.objects.filter(
+                employee=OuterRef('pk'), date__gte=now().date() - timedelta(days=7),
+                start_time__isnull=False, end_time__isnull=False,
+            )
+            .order_by()
+            .values('employee')
+            .annotate(total=Sum(shift_minutes_expression()))
+            .values('total')
+        )
+        return self.annotate(minutes_last_week=Coalesce(Subquery(minutes), 0))
+
 class Employee(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -48,15 +80,18 @@ class Employee(models.Model):
     can_work_shifts = models.ManyToManyField(ShiftType, blank=True)
     priority = models.IntegerField(default=1)
 
+    objects = EmployeeQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
     def get_total_hours_last_week(self):
         """Izračunava koliko je sati radnik odradio u zadnjih 7 dana."""
+        # Radnici iz `Employee.objects.with_hours_last_week()` već imaju zbroj iz baze
+        if hasattr(self, 'minutes_last_week'):
+            return round(self.minutes_last_week / 60, 2)
         Shift = apps.get_model('nurse', 'Shift')  # Dinamički uvoz Shift modela
-        last_week_shifts = Shift.objects.filter(employee=self, date__gte=now().date() - timedelta(days=7))
-        total_hours = sum(shift.calculate_total_hours() for shift in last_week_shifts)
-        return max(total_hours, 0.0)
+        return Shift.objects.filter(employee=self, date__gte=now().date() - timedelta(days=7)).total_hours()
 
     get_total_hours_last_week.short_description = "Total Hours Last 7 Days"
 
@@ -68,35 +103,357 @@ class Day(models.Model):
     def __str__(self):
         return self.name
 
+# === COVERAGE QUERYSET ===
+def atomic_write(method):
+    """
+    Upis, dnevnik promjena i osvježavanje statistike u istoj transakciji, i kad pozivatelj radi
+    u autocommit načinu (viewovi, admin) - post_save signali se šalju izvan Djangove transakcije.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if isinstance(self, models.QuerySet):
+            using = self.db
+        else:
+            using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class CoverageQuerySet(models.QuerySet):
+    """Skupni upisi i brisanja osvježavaju zbirnu statistiku pogođenih ključeva (vidi coverage.py)."""
+    # Polja čija promjena mijenja statistiku i polja ključa (department_id, date[, employee_id])
+    coverage_fields = set()
+    coverage_key_fields = ('department_id', 'date')
+
+    def coverage_rows(self):
+        padding = (None,) * (3 - len(self.coverage_key_fields))
+        return [row + padding for row in self.order_by().values_list(*self.coverage_key_fields).distinct()]
+
+    @atomic_write
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        coverage.refresh_shifts(coverage.coverage_key(obj) for obj in created)
+        for obj in created:
+            coverage.remember_key(obj)
+        return created
+
+    @atomic_write
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if not self.coverage_fields.intersection(fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        rows = self.model.objects.filter(pk__in=[obj.pk for obj in objs]).coverage_rows()
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        coverage.refresh_shifts(rows + [coverage.coverage_key(obj) for obj in objs])
+        return updated
+
+    @atomic_write
+    def update(self, **kwargs):
+        if not self.coverage_fields.intersection(kwargs):
+            return super().update(**kwargs)
+        pks = list(self.values_list('pk', flat=True))
+        rows = self.coverage_rows()
+        updated = super().update(**kwargs)
+        coverage.refresh_shifts(rows + self.model.objects.filter(pk__in=pks).coverage_rows())
+        return updated
+
+    update.alters_data = True
+
+    @atomic_write
+    def delete(self):
+        rows = self.coverage_rows()
+        deleted = super().delete()
+        coverage.refresh_shifts(rows)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class CoverageModel(models.Model):
+    """Pamti ključ statistike učitanog reda, da promjena ili brisanje osvježe i stari ključ."""
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        coverage.remember_key(instance)
+        return instance
+
+    @atomic_write
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+    @atomic_write
+    def delete(self, *args, **kwargs):
+        rows = [coverage.coverage_key(self)]
+        if getattr(self, '_coverage_key', None) is not None:
+            rows.append(self._coverage_key)
+        deleted = super().delete(*args, **kwargs)
+        coverage.refresh_shifts(rows)
+        return deleted
+
+
+class ShiftRequirementQuerySet(CoverageQuerySet):
+    coverage_fields = {'department', 'department_id', 'date', 'required_hours'}
+
+
 # === SHIFT REQUIREMENT ===
-class ShiftRequirement(models.Model):
+class ShiftRequirement(CoverageModel):
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
     date = models.DateField()
     shift_types = models.ManyToManyField(ShiftType)
     required_hours = models.PositiveIntegerField()
     required_roles = models.ManyToManyField(Role)
 
+    objects = ShiftRequirementQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='nurse_req_date_idx'),
+            models.Index(fields=['department', 'date'], name='nurse_req_dept_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.department.name} - {self.date} (Total: {self.required_hours}h)"
 
-class Shift(models.Model):
+# === REQUIREMENT TEMPLATE ===
+class RequirementTemplate(models.Model):
+    """
+    Ponavljajući zahtjev odjela (svaki dan ili jedan dan u tjednu, po želji svakih N tjedana).
+    Širi se tek za traženi raspon (vidi requirements.py); `ShiftRequirement` za isti odjel i
+    dan zamjenjuje sve predloške tog dana.
+    """
+    WEEKDAY_CHOICES = [(number, name) for number, (name, _) in enumerate(DAYS_OF_WEEK)]
+
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES, null=True, blank=True,
+                                               help_text="Prazno = svaki dan.")
+    every_weeks = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)],
+                                                   help_text="1 = svaki tjedan, 2 = svaki drugi (od valid_from)...")
+    valid_from = models.DateField()
+    valid_until = models.DateField(null=True, blank=True, help_text="Prazno = bez kraja.")
+    required_hours = models.PositiveIntegerField()
+    shift_types = models.ManyToManyField(ShiftType)
+    required_roles = models.ManyToManyField(Role)
+
+    class Meta:
+        indexes = [models.Index(fields=['department', 'valid_from'], name='nurse_template_dept_idx')]
+        # 0 bi značilo dijeljenje s nulom pri širenju - baza ga odbija i kad se zaobiđe validacija (bulk, API, shell)
+        constraints = [
+            models.CheckConstraint(condition=Q(every_weeks__gte=1), name='nurse_template_every_weeks_gte_1'),
+        ]
+
+    def clean(self):
+        if self.valid_until and self.valid_from and self.valid_until < self.valid_from:
+            raise ValidationError({'valid_until': "Kraj je prije početka."})
+
+    def _origin(self):
+        # Ponedjeljak tjedna u kojem predložak počinje, kao ordinal
+        return self.valid_from.toordinal() - self.valid_from.weekday()
+
+    def _matches(self, ordinal, origin):
+        weekday = (ordinal + 6) % 7  # date.fromordinal(1) je ponedjeljak
+        return (
+            (self.weekday is None or weekday == self.weekday)
+            and (ordinal - origin) // 7 % self.every_weeks == 0
+        )
+
+    def _bounds(self, start_date, end_date):
+        start = max(start_date, self.valid_from).toordinal()
+        end = min(end_date, self.valid_until or date.max).toordinal()
+        return start, end
+
+    def occurs_on(self, day):
+        start, end = self._bounds(day, day)
+        return start <= end and self._matches(start, self._origin())
+
+    def dates(self, start_date, end_date):
+        """Dani u rasponu na koje se predložak primjenjuje."""
+        start, end = self._bounds(start_date, end_date)
+        origin = self._origin()
+        return [date.fromordinal(ordinal) for ordinal in range(start, end + 1) if self._matches(ordinal, origin)]
+
+    def occurrence_count(self, start_date, end_date):
+        """Broj dana u rasponu bez prolaska kroz dane (radi i za `date.min` - `date.max`)."""
+        start, end = self._bounds(start_date, end_date)
+        if start > end:
+            return 0
+        origin = self._origin()
+        first_week, last_week = (start - origin) // 7, (end - origin) // 7
+        per_week = 7 if self.weekday is None else 1
+        count = per_week * (last_week // self.every_weeks - (first_week - 1) // self.every_weeks)
+        # Rubni tjedni su brojani cijeli: oduzmi dane prije početka i poslije kraja
+        count -= sum(1 for ordinal in range(origin + first_week * 7, start) if self._matches(ordinal, origin))
+        count -= sum(1 for ordinal in range(end + 1, origin + last_week * 7 + 7) if self._matches(ordinal, origin))
+        return count
+
+    def __str__(self):
+        when = self.get_weekday_display() if self.weekday is not None else "Every day"
+        if self.every_weeks > 1:
+            when += f" / {self.every_weeks} weeks"
+        return f"{self.department.name} - {when} (Total: {self.required_hours}h)"
+
+def shift_span(day, start_time, end_time):
+    """(start_at, end_at, duration_minutes) smjene; kraj prije početka znači sljedeći dan."""
+    if start_time is None or end_time is None:
+        return None, None, 0
+    start_at = datetime.combine(day or date.min, start_time.replace(second=0, microsecond=0))
+    end_at = datetime.combine(day or date.min, end_time.replace(second=0, microsecond=0))
+    if end_at < start_at:
+        end_at += timedelta(days=1)
+    duration_minutes = int((end_at - start_at).total_seconds() // 60)
+    if day is None:
+        return None, None, duration_minutes
+    if settings.USE_TZ:
+        start_at, end_at = make_aware(start_at), make_aware(end_at)
+    return start_at, end_at, duration_minutes
+
+def shift_minutes_expression():
+    """Trajanje smjene u minutama za SQL agregate (spremljeni stupac `duration_minutes`)."""
+    return F('duration_minutes')
+
+# Polja iz kojih se računaju start_at / end_at / duration_minutes
+SHIFT_SPAN_FIELDS = {'date', 'start_time', 'end_time'}
+
+class ShiftQuerySet(CoverageQuerySet):
+    coverage_fields = {
+        'department', 'department_id', 'date', 'employee', 'employee_id', 'start_time', 'end_time', 'duration_minutes',
+    }
+    coverage_key_fields = ('department_id', 'date', 'employee_id')
+
+    # Sve izmjene se bilježe i u dnevnik promjena (vidi changes.py)
+    @atomic_write
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for shift in objs:
+            shift.sync_span()
+        created = super().bulk_create(objs, *args, **kwargs)
+        changes.record(changes.shift_row(shift) for shift in created)
+        return created
+
+    @atomic_write
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if SHIFT_SPAN_FIELDS.intersection(fields):
+            for shift in objs:
+                shift.sync_span()
+            fields += [name for name in ('start_at', 'end_at', 'duration_minutes') if name not in fields]
+        # Stari ključ za objekte koji nisu učitani iz baze (npr. Shift(pk=...))
+        unknown = [shift.pk for shift in objs if getattr(shift, '_coverage_key', None) is None]
+        if unknown:
+            original = {row[0]: row[1:] for row in self.model.objects.filter(pk__in=unknown).values_list(
+                'pk', 'department_id', 'date', 'employee_id'
+            )}
+            for shift in objs:
+                if shift.pk in original:
+                    shift._coverage_key = original[shift.pk]
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        changes.record_saved(objs)
+        for shift in objs:
+            coverage.remember_key(shift)
+        return updated
+
+    @atomic_write
+    def update(self, **kwargs):
+        rows = list(self.values_list('pk', 'department_id', 'date', 'employee_id'))
+        updated = super().update(**kwargs)
+        if rows:
+            # Novi ključevi i stari za premještene smjene
+            current = self.model.objects.filter(pk__in=[row[0] for row in rows]).values_list(
+                'pk', 'department_id', 'date', 'employee_id'
+            )
+            changes.record(set(current) | set(rows))
+        return updated
+
+    update.alters_data = True
+
+    @atomic_write
+    def delete(self):
+        rows = list(self.values_list('pk', 'department_id', 'date', 'employee_id'))
+        deleted = super().delete()
+        changes.record(rows, deleted=True)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def with_minutes(self):
+        return self.annotate(minutes=shift_minutes_expression())
+
+    def total_hours(self):
+        """Ukupni sati izračunati u bazi (jedan upit)."""
+        minutes = self.filter(start_time__isnull=False, end_time__isnull=False).aggregate(
+            total=Sum(shift_minutes_expression())
+        )['total']
+        return round((minutes or 0) / 60, 2)
+
+    def hours_by_employee(self):
+        """Sati po radniku izračunati u bazi: [{employee_id, first_name, last_name, hours}]."""
+        rows = (
+            self.filter(employee__isnull=False, start_time__isnull=False, end_time__isnull=False)
+            .values('employee_id', 'employee__first_name', 'employee__last_name')
+            .annotate(minutes=Sum(shift_minutes_expression()))
+            .order_by('employee__first_name', 'employee__last_name')
+        )
+        return [
+            {
+                "employee_id": row['employee_id'],
+                "first_name": row['employee__first_name'],
+                "last_name": row['employee__last_name'],
+                "hours": round(row['minutes'] / 60, 2),
+            }
+            for row in rows
+        ]
+
+class Shift(CoverageModel):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, null=True, blank=True)
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
     role = models.ForeignKey(Role, on_delete=models.CASCADE, null=True, blank=True)
     date = models.DateField()
-    start_time = models.TimeField()
-    end_time = models.TimeField()
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    # Izvedeno iz date/start_time/end_time (save i bulk_create ih drže usklađenima)
+    start_at = models.DateTimeField(null=True, blank=True, editable=False)
+    end_at = models.DateTimeField(null=True, blank=True, editable=False)
+    duration_minutes = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
-    def calculate_total_hours(self):
-        start_seconds = self.start_time.hour * 3600 + self.start_time.minute * 60
-        end_seconds = self.end_time.hour * 3600 + self.end_time.minute * 60
+    objects = ShiftQuerySet.as_manager()
 
-        if end_seconds < start_seconds:
-            total_seconds = (24 * 3600 - start_seconds) + end_seconds
-        else:
-            total_seconds = end_seconds - start_seconds
+    def sync_span(self):
+        self.start_at, self.end_at, self.duration_minutes = shift_span(self.date, self.start_time, self.end_time)
+
+    def save(self, *args, **kwargs):
+        self.sync_span()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and SHIFT_SPAN_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'start_at', 'end_at', 'duration_minutes'}
+        super().save(*args, **kwargs)
 
-        return round(total_seconds / 3600, 2)
+    @atomic_write
+    def delete(self, *args, **kwargs):
+        rows = [changes.shift_row(self)]
+        original = getattr(self, '_coverage_key', None)
+        if original is not None and original != rows[0][1:]:
+            rows.append((self.pk, *original))
+        deleted = super().delete(*args, **kwargs)
+        changes.record(rows, deleted=True)
+        return deleted
+
+    def calculate_total_hours(self):
+        return round(shift_span(self.date, self.start_time, self.end_time)[2] / 60, 2)
+
+    class Meta:
+        # Preklapanje smjena istog radnika dodatno sprječava baza (vidi migraciju 0011)
+        indexes = [
+            models.Index(fields=['date'], name='nurse_shift_date_idx'),
+            models.Index(fields=['employee', 'date'], name='nurse_shift_emp_date_idx'),
+            models.Index(fields=['department', 'date'], name='nurse_shift_dept_date_idx'),
+        ]
 
     def get_admin_edit_url(self):
         """Vrati URL za editiranje ove smjene u Django adminu."""
@@ -105,6 +462,73 @@ class Shift(models.Model):
     def __str__(self):
         return f"{self.employee} - {self.date} {self.start_time} - {self.end_time}"
 
+# === SHIFT CHANGE LOG ===
+class ShiftChange(models.Model):
+    """Dnevnik promjena smjena; `version` je token za delta-sinkronizaciju (vidi changes.py)."""
+    version = models.BigAutoField(primary_key=True)
+    # Bez stranih ključeva: red mora preživjeti brisanje smjene (tombstone)
+    shift_id = models.BigIntegerField()
+    department_id = models.BigIntegerField()
+    employee_id = models.BigIntegerField(null=True, blank=True)
+    date = models.DateField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"v{self.version} shift {self.shift_id}{' (deleted)' if self.deleted else ''}"
+
+# === COVERAGE ===
+class DepartmentDayCoverage(models.Model):
+    """Zbirni sati po (odjel, datum); održava ga coverage.py, ne uređuje se ručno."""
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    date = models.DateField()
+    required_hours = models.PositiveIntegerField(default=0)
+    assigned_minutes = models.PositiveIntegerField(default=0)
+    unfilled_minutes = models.PositiveIntegerField(default=0)
+    shift_count = models.PositiveIntegerField(default=0)
+    unfilled_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'date'], name='nurse_coverage_dept_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='nurse_coverage_date_idx'),
+        ]
+
+    @property
+    def assigned_hours(self):
+        return round(self.assigned_minutes / 60, 2)
+
+    @property
+    def percent_filled(self):
+        return self.assigned_hours / self.required_hours * 100 if self.required_hours else 0
+
+    def __str__(self):
+        return f"{self.department} - {self.date}: {self.assigned_hours}/{self.required_hours}h"
+
+class EmployeeWeekHours(models.Model):
+    """Odrađene minute radnika po ISO tjednu (`week_start` je ponedjeljak); održava ga coverage.py."""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    week_start = models.DateField()
+    minutes = models.PositiveIntegerField(default=0)
+    shift_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'week_start'], name='nurse_week_hours_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['week_start'], name='nurse_week_hours_week_idx'),
+        ]
+
+    @property
+    def hours(self):
+        return round(self.minutes / 60, 2)
+
+    def __str__(self):
+        return f"{self.employee} - {self.week_start}: {self.hours}h"
+
 # === TIME OFF ===
 class TimeOff(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
@@ -113,4 +537,56 @@ class TimeOff(models.Model):
     reason = models.CharField(max_length=255, choices=[('sick', 'Sick'), ('holiday', 'Holiday')])
     
     def __str__(self):
-        return f"{self.employee.first_name} {self.employee.last_name} - {self.reason} ({self.start_date} to {self.end_date})"
\ No newline at end of file
+        return f"{self.employee.first_name} {self.employee.last_name} - {self.reason} ({self.start_date} to {self.end_date})"
+# === SCHEDULE JOB ===
+class ScheduleJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    departments = models.ManyToManyField(Department, blank=True)
+    strategy = models.CharField(max_length=20, default='greedy')
+    seed = models.IntegerField(null=True, blank=True)
+    parallel = models.BooleanField(default=False, help_text="Grupe odjela bez zajedničkih radnika u zasebnim procesima.")
+    workers = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Broj procesa uz parallel (prazno = broj CPU-a).")
+    days_total = models.PositiveIntegerField(default=0)
+    days_done = models.PositiveIntegerField(default=0)
+    unfilled_slots = models.PositiveIntegerField(default=0)
+    summary = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def percent_complete(self):
+        if self.status == self.DONE:
+            return 100.0
+        return round(self.days_done / self.days_total * 100, 1) if self.days_total else 0.0
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "strategy": self.strategy,
+            "parallel": self.parallel,
+            "workers": self.workers,
+            "percent_complete": self.percent_complete,
+            "days_done": self.days_done,
+            "days_total": self.days_total,
+            "unfilled_slots": self.unfilled_slots,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+    def __str__(self):
+        return f"Job #{self.id} {self.start_date} - {self.end_date} ({self.status})"
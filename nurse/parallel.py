@@ -0,0 +1,104 @@
+"""
+Paralelno generiranje rasporeda po neovisnim grupama odjela.
+
+Odjeli su povezani samo preko zajedničkih radnika (`Employee.departments`), pa se
+zahtjevi dijele na komponente odjela bez zajedničkog osoblja. Svaka komponenta se
+rješava u zasebnom procesu nad svojim podskupom `ScheduleData` (bez pristupa bazi),
+a rezultati se spajaju i spremaju jednim upisom. Odjeli unutar iste komponente
+rješavaju se redom, kao i do sada.
+
+Napredak se javlja po završenoj komponenti: `progress(day, shifts)` dobiva smjene te
+komponente i dan do kojeg je (razmjerno broju završenih zahtjeva) raspon gotov.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from .solvers import ScheduleResult, evaluate, get_solver
+
+
+def department_components(data):
+    """Grupe odjela (sa zahtjevima u rasponu) koje nemaju zajedničkih radnika."""
+    departments = {requirement.department_id for requirement in data.requirements}
+    parent = {department_id: department_id for department_id in departments}
+
+    def find(department_id):
+        while parent[department_id] != department_id:
+            parent[department_id] = parent[parent[department_id]]
+            department_id = parent[department_id]
+        return department_id
+
+    for employee in data.employees.values():
+        linked = sorted(employee.department_ids & departments)
+        for department_id in linked[1:]:
+            parent[find(department_id)] = find(linked[0])
+
+    components = {}
+    for department_id in departments:
+        components.setdefault(find(department_id), set()).add(department_id)
+    return sorted(components.values(), key=min)
+
+
+def _solve_component(strategy, seed, time_limit, data):
+    started = time.perf_counter()
+    result = get_solver(strategy, seed=seed, time_limit=time_limit).solve(data)
+    return result, time.perf_counter() - started, data.report
+
+
+def solve_parallel(data, strategy="greedy", seed=None, time_limit=None, workers=None, progress=None):
+    """Rješava svaku komponentu u svom procesu; vraća spojeni `ScheduleResult` s vremenima po komponenti."""
+    started = time.perf_counter()
+    components = department_components(data)
+    subsets = [data.subset(component) for component in components]
+    # Svaka komponenta dobiva svoj seed kako bi rezultat bio ponovljiv neovisno o redoslijedu procesa
+    seeds = [None if seed is None else f"{seed}/{min(component)}" for component in components]
+
+    days_total = len(data.dates)
+    requirements_total = len(data.requirements)
+    requirements_done = 0
+
+    def component_done(number, outcome):
+        nonlocal requirements_done
+        if progress is None:
+            return
+        requirements_done += len(subsets[number].requirements)
+        days_done = days_total * requirements_done // requirements_total if requirements_total else days_total
+        progress(data.start_date + timedelta(days=days_done - 1), outcome[0].planned)
+
+    workers = min(workers or os.cpu_count() or 1, len(components)) or 1
+    outcomes = [None] * len(components)
+    if workers == 1:
+        for number, (s, subset) in enumerate(zip(seeds, subsets)):
+            outcomes[number] = _solve_component(strategy, s, time_limit, subset)
+            component_done(number, outcomes[number])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_solve_component, strategy, s, time_limit, subset): number
+                for number, (s, subset) in enumerate(zip(seeds, subsets))
+            }
+            for future in as_completed(futures):
+                number = futures[future]
+                outcomes[number] = future.result()
+                component_done(number, outcomes[number])
+
+    result = ScheduleResult(strategy=strategy, seed=seed)
+    for component, (component_result, elapsed, report) in zip(components, outcomes):
+        # Faze iz procesa se zbrajaju u izvještaj glavnog procesa
+        data.report.merge(report)
+        result.planned.extend(component_result.planned)
+        result.timed_out_days = sorted(set(result.timed_out_days) | set(component_result.timed_out_days))
+        result.components.append({
+            "departments": sorted(component),
+            "requirements": sum(1 for r in data.requirements if r.department_id in component),
+            "unfilled_hours": component_result.unfilled_hours,
+            "solve_time": round(elapsed, 3),
+        })
+
+    # Indeks glavnog procesa mora znati za smjene dodijeljene u procesima
+    for shift in result.planned:
+        data.index.add(shift.employee_id, shift.date, shift.start_time, shift.end_time)
+
+    result.solve_time = time.perf_counter() - started
+    return evaluate(data, result.planned, result)
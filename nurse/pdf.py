@@ -0,0 +1,254 @@
+"""
+PDF raspored (radnik × dan) za odjel i tjedan.
+
+Podaci se učitavaju s dva upita u običan dict (`load_rosters`), a PDF se crta
+direktno po reportlab canvasu (`render_roster`) bez Django pristupa, pa se u
+batch načinu (`render_rosters`) crtanje može raditi u zasebnim procesima.
+Gotovi PDF-ovi se spremaju na disk pod hashom sadržaja (`NURSE_PDF_CACHE_DIR`),
+pa se tjedan koji se nije mijenjao ne crta ponovno.
+
+Tekst se piše DejaVuSans TTF fontom (ugrađenim u PDF) jer standardni PDF fontovi
+(Helvetica) nemaju hrvatske dijakritike. Font se traži u `NURSE_PDF_FONT_DIR` pa u
+uobičajenim sistemskim direktorijima; ako ga nema, PDF se crta Helveticom uz upozorenje.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+# Povećati kad se promijeni izgled PDF-a (stari cache se tada ne koristi)
+RENDERER_VERSION = 1
+
+# (obični, podebljani) font; datoteke se zovu kao fontovi (DejaVuSans.ttf, DejaVuSans-Bold.ttf)
+UNICODE_FONTS = ('DejaVuSans', 'DejaVuSans-Bold')
+FALLBACK_FONTS = ('Helvetica', 'Helvetica-Bold')
+FONT_DIRS = (
+    '/usr/share/fonts/truetype/dejavu',  # Debian / Ubuntu
+    '/usr/share/fonts/dejavu-sans-fonts',  # Fedora
+    '/usr/share/fonts/dejavu',
+    '/usr/share/fonts/TTF',  # Arch
+    '/usr/local/share/fonts',
+    '/Library/Fonts',  # macOS
+)
+
+PAGE_SIZE = landscape(letter)
+MARGIN = 36
+NAME_COLUMN_WIDTH = 150
+HEADER_HEIGHT = 24
+ROW_HEIGHT = 18
+
+
+def week_start(day):
+    """Ponedjeljak tjedna u kojem je `day`."""
+    return day - timedelta(days=day.weekday())
+
+
+def cache_dir():
+    path = Path(getattr(settings, 'NURSE_PDF_CACHE_DIR', settings.BASE_DIR / 'pdf_cache'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def pdf_fonts():
+    """
+    (obični, podebljani) font za PDF, registriran u reportlabu ovog procesa. Zove se i u
+    procesima koji crtaju (`render_roster`), jer se registracija ne prenosi između procesa.
+    """
+    if all(name in pdfmetrics.getRegisteredFontNames() for name in UNICODE_FONTS):
+        return UNICODE_FONTS
+    directories = [getattr(settings, 'NURSE_PDF_FONT_DIR', None), *FONT_DIRS]
+    for directory in filter(None, directories):
+        paths = [Path(directory) / f"{name}.ttf" for name in UNICODE_FONTS]
+        if all(path.exists() for path in paths):
+            for name, path in zip(UNICODE_FONTS, paths):
+                pdfmetrics.registerFont(TTFont(name, str(path)))
+            return UNICODE_FONTS
+    logger.warning("⚠️ %s.ttf nije pronađen (NURSE_PDF_FONT_DIR), PDF se crta Helveticom bez dijakritika",
+                   UNICODE_FONTS[0])
+    return FALLBACK_FONTS
+
+
+# === 📌 PODACI ===
+def load_rosters(first_day, department_ids=None):
+    """
+    Podaci za PDF po odjelu za tjedan koji počinje `first_day`: {department_id: roster}.
+    Roster sadrži samo stringove i brojeve (može se hashirati i poslati drugom procesu).
+    """
+    Department = apps.get_model('nurse', 'Department')
+    Employee = apps.get_model('nurse', 'Employee')
+    Shift = apps.get_model('nurse', 'Shift')
+
+    days = [first_day + timedelta(days=n) for n in range(7)]
+    departments = Department.objects.order_by('name')
+    if department_ids is not None:
+        departments = departments.filter(pk__in=department_ids)
+
+    rosters = {}
+    employees = {}
+    for department_id, name in departments.values_list('pk', 'name'):
+        rosters[department_id] = {
+            "department": name,
+            "week_start": first_day.isoformat(),
+            "days": [day.strftime('%a %d.%m.') for day in days],
+            "unfilled": [0] * 7,
+        }
+        employees[department_id] = {}
+
+    def row(department_id, employee_id, first_name, last_name):
+        return employees[department_id].setdefault(
+            employee_id, {"name": f"{first_name} {last_name}", "cells": [[] for _ in days]}
+        )
+
+    for department_id, employee_id, first_name, last_name in Employee.departments.through.objects.filter(
+        department_id__in=list(rosters)
+    ).values_list('department_id', 'employee_id', 'employee__first_name', 'employee__last_name'):
+        row(department_id, employee_id, first_name, last_name)
+
+    for department_id, employee_id, first_name, last_name, day, start_time, end_time in Shift.objects.filter(
+        department_id__in=list(rosters), date__range=(days[0], days[-1])
+    ).order_by('date', 'start_time', 'pk').values_list(
+        'department_id', 'employee_id', 'employee__first_name', 'employee__last_name', 'date', 'start_time', 'end_time'
+    ):
+        position = (day - first_day).days
+        if employee_id is None:
+            rosters[department_id]["unfilled"][position] += 1
+            continue
+        label = f"{start_time:%H:%M}-{end_time:%H:%M}" if start_time and end_time else "?"
+        row(department_id, employee_id, first_name, last_name)["cells"][position].append(label)
+
+    for department_id, roster in rosters.items():
+        roster["rows"] = sorted(
+            [employee["name"], [", ".join(cell) for cell in employee["cells"]]]
+            for employee in employees[department_id].values()
+        )
+    return rosters
+
+
+def roster_hash(roster, fonts):
+    payload = json.dumps([RENDERER_VERSION, fonts, roster], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# === 📌 CRTANJE ===
+def _draw_header(pdf, fonts, roster, page, pages, column_width, top):
+    width, height = PAGE_SIZE
+    regular, bold = fonts
+    pdf.setFont(bold, 14)
+    pdf.drawString(MARGIN, height - MARGIN, f"{roster['department']} - week of {roster['week_start']}")
+    pdf.setFont(regular, 8)
+    pdf.drawRightString(width - MARGIN, height - MARGIN, f"Page {page}/{pages}")
+
+    pdf.setFillGray(0.85)
+    pdf.rect(MARGIN, top - HEADER_HEIGHT, width - 2 * MARGIN, HEADER_HEIGHT, stroke=0, fill=1)
+    pdf.setFillGray(0)
+    pdf.setFont(bold, 9)
+    pdf.drawString(MARGIN + 4, top - 16, "Employee")
+    for position, label in enumerate(roster["days"]):
+        pdf.drawCentredString(MARGIN + NAME_COLUMN_WIDTH + column_width * (position + 0.5), top - 16, label)
+
+
+def _draw_row(pdf, fonts, name, cells, y, column_width, bold=False):
+    width, _ = PAGE_SIZE
+    pdf.setFont(fonts[1] if bold else fonts[0], 8)
+    pdf.drawString(MARGIN + 4, y + 5, name[:32])
+    for position, text in enumerate(cells):
+        if text:
+            pdf.drawCentredString(MARGIN + NAME_COLUMN_WIDTH + column_width * (position + 0.5), y + 5, text)
+    pdf.line(MARGIN, y, width - MARGIN, y)
+
+
+def render_roster(roster):
+    """Crta PDF (bytes) iz rostera; ne koristi bazu pa se može zvati u drugom procesu."""
+    width, height = PAGE_SIZE
+    column_width = (width - 2 * MARGIN - NAME_COLUMN_WIDTH) / 7
+    top = height - MARGIN - 12
+    rows_per_page = max(int((top - HEADER_HEIGHT - MARGIN) // ROW_HEIGHT) - 1, 1)
+
+    rows = roster["rows"]
+    pages = max((len(rows) + rows_per_page - 1) // rows_per_page, 1)
+    fonts = pdf_fonts()
+
+    buffer = tempfile.SpooledTemporaryFile()
+    pdf = canvas.Canvas(buffer, pagesize=PAGE_SIZE, pageCompression=1)
+    pdf.setTitle(f"{roster['department']} {roster['week_start']}")
+
+    for page in range(pages):
+        _draw_header(pdf, fonts, roster, page + 1, pages, column_width, top)
+        y = top - HEADER_HEIGHT
+        for name, cells in rows[page * rows_per_page:(page + 1) * rows_per_page]:
+            y -= ROW_HEIGHT
+            _draw_row(pdf, fonts, name, cells, y, column_width)
+        if page == pages - 1:
+            y -= ROW_HEIGHT
+            _draw_row(pdf, fonts, "Unfilled shifts", [str(count) if count else "" for count in roster["unfilled"]],
+                      y, column_width, bold=True)
+
+        # Okomite linije stupaca
+        for position in range(8):
+            x = MARGIN + NAME_COLUMN_WIDTH + column_width * position
+            pdf.line(x, y, x, top)
+        pdf.line(MARGIN, y, MARGIN, top)
+        pdf.showPage()
+
+    pdf.save()
+    buffer.seek(0)
+    return buffer.read()
+
+
+# === 📌 CACHE ===
+def _write_cached(path, content):
+    # Pisanje u privremenu datoteku pa rename, da paralelni zahtjevi ne vide pola PDF-a
+    handle, temporary = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(handle, 'wb') as output:
+        output.write(content)
+    os.replace(temporary, path)
+
+
+def render_rosters(day, departments=None, workers=None):
+    """
+    PDF-ovi za sve (ili zadane) odjele za tjedan u kojem je `day`: {department_id: putanja}.
+    Tjedni koji su već u cacheu se ne crtaju; ostali se crtaju paralelno u `workers` procesa.
+    """
+    rosters = load_rosters(week_start(day), department_ids=None if departments is None else [
+        getattr(department, 'pk', department) for department in departments
+    ])
+    directory = cache_dir()
+    # Font je dio ključa: PDF nacrtan rezervnim fontom se ne koristi kad DejaVu postane dostupan
+    fonts = pdf_fonts()
+
+    paths = {}
+    missing = {}
+    for department_id, roster in rosters.items():
+        paths[department_id] = directory / f"{roster_hash(roster, fonts)}.pdf"
+        if not paths[department_id].exists():
+            missing[department_id] = roster
+
+    if len(missing) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rendered = dict(zip(missing, executor.map(render_roster, missing.values())))
+    else:
+        rendered = {department_id: render_roster(roster) for department_id, roster in missing.items()}
+
+    for department_id, content in rendered.items():
+        _write_cached(paths[department_id], content)
+    return paths
+
+
+def roster_pdf(department, day):
+    """Putanja do PDF-a jednog odjela za tjedan u kojem je `day`."""
+    department_id = getattr(department, 'pk', department)
+    paths = render_rosters(day, [department_id], workers=1)
+    return paths[department_id]
@@ -0,0 +1,212 @@
+"""
+Izvještaj o generiranju rasporeda i opcionalno profiliranje.
+
+Svako generiranje puni `RunReport`: vrijeme i broj SQL upita po fazi
+(`load`, `candidates`, `overlap`, `persist`), broj slotova i kandidata
+provjerenih po slotu te popunjene/nepopunjene sate. Izvještaj je na
+`ScheduleResult.report` i u `summary()`.
+
+Postavke:
+- `NURSE_SCHEDULE_REPORT_DIR`: ako je zadan, svaki izvještaj se sprema kao JSON.
+- `NURSE_SCHEDULE_PROFILER`: "cprofile" ili "pyinstrument" (ako nije instaliran,
+  koristi se cProfile); profil se sprema samo za generiranja duža od
+  `NURSE_SCHEDULE_PROFILE_THRESHOLD` sekundi, u `NURSE_SCHEDULE_PROFILE_DIR`.
+"""
+import cProfile
+import json
+import logging
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import QueryRecorder
+
+logger = logging.getLogger('nurse.engine')
+
+PHASES = ("load", "candidates", "overlap", "persist")
+
+
+class RunReport:
+    """Mjerenja jednog generiranja; faze se zbrajaju kroz sve dane i zahtjeve."""
+
+    def __init__(self, start_date=None, end_date=None, strategy=None, seed=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.strategy = strategy
+        self.seed = seed
+        self.phases = {name: {"seconds": 0.0, "queries": 0, "calls": 0} for name in PHASES}
+        self.slots = 0
+        self.candidates_evaluated = 0
+        self.unfilled_slots = 0
+        self.filled_hours = 0
+        self.unfilled_hours = 0
+        self.total_seconds = 0.0
+        self.profile_path = None
+        self._queries = QueryRecorder()
+
+    @contextmanager
+    def recording(self):
+        """Broji SQL upite na svim konekcijama dok traje generiranje."""
+        with ExitStack() as wrappers:
+            for alias in connections:
+                wrappers.enter_context(connections[alias].execute_wrapper(self._queries))
+            started = perf_counter()
+            try:
+                yield self
+            finally:
+                self.total_seconds = perf_counter() - started
+
+    @contextmanager
+    def phase(self, name):
+        queries = self._queries.count
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            row = self.phases[name]
+            row["seconds"] += perf_counter() - started
+            row["queries"] += self._queries.count - queries
+            row["calls"] += 1
+
+    def slot(self, evaluated, filled):
+        """Bilježi jedan slot smjene i koliko je kandidata za njega provjereno."""
+        self.slots += 1
+        self.candidates_evaluated += evaluated
+        if not filled:
+            self.unfilled_slots += 1
+
+    def merge(self, other):
+        """Dodaje mjerenja podskupa (npr. komponente riješene u drugom procesu)."""
+        for name, row in other.phases.items():
+            for key, value in row.items():
+                self.phases[name][key] += value
+        self.slots += other.slots
+        self.candidates_evaluated += other.candidates_evaluated
+        self.unfilled_slots += other.unfilled_slots
+
+    @property
+    def queries(self):
+        return self._queries.count
+
+    @property
+    def candidates_per_slot(self):
+        return round(self.candidates_evaluated / self.slots, 2) if self.slots else 0
+
+    def as_dict(self):
+        return {
+            "start_date": self.start_date.isoformat() if self.start_date else None,
+            "end_date": self.end_date.isoformat() if self.end_date else None,
+            "strategy": self.strategy,
+            "seed": self.seed,
+            "total_seconds": round(self.total_seconds, 4),
+            "queries": self.queries,
+            "phases": {
+                name: {**row, "seconds": round(row["seconds"], 4)} for name, row in self.phases.items()
+            },
+            "slots": self.slots,
+            "unfilled_slots": self.unfilled_slots,
+            "candidates_evaluated": self.candidates_evaluated,
+            "candidates_per_slot": self.candidates_per_slot,
+            "filled_hours": self.filled_hours,
+            "unfilled_hours": self.unfilled_hours,
+            "profile": str(self.profile_path) if self.profile_path else None,
+        }
+
+    def log(self):
+        phases = ", ".join(
+            f"{name} {row['seconds']:.3f}s/{row['queries']}q" for name, row in self.phases.items()
+        )
+        logger.info(
+            "📊 Raspored %s - %s (%s): %.2fs, %d upita [%s], %d slotova, %.1f kandidata/slot, "
+            "popunjeno %sh, nepopunjeno %sh",
+            self.start_date, self.end_date, self.strategy, self.total_seconds, self.queries, phases,
+            self.slots, self.candidates_per_slot, self.filled_hours, self.unfilled_hours,
+        )
+
+    def file_stem(self):
+        return f"schedule-{datetime.now():%Y%m%d-%H%M%S-%f}-{self.strategy}-{self.start_date}-{self.end_date}"
+
+    def save(self, directory=None):
+        """Sprema izvještaj u `NURSE_SCHEDULE_REPORT_DIR` (ili zadani direktorij); vraća putanju ili `None`."""
+        directory = directory or getattr(settings, 'NURSE_SCHEDULE_REPORT_DIR', None)
+        if not directory:
+            return None
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        path = path / f"{self.file_stem()}.json"
+        path.write_text(json.dumps(self.as_dict(), indent=2))
+        return path
+
+
+# === 📌 PROFILIRANJE ===
+class Profiler:
+    """Omotač oko cProfile/pyinstrument s istim sučeljem (`start`, `stop`, `save`)."""
+
+    def __init__(self, kind="cprofile"):
+        if kind == "pyinstrument":
+            try:
+                from pyinstrument import Profiler as Pyinstrument
+            except ImportError:
+                logger.warning("pyinstrument nije instaliran, koristi se cProfile")
+                kind = "cprofile"
+            else:
+                self._profiler = Pyinstrument()
+        if kind == "cprofile":
+            self._profiler = cProfile.Profile()
+        elif kind != "pyinstrument":
+            raise ValueError(f"Unknown profiler '{kind}' (choose from: cprofile, pyinstrument)")
+        self.kind = kind
+
+    def start(self):
+        if self.kind == "cprofile":
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+
+    def stop(self):
+        if self.kind == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+    def save(self, directory, stem):
+        """cProfile → `.prof` (pstats/snakeviz), pyinstrument → `.html`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if self.kind == "cprofile":
+            path = directory / f"{stem}.prof"
+            self._profiler.dump_stats(path)
+        else:
+            path = directory / f"{stem}.html"
+            path.write_text(self._profiler.output_html())
+        return path
+
+
+@contextmanager
+def profiled(report, kind=None):
+    """
+    Profilira blok ako je zadan `kind` (ili `NURSE_SCHEDULE_PROFILER`); profil se
+    sprema samo ako je izvođenje trajalo barem `NURSE_SCHEDULE_PROFILE_THRESHOLD` sekundi.
+    """
+    kind = kind or getattr(settings, 'NURSE_SCHEDULE_PROFILER', None)
+    if not kind:
+        yield None
+        return
+
+    profiler = Profiler(kind)
+    started = perf_counter()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+    elapsed = perf_counter() - started
+    if elapsed >= getattr(settings, 'NURSE_SCHEDULE_PROFILE_THRESHOLD', 5.0):
+        directory = getattr(settings, 'NURSE_SCHEDULE_PROFILE_DIR', None) or settings.BASE_DIR / 'profiles'
+        report.profile_path = profiler.save(directory, report.file_stem())
+        logger.info("🐢 Generiranje je trajalo %.2fs, profil spremljen u %s", elapsed, report.profile_path)
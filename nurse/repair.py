@@ -0,0 +1,186 @@
+"""
+Inkrementalni popravak rasporeda.
+
+Umjesto brisanja i ponovnog generiranja cijelih dana, nakon promjene (bolovanje ili
+godišnji, obrisana smjena, promijenjeni dostupni dani radnika) ponovno se rješavaju
+samo pogođene smjene. Sve ostale dodjele ostaju netaknute, a funkcije vraćaju listu
+primijenjenih promjena (diff).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from . import coverage, requirements
+from .engine import load_employees, load_shift_types
+from .intervals import IntervalIndex
+from .models import Shift, ShiftRequirement
+
+
+def _required_roles(slots):
+    """Tražene uloge po (odjel, datum) iz ShiftRequirement zahtjeva i predložaka za ostale dane."""
+    roles = defaultdict(set)
+    department_ids = {slot.department_id for slot in slots}
+    first_day, last_day = min(slot.date for slot in slots), max(slot.date for slot in slots)
+    through = ShiftRequirement.required_roles.through.objects.filter(
+        shiftrequirement__department_id__in=department_ids,
+        shiftrequirement__date__range=(first_day, last_day),
+    )
+    for department_id, day, role_id in through.values_list(
+        'shiftrequirement__department_id', 'shiftrequirement__date', 'role_id'
+    ):
+        roles[(department_id, day)].add(role_id)
+    for template, day in requirements.expand(first_day, last_day, department_ids):
+        roles[(template.department_id, day)].update(role.id for role in template.required_roles.all())
+    return roles
+
+
+def refill(slots, exclude_employee_ids=()):
+    """
+    Bira novog radnika za svaku smjenu iz `slots` (spremljene ili nove `Shift` instance)
+    prema istim pravilima kao generator; ako ga nema, smjena ostaje nepopunjena.
+    Sprema promjene i vraća diff.
+    """
+    slots = [slot for slot in slots if slot.start_time is not None and slot.end_time is not None]
+    if not slots:
+        return []
+
+    first_day = min(slot.date for slot in slots)
+    last_day = max(slot.date for slot in slots)
+    employees = load_employees(first_day, last_day, {slot.department_id for slot in slots})
+    shift_types = {(st.start_time, st.end_time): st for st in load_shift_types().values()}
+    required_roles = _required_roles(slots)
+    index = IntervalIndex.around(
+        first_day, last_day, employee_ids=list(employees), exclude=[slot.pk for slot in slots if slot.pk]
+    )
+
+    diff = []
+    for slot in sorted(slots, key=lambda s: (s.date, s.start_time)):
+        previous_employee_id = slot.employee_id
+        hours = slot.calculate_total_hours()
+        day_name = slot.date.strftime('%A')
+        shift_type = shift_types.get((slot.start_time, slot.end_time))
+        roles = {slot.role_id} if slot.role_id else required_roles.get((slot.department_id, slot.date), set())
+
+        candidates = sorted(
+            (
+                employee for employee in employees.values()
+                if slot.department_id in employee.department_ids
+                and employee.id not in exclude_employee_ids
+                and day_name in employee.day_names
+                and (not roles or roles.intersection(employee.role_ids))
+                and not employee.is_off(slot.date)
+                and (shift_type is None or employee.can_work(shift_type))
+            ),
+            key=lambda e: (e.priority, index.hours_in_week(e.id, slot.date), e.id),
+        )
+        chosen = None
+        for employee in candidates:
+            if index.shifts_on(employee.id, slot.date):
+                continue
+            if index.max_week_hours(employee.id, slot.date) + hours > employee.max_weekly_hours:
+                continue
+            if index.hours_on(employee.id, slot.date) + hours > employee.max_daily_hours:
+                continue
+            if index.overlaps(employee.id, slot.date, slot.start_time, slot.end_time):
+                continue
+            chosen = employee
+            break
+
+        if chosen is None:
+            slot.employee_id = None
+            slot.role_id = None
+        else:
+            slot.employee_id = chosen.id
+            slot.role_id = next((role_id for role_id in chosen.role_ids if role_id in roles), None) or (
+                chosen.role_ids[0] if chosen.role_ids else None
+            )
+            index.add(chosen.id, slot.date, slot.start_time, slot.end_time)
+
+        if slot.pk is None:
+            action = "created" if chosen else "unfilled"
+        elif chosen is None:
+            action = "unfilled" if previous_employee_id else "unchanged"
+        else:
+            action = "reassigned" if previous_employee_id else "filled"
+        diff.append({
+            "action": action,
+            "shift": slot,
+            "date": slot.date.isoformat(),
+            "start_time": slot.start_time.strftime('%H:%M'),
+            "end_time": slot.end_time.strftime('%H:%M'),
+            "department_id": slot.department_id,
+            "from_employee_id": previous_employee_id,
+            "to_employee_id": slot.employee_id,
+        })
+
+    diff = [change for change in diff if change["action"] != "unchanged"]
+    with transaction.atomic(), coverage.batched():
+        Shift.objects.bulk_update([c["shift"] for c in diff if c["shift"].pk], ['employee', 'role'])
+        Shift.objects.bulk_create([c["shift"] for c in diff if not c["shift"].pk])
+    for change in diff:
+        change["shift_id"] = change.pop("shift").pk
+    return diff
+
+
+def overlapping_shifts():
+    """Smjene koje se preklapaju s ranijom smjenom istog radnika (kasnija smjena iz svakog para)."""
+    overlapping = []
+    employee_id, latest_end = None, None
+    for shift in Shift.objects.filter(
+        employee__isnull=False, start_at__isnull=False, end_at__isnull=False
+    ).order_by('employee_id', 'start_at', 'pk').iterator():
+        if shift.employee_id == employee_id and shift.start_at < latest_end:
+            overlapping.append(shift)
+            continue
+        if shift.employee_id != employee_id or shift.end_at > latest_end:
+            employee_id, latest_end = shift.employee_id, shift.end_at
+    return overlapping
+
+
+def resolve_overlaps():
+    """
+    Preraspoređuje kasniju smjenu iz svakog preklapajućeg para (ista pravila kao generator,
+    radnik ranije smjene otpada jer je zauzet); ako zamjene nema, smjena ostaje nepopunjena.
+    """
+    return refill(overlapping_shifts())
+
+
+def repair_time_off(time_off):
+    """Preraspoređuje smjene radnika koje padaju u novi godišnji/bolovanje."""
+    shifts = Shift.objects.filter(
+        employee_id=time_off.employee_id, date__range=(time_off.start_date, time_off.end_date)
+    )
+    return refill(list(shifts), exclude_employee_ids={time_off.employee_id})
+
+
+def repair_deleted_shift(shift):
+    """Traži zamjenu za obrisanu smjenu (isti odjel, dan i vrijeme, drugi radnik)."""
+    replacement = Shift(
+        department_id=shift.department_id,
+        role_id=shift.role_id,
+        date=shift.date,
+        start_time=shift.start_time,
+        end_time=shift.end_time,
+    )
+    return refill([replacement], exclude_employee_ids={shift.employee_id} if shift.employee_id else ())
+
+
+def repair_availability(employee, since=None, horizon_days=28):
+    """
+    Nakon promjene `available_days`: preraspoređuje buduće smjene radnika na dane kad više
+    nije dostupan i pokušava popuniti nepopunjene smjene njegovih odjela na dane kad jest.
+    """
+    since = since or now().date()
+    upcoming = Shift.objects.filter(date__range=(since, since + timedelta(days=horizon_days)))
+    day_names = set(employee.available_days.values_list('name', flat=True))
+
+    lost = [shift for shift in upcoming.filter(employee=employee) if shift.date.strftime('%A') not in day_names]
+    open_slots = [
+        shift for shift in upcoming.filter(
+            employee__isnull=True, department__in=employee.departments.all()
+        )
+        if shift.date.strftime('%A') in day_names
+    ]
+    return refill(lost + open_slots)
@@ -0,0 +1,83 @@
+"""
+Zahtjevi smjena iz ponavljajućih predložaka.
+
+`RequirementTemplate` (odjel, dan u tjednu ili svaki dan, svakih N tjedana, raspon
+valjanosti, sati, uloge i tipovi smjena) zamjenjuje po jedan `ShiftRequirement` red
+(i njegove M2M redove) za svaki dan. Predlošci se šire tek za traženi raspon:
+
+- engine (`ScheduleData.load`) dobiva zahtjeve iz predložaka uz konkretne redove,
+- statistika (`coverage.window_totals`) dodaje potrebne sate predložaka aritmetički,
+  bez prolaska kroz dane.
+
+`ShiftRequirement` za (odjel, dan) je izuzetak: zamjenjuje sve predloške tog odjela
+za taj dan (zahtjev s 0 sati znači da se taj dan ništa ne traži).
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.apps import apps
+from django.db.models import Q
+
+
+def templates(start_date, end_date, department_ids=None):
+    """Predlošci valjani barem dio raspona."""
+    RequirementTemplate = apps.get_model('nurse', 'RequirementTemplate')
+    queryset = RequirementTemplate.objects.filter(
+        Q(valid_until__isnull=True) | Q(valid_until__gte=start_date), valid_from__lte=end_date,
+    )
+    if department_ids is not None:
+        queryset = queryset.filter(department_id__in=department_ids)
+    return queryset
+
+
+def overrides(start_date, end_date, department_ids=None):
+    """(odjel, dan) za koje postoji konkretan ShiftRequirement."""
+    ShiftRequirement = apps.get_model('nurse', 'ShiftRequirement')
+    queryset = ShiftRequirement.objects.filter(date__range=(start_date, end_date))
+    if department_ids is not None:
+        queryset = queryset.filter(department_id__in=department_ids)
+    return set(queryset.order_by().values_list('department_id', 'date').distinct())
+
+
+def expand(start_date, end_date, department_ids=None, overridden=None):
+    """
+    [(predložak, dan)] za raspon, bez dana s konkretnim zahtjevom (`overridden`, inače se
+    čita iz baze). Predlošci dolaze s odjelom, ulogama i tipovima smjena (tri upita).
+    """
+    if overridden is None:
+        overridden = overrides(start_date, end_date, department_ids)
+    occurrences = []
+    for template in (
+        templates(start_date, end_date, department_ids)
+        .select_related('department').prefetch_related('required_roles', 'shift_types').order_by('id')
+    ):
+        occurrences.extend(
+            (template, day) for day in template.dates(start_date, end_date)
+            if (template.department_id, day) not in overridden
+        )
+    occurrences.sort(key=lambda occurrence: (occurrence[1], occurrence[0].pk))
+    return occurrences
+
+
+def template_hours(start_date, end_date, department_id=None):
+    """Potrebni sati iz predložaka u rasponu (bez dana s konkretnim zahtjevom) - dva upita."""
+    department_ids = [department_id] if department_id else None
+    by_department = defaultdict(list)
+    for template in templates(start_date, end_date, department_ids).only(
+        'department_id', 'weekday', 'every_weeks', 'valid_from', 'valid_until', 'required_hours',
+    ):
+        by_department[template.department_id].append(template)
+    if not by_department:
+        return 0
+
+    hours = sum(
+        template.required_hours * template.occurrence_count(start_date, end_date)
+        for department_templates in by_department.values() for template in department_templates
+    )
+    # Dani s konkretnim zahtjevom ne koriste predloške; traže se samo unutar valjanosti predložaka
+    loaded = [template for department_templates in by_department.values() for template in department_templates]
+    first_day = max(start_date, min(template.valid_from for template in loaded))
+    last_day = min(end_date, max(template.valid_until or date.max for template in loaded))
+    for department, day in overrides(first_day, last_day, list(by_department)):
+        hours -= sum(template.required_hours for template in by_department[department] if template.occurs_on(day))
+    return hours
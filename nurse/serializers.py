@@ -0,0 +1,69 @@
+from rest_framework import serializers
+
+from .models import Shift, ShiftRequirement
+
+
+class ShiftSerializer(serializers.ModelSerializer):
+    hours = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Shift
+        fields = ['id', 'employee', 'department', 'role', 'date', 'start_time', 'end_time', 'hours']
+
+    def get_hours(self, shift):
+        return round(shift.duration_minutes / 60, 2)
+
+
+class ShiftRequirementSerializer(serializers.ModelSerializer):
+    # ID-evi iz prefetch_related (bez upita po redu)
+    required_roles = serializers.SerializerMethodField()
+    shift_types = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ShiftRequirement
+        fields = ['id', 'department', 'date', 'required_hours', 'required_roles', 'shift_types']
+
+    def get_required_roles(self, requirement):
+        return [role.pk for role in requirement.required_roles.all()]
+
+    def get_shift_types(self, requirement):
+        return [shift_type.pk for shift_type in requirement.shift_types.all()]
+
+
+# === 📌 SKUPNI UPISI ===
+# Veze su obični ID-evi: postojanje se provjerava jednim upitom po modelu za cijeli
+# zahtjev (vidi api.py), a ne upitom po redu kao kod PrimaryKeyRelatedField.
+class ShiftWriteSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    employee = serializers.IntegerField(allow_null=True, required=False)
+    department = serializers.IntegerField()
+    role = serializers.IntegerField(allow_null=True, required=False)
+    date = serializers.DateField()
+    start_time = serializers.TimeField(allow_null=True, required=False)
+    end_time = serializers.TimeField(allow_null=True, required=False)
+
+    def validate(self, data):
+        if (data.get('start_time') is None) != (data.get('end_time') is None):
+            raise serializers.ValidationError("start_time and end_time must be set together.")
+        return data
+
+
+class ShiftBulkSerializer(serializers.Serializer):
+    upsert = ShiftWriteSerializer(many=True, required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        if not data['upsert'] and not data['delete']:
+            raise serializers.ValidationError("Nothing to do: send 'upsert' and/or 'delete'.")
+        updated = [item['id'] for item in data['upsert'] if 'id' in item]
+        if len(updated) != len(set(updated)) or set(updated) & set(data['delete']):
+            raise serializers.ValidationError("Each shift id may appear only once per request.")
+        return data
+
+
+class ShiftRequirementWriteSerializer(serializers.Serializer):
+    department = serializers.IntegerField()
+    date = serializers.DateField()
+    required_hours = serializers.IntegerField(min_value=0)
+    required_roles = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    shift_types = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
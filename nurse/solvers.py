@@ -0,0 +1,424 @@
+"""
+Strategije dodjele smjena.
+
+- `greedy`: dosadašnje ponašanje (nasumični redoslijed, prvi radnik koji odgovara);
+  uz `seed` je rezultat ponovljiv.
+- `optimal`: dekompozicija po danima, ne optimum cijelog raspona. Svaki dan je problem
+  dodjele (radnik radi najviše jednu smjenu dnevno) koji se rješava kao min-cost flow,
+  uz već isplanirane prethodne dane. Tjedni limiti i ravnomjernost kroz raspon nisu dio
+  funkcije cilja - poštuju se samo kao ograničenja jer se dani rješavaju redom nad
+  zajedničkim indeksom intervala, pa raniji dan može potrošiti radnika potrebnog kasnije.
+  To djelomično ispravlja završni prolaz preko dana (`repair_horizon`): nepopunjenu
+  smjenu preuzima radnik kojeg blokira njegova smjena drugog dana, ako tu smjenu može
+  preuzeti netko drugi (zamjena u jednom koraku).
+  Struktura smjena za zahtjeve od 24h bira se lokalnom pretragom: budžet se dijeli na
+  preostale dane i završni prolaz (neiskorišteno vrijeme prelazi dalje), a potez ponovno
+  rješava samo grupu zahtjeva tog dana koja dijeli kandidate s promijenjenim zahtjevom.
+"""
+import heapq
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from .engine import PlannedShift, plan_day, shift_hours
+
+# Težine funkcije cilja: nepopunjeni sat je uvijek skuplji od bilo koje preferencije
+UNFILLED_HOUR_COST = 1000
+PRIORITY_COST = 10
+BALANCE_COST = 1
+
+
+@dataclass
+class ScheduleResult:
+    strategy: str
+    planned: list = field(default_factory=list)
+    shifts: list = field(default_factory=list)
+    objective: float = 0
+    filled_hours: float = 0
+    unfilled_hours: float = 0
+    solve_time: float = 0
+    seed: object = None
+    timed_out_days: list = field(default_factory=list)
+    components: list = field(default_factory=list)
+    report: object = None
+
+    @property
+    def timed_out(self):
+        return bool(self.timed_out_days)
+
+    def summary(self):
+        return {
+            "strategy": self.strategy,
+            "objective": round(self.objective, 2),
+            "filled_hours": self.filled_hours,
+            "unfilled_hours": self.unfilled_hours,
+            "solve_time": round(self.solve_time, 3),
+            "seed": self.seed,
+            "timed_out": self.timed_out,
+            "timed_out_days": [day.isoformat() for day in self.timed_out_days],
+            "components": self.components,
+            "report": self.report.as_dict() if self.report is not None else None,
+        }
+
+
+def assignment_cost(employee, hours, week_hours):
+    """Cijena dodjele: manji `priority` i manje odrađenih sati u tjednu su bolji."""
+    return employee.priority * PRIORITY_COST + week_hours * BALANCE_COST - hours * UNFILLED_HOUR_COST
+
+
+def evaluate(data, planned, result):
+    """Popunjava sate i vrijednost funkcije cilja (ista za sve strategije, pa su usporedive)."""
+    requirement_hours = sum(requirement.required_hours for requirement in data.requirements)
+    filled = 0
+    penalty = 0
+    for shift in planned:
+        if shift.employee_id is None:
+            continue
+        filled += shift.hours
+        penalty += data.employees[shift.employee_id].priority * PRIORITY_COST
+    result.filled_hours = round(filled, 2)
+    result.unfilled_hours = round(max(requirement_hours - filled, 0), 2)
+    result.objective = result.unfilled_hours * UNFILLED_HOUR_COST + penalty
+    return result
+
+
+class Solver:
+    name = None
+
+    def __init__(self, seed=None, time_limit=None, progress=None):
+        self.seed = seed
+        self.time_limit = time_limit
+        self.progress = progress
+
+    def day_done(self, day, planned):
+        """Javlja napredak nakon svakog dana (npr. za pozadinske poslove)."""
+        if self.progress is not None:
+            self.progress(day, planned)
+
+    def plan(self, data, result):
+        raise NotImplementedError
+
+    def solve(self, data):
+        result = ScheduleResult(strategy=self.name, seed=self.seed)
+        started = time.perf_counter()
+        result.planned = self.plan(data, result)
+        result.solve_time = time.perf_counter() - started
+        return evaluate(data, result.planned, result)
+
+
+class GreedySolver(Solver):
+    name = "greedy"
+
+    def plan(self, data, result):
+        rng = random.Random(self.seed)
+        planned = []
+        for day in data.dates:
+            day_planned = plan_day(data, day, rng)
+            planned.extend(day_planned)
+            self.day_done(day, day_planned)
+        return planned
+
+
+class OptimalSolver(Solver):
+    name = "optimal"
+    default_time_limit = 30
+    # Završni prolaz preko dana (vidi `repair_horizon`)
+    horizon_repair = True
+
+    def plan(self, data, result):
+        from .utils import shift_structures
+
+        time_limit = self.time_limit if self.time_limit is not None else self.default_time_limit
+        deadline = time.perf_counter() + time_limit
+        planned = []
+
+        def options(requirement):
+            return [
+                [data.shift_types_by_name[name] for name in structure if name in data.shift_types_by_name]
+                for structure in shift_structures(requirement.required_hours)
+            ]
+
+        dates = data.dates
+        for day_number, day in enumerate(dates):
+            groups = [
+                [(requirement, options(requirement), candidates) for requirement, candidates in group]
+                for group in self.day_groups(data, data.requirements_for(day))
+            ]
+
+            # Svaki dan (i svaka grupa unutar dana) dobiva svoj dio preostalog budžeta, jedan dio ostaje za popravak
+            day_deadline = time.perf_counter() + max(deadline - time.perf_counter(), 0) / (
+                len(dates) - day_number + self.horizon_repair
+            )
+            day_planned, timed_out = [], False
+            for group_number, group in enumerate(groups):
+                group_deadline = time.perf_counter() + max(day_deadline - time.perf_counter(), 0) / (len(groups) - group_number)
+                best, group_timed_out = self.search(data, day, group, group_deadline)
+                timed_out = timed_out or group_timed_out
+                for evaluated, filled in best[2]:
+                    data.report.slot(evaluated, filled)
+                day_planned.extend(best[1])
+            if timed_out:
+                result.timed_out_days.append(day)
+
+            for shift in day_planned:
+                data.index.add(shift.employee_id, shift.date, shift.start_time, shift.end_time)
+            planned.extend(day_planned)
+            self.day_done(day, day_planned)
+
+        if self.horizon_repair and self.repair_horizon(data, planned, deadline):
+            result.timed_out_days.append(data.end_date)
+        return planned
+
+    def repair_horizon(self, data, planned, deadline):
+        """
+        Popunjava nepopunjene smjene zamjenom preko dana: kandidat kojeg blokira njegova
+        isplanirana smjena unutar ±6 dana (tjedni limit, preklapanje) preuzima nepopunjenu
+        smjenu ako njegovu smjenu može preuzeti drugi kandidat. Vraća True ako je isteklo vrijeme.
+        """
+        index = data.index
+        shift_types = {(st.start_time, st.end_time): st for st in data.shift_types.values()}
+        by_employee = defaultdict(list)
+        for shift in planned:
+            if shift.employee_id is not None and shift.requirement is not None:
+                by_employee[shift.employee_id].append(shift)
+
+        def candidates(shift):
+            return sorted(data.candidates(shift.requirement), key=lambda employee: (employee.priority, employee.id))
+
+        def fits(employee, shift):
+            shift_type = shift_types.get((shift.start_time, shift.end_time))
+            return (
+                not index.shifts_on(employee.id, shift.date)
+                and (shift_type is None or employee.can_work(shift_type))
+                and index.max_week_hours(employee.id, shift.date) + shift.hours <= employee.max_weekly_hours
+                and index.hours_on(employee.id, shift.date) + shift.hours <= employee.max_daily_hours
+                and not index.overlaps(employee.id, shift.date, shift.start_time, shift.end_time)
+            )
+
+        def assign(shift, employee):
+            shift.employee_id, shift.role_id = employee.id, employee.role_for(shift.requirement)
+            index.add(employee.id, shift.date, shift.start_time, shift.end_time)
+            by_employee[employee.id].append(shift)
+
+        def unassign(shift):
+            index.remove(shift.employee_id, shift.date, shift.start_time, shift.end_time)
+            by_employee[shift.employee_id].remove(shift)
+            shift.employee_id = shift.role_id = None
+
+        def swap(shift, employee):
+            for other in [s for s in by_employee[employee.id] if abs((s.date - shift.date).days) <= 6]:
+                unassign(other)
+                if fits(employee, shift):
+                    assign(shift, employee)
+                    replacement = next((c for c in candidates(other) if c.id != employee.id and fits(c, other)), None)
+                    if replacement is not None:
+                        assign(other, replacement)
+                        return True
+                    unassign(shift)
+                assign(other, employee)
+            return False
+
+        for shift in planned:
+            if shift.employee_id is not None or shift.requirement is None or shift.start_time is None:
+                continue
+            if time.perf_counter() > deadline:
+                return True
+            shift_candidates = candidates(shift)
+            employee = next((c for c in shift_candidates if fits(c, shift)), None)
+            if employee is not None:
+                assign(shift, employee)
+                continue
+            any(swap(shift, employee) for employee in shift_candidates)
+        return False
+
+    def day_groups(self, data, requirements):
+        """
+        Dijeli zahtjeve dana na grupe bez zajedničkih kandidata - radnik radi najviše jednu
+        smjenu dnevno, pa se grupe mogu rješavati (i lokalno pretraživati) neovisno.
+        Vraća [[(zahtjev, kandidati)]].
+        """
+        parent = list(range(len(requirements)))
+
+        def find(position):
+            while parent[position] != position:
+                parent[position] = parent[parent[position]]
+                position = parent[position]
+            return position
+
+        candidates, owner = [], {}
+        for position, requirement in enumerate(requirements):
+            with data.report.phase("candidates"):
+                candidates.append(data.candidates(requirement))
+            for employee in candidates[-1]:
+                if employee.id in owner:
+                    parent[find(position)] = find(owner[employee.id])
+                else:
+                    owner[employee.id] = position
+
+        groups = {}
+        for position, requirement in enumerate(requirements):
+            groups.setdefault(find(position), []).append((requirement, candidates[position]))
+        return list(groups.values())
+
+    def search(self, data, day, group, deadline):
+        """Lokalna pretraga po strukturi smjena zahtjeva u grupi; vraća (najbolje rješenje, isteklo vrijeme)."""
+        choice = [0] * len(group)
+        best = self.solve_day(data, day, group, choice)
+        improved = True
+        while improved:
+            improved = False
+            for position, (_, requirement_options, _) in enumerate(group):
+                for option in range(len(requirement_options)):
+                    if option == choice[position]:
+                        continue
+                    if time.perf_counter() > deadline:
+                        return best, True
+                    candidate_choice = choice[:position] + [option] + choice[position + 1:]
+                    candidate = self.solve_day(data, day, group, candidate_choice)
+                    if candidate[0] < best[0]:
+                        best, choice, improved = candidate, candidate_choice, True
+        return best, False
+
+    def solve_day(self, data, day, group, choice):
+        """
+        Rješava grupu zahtjeva dana za zadani izbor strukture smjena; vraća (cijena, smjene, slotovi)
+        gdje su slotovi parovi (broj provjerenih kandidata, popunjen).
+        """
+        index = data.index
+        report = data.report
+        slots = []
+        planned = []
+        checked = []
+        missing_cost = 0
+        for (requirement, requirement_options, candidates), option in zip(group, choice):
+            if not candidates:
+                planned.append(PlannedShift(None, requirement.department_id, None, day))
+                checked.append((0, False))
+                missing_cost += requirement.required_hours * UNFILLED_HOUR_COST
+                continue
+            for shift_type in requirement_options[option] if requirement_options else []:
+                slots.append((requirement, shift_type, candidates))
+        edges = []
+        with report.phase("overlap"):
+            for requirement, shift_type, candidates in slots:
+                hours = shift_hours(shift_type.start_time, shift_type.end_time)
+                slot_edges = []
+                for employee in candidates:
+                    if index.shifts_on(employee.id, day) or not employee.can_work(shift_type):
+                        continue
+                    week_hours = index.max_week_hours(employee.id, day)
+                    if week_hours + hours > employee.max_weekly_hours:
+                        continue
+                    if index.hours_on(employee.id, day) + hours > employee.max_daily_hours:
+                        continue
+                    if index.overlaps(employee.id, day, shift_type.start_time, shift_type.end_time):
+                        continue
+                    slot_edges.append((employee.id, assignment_cost(employee, hours, week_hours)))
+                edges.append(slot_edges)
+
+        matching = min_cost_assignment(edges)
+
+        cost = missing_cost
+        for position, (requirement, shift_type, candidates) in enumerate(slots):
+            employee_id = matching.get(position)
+            checked.append((len(candidates), employee_id is not None))
+            if employee_id is None:
+                cost += shift_hours(shift_type.start_time, shift_type.end_time) * UNFILLED_HOUR_COST
+                planned.append(PlannedShift(
+                    None, requirement.department_id, None, day, shift_type.start_time, shift_type.end_time,
+                    requirement=requirement,
+                ))
+                continue
+            employee = data.employees[employee_id]
+            cost += employee.priority * PRIORITY_COST
+            planned.append(PlannedShift(
+                employee_id, requirement.department_id, employee.role_for(requirement),
+                day, shift_type.start_time, shift_type.end_time, requirement=requirement,
+            ))
+        return cost, planned, checked
+
+
+def min_cost_assignment(edges):
+    """
+    Min-cost flow za bipartitnu dodjelu: `edges[i]` je lista (desni_čvor, cijena) za lijevi čvor i.
+    Svaki čvor se koristi najviše jednom; augmentira se samo dok put smanjuje ukupnu cijenu.
+    Vraća {i: desni_čvor}.
+    """
+    right_ids = list({right for slot_edges in edges for right, _ in slot_edges})
+    right_index = {right: position for position, right in enumerate(right_ids)}
+    source = 0
+    left_offset = 1
+    right_offset = left_offset + len(edges)
+    sink = right_offset + len(right_ids)
+    size = sink + 1
+
+    # Rezidualni graf: graph[u] = lista [v, kapacitet, cijena, indeks_obrnutog_brida]
+    graph = [[] for _ in range(size)]
+
+    def add_edge(u, v, cost):
+        graph[u].append([v, 1, cost, len(graph[v])])
+        graph[v].append([u, 0, -cost, len(graph[u]) - 1])
+
+    # Početni potencijali: graf je DAG pa je jedan prolaz dovoljan da reducirane cijene budu >= 0
+    potential = [0] * size
+    for position, slot_edges in enumerate(edges):
+        add_edge(source, left_offset + position, 0)
+        for right, cost in slot_edges:
+            node = right_offset + right_index[right]
+            add_edge(left_offset + position, node, cost)
+            potential[node] = min(potential[node], cost)
+    for position in range(len(right_ids)):
+        add_edge(right_offset + position, sink, 0)
+    potential[sink] = min(potential[right_offset:sink], default=0)
+
+    while True:
+        distance = [float('inf')] * size
+        previous = [None] * size
+        distance[source] = 0
+        heap = [(0, source)]
+        while heap:
+            dist, u = heapq.heappop(heap)
+            if dist > distance[u]:
+                continue
+            for edge_index, (v, capacity, cost, _) in enumerate(graph[u]):
+                if capacity <= 0:
+                    continue
+                candidate = dist + cost + potential[u] - potential[v]
+                if candidate < distance[v]:
+                    distance[v] = candidate
+                    previous[v] = (u, edge_index)
+                    heapq.heappush(heap, (candidate, v))
+
+        # Stvarna cijena najkraćeg puta; ako ne smanjuje ukupnu cijenu, rješenje je optimalno
+        if distance[sink] == float('inf') or distance[sink] + potential[sink] - potential[source] >= 0:
+            break
+        for node in range(size):
+            if distance[node] < float('inf'):
+                potential[node] += distance[node]
+
+        node = sink
+        while node != source:
+            u, edge_index = previous[node]
+            edge = graph[u][edge_index]
+            edge[1] -= 1
+            graph[node][edge[3]][1] += 1
+            node = u
+
+    # Iskorišteni bridovi lijevo → desno ostaju bez kapaciteta
+    matching = {}
+    for position in range(len(edges)):
+        for v, capacity, cost, _ in graph[left_offset + position]:
+            if right_offset <= v < sink and capacity == 0:
+                matching[position] = right_ids[v - right_offset]
+    return matching
+
+
+SOLVERS = {solver.name: solver for solver in (GreedySolver, OptimalSolver)}
+
+
+def get_solver(strategy, seed=None, time_limit=None, progress=None):
+    try:
+        return SOLVERS[strategy](seed=seed, time_limit=time_limit, progress=progress)
+    except KeyError:
+        raise ValueError(f"Unknown scheduling strategy '{strategy}' (choose from: {', '.join(SOLVERS)})")
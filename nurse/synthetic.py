@@ -0,0 +1,179 @@
+"""
+Generator sintetičkih bolnica za testiranje i benchmark.
+
+Sve se generira iz `random.Random(seed)`, pa isti parametri daju iste podatke.
+Odjeli dobivaju prefiks (default "Ward") po kojem se generirani podaci mogu
+obrisati bez diranja ostatka baze. Upis ide kroz `bulk_create` (i M2M through
+tablice), a povijest rasporeda generira postojeći engine.
+"""
+import random
+from datetime import date, time, timedelta
+
+from django.apps import apps
+from django.db import transaction
+
+FIRST_NAMES = [
+    "Ana", "Ivana", "Marija", "Petra", "Lucija", "Maja", "Katarina", "Nina", "Sara", "Ema",
+    "Ivan", "Marko", "Luka", "Josip", "Tomislav", "Ante", "Filip", "Toni", "Matej", "Karlo",
+]
+LAST_NAMES = [
+    "Horvat", "Kovačević", "Babić", "Marić", "Jurić", "Novak", "Knežević", "Vuković",
+    "Perić", "Pavlović", "Matić", "Tomić", "Božić", "Kovač", "Radić", "Grgić",
+]
+ROLE_NAMES = ["Nurse Senior", "Nurse Junior", "Healthcare Assistant", "Midwife", "Charge Nurse"]
+WEEKLY_HOURS = [36, 40, 40, 48]
+SHIFT_TYPES = {
+    "08-14": (time(8), time(14), 6),
+    "14-20": (time(14), time(20), 6),
+    "08-20": (time(8), time(20), 12),
+    "20-08": (time(20), time(8), 12),
+}
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+BATCH_SIZE = 5000
+
+
+def synthetic_departments(prefix):
+    Department = apps.get_model('nurse', 'Department')
+    return Department.objects.filter(name__startswith=f"{prefix} ")
+
+
+def clear_hospital(prefix="Ward"):
+    """Briše generirane odjele s njihovim radnicima, smjenama i zahtjevima."""
+    Employee = apps.get_model('nurse', 'Employee')
+    departments = synthetic_departments(prefix)
+    with transaction.atomic():
+        Employee.objects.filter(departments__in=departments).distinct().delete()
+        deleted, _ = departments.delete()
+    return deleted
+
+
+def reference_data():
+    """Dani u tjednu i tipovi smjena koje engine očekuje (stvaraju se ako ne postoje)."""
+    Day = apps.get_model('nurse', 'Day')
+    ShiftType = apps.get_model('nurse', 'ShiftType')
+    days = {name: Day.objects.get_or_create(name=name)[0] for name in DAY_NAMES}
+    shift_types = [
+        ShiftType.objects.get_or_create(
+            name=name, defaults={"start_time": start, "end_time": end, "duration_hours": hours}
+        )[0]
+        for name, (start, end, hours) in SHIFT_TYPES.items()
+    ]
+    return days, shift_types
+
+
+def generate_hospital(departments=10, roles=3, employees=40, availability=0.8, time_off_rate=0.05,
+                      weeks=8, future_weeks=1, shared_rate=0.05, seed=0, prefix="Ward", today=None):
+    """
+    Generira bolnicu i vraća statistiku upisanih redova.
+
+    `employees` je broj radnika po odjelu, `availability` vjerojatnost da radnik radi
+    pojedini dan u tjednu, `time_off_rate` vjerojatnost da radnik u nekom tjednu ima
+    godišnji/bolovanje, `shared_rate` udio radnika koji rade i u drugom odjelu.
+    Predlošci zahtjeva (24h + 12h dnevno po odjelu) pokrivaju `weeks` tjedana povijesti
+    i `future_weeks` tjedana unaprijed; povijest se odmah popunjava engineom.
+    """
+    Department = apps.get_model('nurse', 'Department')
+    Role = apps.get_model('nurse', 'Role')
+    Employee = apps.get_model('nurse', 'Employee')
+    RequirementTemplate = apps.get_model('nurse', 'RequirementTemplate')
+    TimeOff = apps.get_model('nurse', 'TimeOff')
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    this_week = today - timedelta(days=today.weekday())
+    first_day = this_week - timedelta(weeks=weeks)
+    last_day = this_week + timedelta(weeks=future_weeks) - timedelta(days=1)
+
+    days, shift_types = reference_data()
+    day_list = [days[name] for name in DAY_NAMES]
+
+    with transaction.atomic():
+        created_departments = Department.objects.bulk_create([
+            Department(name=f"{prefix} {n + 1}") for n in range(departments)
+        ])
+        department_roles = {}
+        role_objects = []
+        for department in created_departments:
+            # Naziv uloge je jedinstven u cijeloj bazi pa nosi ime odjela
+            names = ROLE_NAMES[:roles] + [f"Role {n + 1}" for n in range(len(ROLE_NAMES), roles)]
+            department_roles[department.pk] = [
+                Role(name=f"{department.name} {name}", department=department) for name in names
+            ]
+            role_objects.extend(department_roles[department.pk])
+        Role.objects.bulk_create(role_objects)
+
+        employee_objects = []
+        home_departments = []
+        for department in created_departments:
+            for _ in range(employees):
+                employee_objects.append(Employee(
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    max_weekly_hours=rng.choice(WEEKLY_HOURS),
+                    max_daily_hours=12,
+                    priority=rng.randint(1, 3),
+                ))
+                home_departments.append(department)
+        Employee.objects.bulk_create(employee_objects, batch_size=BATCH_SIZE)
+
+        department_links, role_links, day_links, time_off = [], [], [], []
+        for employee, department in zip(employee_objects, home_departments):
+            worked = [department]
+            if len(created_departments) > 1 and rng.random() < shared_rate:
+                worked.append(rng.choice([d for d in created_departments if d.pk != department.pk]))
+            for worked_department in worked:
+                department_links.append(Employee.departments.through(
+                    employee_id=employee.pk, department_id=worked_department.pk
+                ))
+            for role in rng.sample(department_roles[department.pk], k=rng.randint(1, min(2, roles))):
+                role_links.append(Employee.roles.through(employee_id=employee.pk, role_id=role.pk))
+            available = [day for day in day_list if rng.random() < availability] or [rng.choice(day_list)]
+            for day in available:
+                day_links.append(Employee.available_days.through(employee_id=employee.pk, day_id=day.pk))
+            for week in range(weeks + future_weeks):
+                if rng.random() < time_off_rate:
+                    start = first_day + timedelta(weeks=week, days=rng.randint(0, 6))
+                    time_off.append(TimeOff(
+                        employee=employee, start_date=start, end_date=start + timedelta(days=rng.randint(0, 4)),
+                        reason=rng.choice(['sick', 'holiday']),
+                    ))
+        Employee.departments.through.objects.bulk_create(department_links, batch_size=BATCH_SIZE)
+        Employee.roles.through.objects.bulk_create(role_links, batch_size=BATCH_SIZE)
+        Employee.available_days.through.objects.bulk_create(day_links, batch_size=BATCH_SIZE)
+        TimeOff.objects.bulk_create(time_off, batch_size=BATCH_SIZE)
+
+        # Zahtjevi kao predlošci (svaki dan u rasponu), ne red po danu
+        templates = RequirementTemplate.objects.bulk_create([
+            RequirementTemplate(department=department, valid_from=first_day, valid_until=last_day, required_hours=hours)
+            for department in created_departments for hours in (24, 12)
+        ])
+        role_through, type_through = [], []
+        for template in templates:
+            for role in department_roles[template.department_id]:
+                role_through.append(RequirementTemplate.required_roles.through(
+                    requirementtemplate_id=template.pk, role_id=role.pk
+                ))
+            for shift_type in shift_types:
+                type_through.append(RequirementTemplate.shift_types.through(
+                    requirementtemplate_id=template.pk, shifttype_id=shift_type.pk
+                ))
+        RequirementTemplate.required_roles.through.objects.bulk_create(role_through, batch_size=BATCH_SIZE)
+        RequirementTemplate.shift_types.through.objects.bulk_create(type_through, batch_size=BATCH_SIZE)
+
+    stats = {
+        "departments": len(created_departments),
+        "roles": len(role_objects),
+        "employees": len(employee_objects),
+        "time_off": len(time_off),
+        "templates": len(templates),
+        "first_day": first_day.isoformat(),
+        "last_day": last_day.isoformat(),
+        "shifts": 0,
+    }
+
+    if weeks:
+        from .utils import generate_nurse_schedule_range
+
+        result = generate_nurse_schedule_range(first_day, this_week - timedelta(days=1), created_departments, seed=seed)
+        stats["shifts"] = len(result.shifts)
+    return stats
@@ -1,3 +1,1186 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import re
+import tempfile
+import tracemalloc
+import zlib
+from datetime import date, datetime, time, timedelta
+from importlib import import_module
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from asgiref.sync import sync_to_async
+from openpyxl import load_workbook
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from . import changes, coverage, live
+from .engine import EmployeeInfo, RequirementInfo, ScheduleData, ShiftTypeInfo
+from .intervals import IntervalIndex
+from .jobs import blocking_jobs, claim_next_job, process_jobs, run_job, submit_schedule_job
+from .metrics import QueryBudgetExceeded, registry
+from .models import (
+    Department, DepartmentDayCoverage, Employee, EmployeeWeekHours, RequirementTemplate, Role, ScheduleJob, Shift,
+    ShiftChange, ShiftRequirement, ShiftType, TimeOff,
+)
+from .parallel import department_components, solve_parallel
+from .pdf import FALLBACK_FONTS, UNICODE_FONTS, pdf_fonts, roster_hash
+from .repair import repair_deleted_shift, repair_time_off
+from .solvers import OptimalSolver, get_solver, min_cost_assignment
+from .utils import date_runs, generate_nurse_schedule_range
+
+FIXTURES = ['days', 'departments', 'roles', 'shift_types', 'employees', 'shift_requirements']
+WEEK = {"start_date": "2025-02-10", "end_date": "2025-02-16"}
+
+
+class IntervalIndexTests(SimpleTestCase):
+    DAY = date(2025, 2, 10)
+
+    def test_cross_midnight_shift_belongs_to_start_day(self):
+        index = IntervalIndex(rest=timedelta(0))
+        index.add(1, self.DAY, time(20), time(8))
+        self.assertEqual((index.hours_on(1, self.DAY), index.shifts_on(1, self.DAY)), (12, 1))
+        self.assertEqual((index.hours_on(1, self.DAY + timedelta(days=1)), index.shifts_on(1, self.DAY + timedelta(days=1))), (0, 0))
+        # Sljedeće jutro se preklapa, smjena koja počinje točno u 8 ne
+        self.assertTrue(index.overlaps(1, self.DAY + timedelta(days=1), time(7), time(13)))
+        self.assertFalse(index.overlaps(1, self.DAY + timedelta(days=1), time(8), time(14)))
+        self.assertTrue(index.overlaps(1, self.DAY, time(22), time(23)))
+        self.assertFalse(index.overlaps(2, self.DAY, time(20), time(8)))
+
+    def test_rest_gap_boundary(self):
+        index = IntervalIndex(rest=timedelta(hours=12))
+        index.add(1, self.DAY, time(8), time(20))
+        next_day = self.DAY + timedelta(days=1)
+        # Od 20:00 do 08:00 je točno 12 sati odmora
+        self.assertFalse(index.overlaps(1, next_day, time(8), time(14)))
+        self.assertTrue(index.overlaps(1, next_day, time(7, 59), time(14)))
+        self.assertTrue(index.overlaps(1, next_day, time(8), time(14), rest=timedelta(hours=13)))
+        # Odmor vrijedi i prije postojeće smjene
+        self.assertFalse(index.overlaps(1, self.DAY - timedelta(days=1), time(14), time(20)))
+        self.assertTrue(index.overlaps(1, self.DAY - timedelta(days=1), time(14), time(20, 1)))
+
+    def test_add_then_query(self):
+        index = IntervalIndex(rest=timedelta(0))
+        for offset in range(0, 14, 2):
+            self.assertFalse(index.overlaps(1, self.DAY + timedelta(days=offset), time(8), time(20)))
+            index.add(1, self.DAY + timedelta(days=offset), time(8), time(20))
+            self.assertEqual(index.shifts_on(1, self.DAY + timedelta(days=offset)), 1)
+            self.assertTrue(index.overlaps(1, self.DAY + timedelta(days=offset), time(12), time(13)))
+        # Dodavanje starije smjene nakon upita
+        index.add(1, self.DAY + timedelta(days=1), time(20), time(8))
+        self.assertEqual(index.hours_in_week(1, self.DAY + timedelta(days=6)), 4 * 12 + 12)
+        self.assertEqual(index.hours_between(1, self.DAY, self.DAY + timedelta(days=13)), 7 * 12 + 12)
+        self.assertEqual(index.max_week_hours(1, self.DAY + timedelta(days=3)), 60)
+        self.assertEqual(index.max_week_hours(1, self.DAY + timedelta(days=30)), 0)
+        self.assertTrue(index.overlaps(1, self.DAY + timedelta(days=2), time(6), time(7)))
+
+        subset = index.subset([1])
+        subset.add(1, self.DAY + timedelta(days=3), time(8), time(14))
+        self.assertEqual((subset.shifts_on(1, self.DAY + timedelta(days=3)), index.shifts_on(1, self.DAY + timedelta(days=3))), (1, 0))
+
+
+class DateRunsTests(SimpleTestCase):
+
+    def test_duplicates_merge_into_runs(self):
+        days = [date(2025, 2, 12), date(2025, 2, 10), date(2025, 2, 11), date(2025, 2, 11), date(2025, 2, 14),
+                date(2025, 2, 10), date(2025, 3, 1)]
+        self.assertEqual(date_runs(days), [
+            (date(2025, 2, 10), date(2025, 2, 12)), (date(2025, 2, 14), date(2025, 2, 14)), (date(2025, 3, 1), date(2025, 3, 1)),
+        ])
+        self.assertEqual(date_runs([]), [])
+
+
+class SolverTests(TestCase):
+    fixtures = FIXTURES
+
+    def test_min_cost_assignment_is_optimal(self):
+        # Pohlepno bi 0 uzeo "a" (-10) i ostavio 1 bez radnika (-10); optimum je -9 + -9
+        self.assertEqual(min_cost_assignment([[("a", -10), ("b", -9)], [("a", -9)], [("c", 3)]]), {0: "b", 1: "a"})
+        # Četiri slota, tri radnika: najmanja ukupna cijena je -4 - 7 - 6 = -17
+        edges = [[("x", -4), ("y", -2)], [("x", -5), ("z", -7)], [("y", -6), ("z", -1)], [("x", -3)]]
+        matching = min_cost_assignment(edges)
+        self.assertEqual(matching, {0: "x", 1: "z", 2: "y"})
+        self.assertEqual(min_cost_assignment([]), {})
+
+    def test_optimal_budget_is_shared_by_days(self):
+        with self.assertLogs('nurse.engine', 'INFO'):
+            result = generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), strategy="optimal", time_limit=0)
+        # Bez budžeta svaki dan s više struktura smjena ostaje na početnom izboru, ali svaki dan je isplaniran
+        self.assertTrue(result.timed_out)
+        self.assertEqual(result.summary()["timed_out_days"], sorted(result.summary()["timed_out_days"]))
+        self.assertEqual({shift.date for shift in result.planned}, {date(2025, 2, 10) + timedelta(days=n) for n in range(7)})
+
+        with self.assertLogs('nurse.engine', 'INFO'):
+            result = generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), strategy="optimal", time_limit=30)
+        self.assertEqual(result.timed_out_days, [])
+
+    def test_horizon_repair_moves_shift_to_free_capped_employee(self):
+        monday, tuesday = date(2025, 2, 10), date(2025, 2, 11)
+
+        def schedule_data():
+            employees = {
+                1: EmployeeInfo(1, "Ana", "A", 12, 12, 1, {1}, [1], {"Monday", "Tuesday"}),
+                2: EmployeeInfo(2, "Branka", "B", 12, 12, 5, {1}, [1], {"Monday"}),
+            }
+            shift_types = {1: ShiftTypeInfo(1, "20-08", time(20), time(8), 12)}
+            requirements = [RequirementInfo(None, 1, "Odjel", day, 12, frozenset({1})) for day in (monday, tuesday)]
+            return ScheduleData(monday, tuesday, employees, shift_types, requirements, IntervalIndex(rest=timedelta(0)))
+
+        # Po danima: ponedjeljak uzima Anu (manji priority), a utorkom je Ana na tjednom limitu
+        with mock.patch.object(OptimalSolver, "horizon_repair", False):
+            per_day = get_solver("optimal", time_limit=5).solve(schedule_data())
+        self.assertEqual(per_day.unfilled_hours, 12)
+        self.assertEqual([(s.date, s.employee_id) for s in per_day.planned], [(monday, 1), (tuesday, None)])
+
+        result = get_solver("optimal", time_limit=5).solve(schedule_data())
+        self.assertEqual(result.unfilled_hours, 0)
+        self.assertEqual(sorted((s.date, s.employee_id) for s in result.planned), [(monday, 2), (tuesday, 1)])
+
+
+class ParallelTests(TestCase):
+    fixtures = FIXTURES
+
+    def test_components_merge_departments_sharing_staff(self):
+        day = date(2025, 2, 10)
+        employees = {
+            number: EmployeeInfo(number, "Radnik", str(number), 40, 12, 1, department_ids=departments)
+            for number, departments in enumerate([{1, 2}, {2, 3}, {4}, {5, 99}, {3}], start=1)
+        }
+        requirements = [RequirementInfo(None, department_id, "", day, 12) for department_id in (3, 1, 2, 4, 5, 5)]
+        data = ScheduleData(day, day, employees, {}, requirements, IntervalIndex())
+        # Odjel 99 nema zahtjeva pa ne povezuje 5 ni s čim
+        self.assertEqual(department_components(data), [{1, 2, 3}, {4}, {5}])
+
+    def test_parallel_run_reports_components(self):
+        department = Department.objects.get(name="Nurse")
+        with self.assertLogs('nurse.engine', 'INFO'):
+            result = generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=0, parallel=True, workers=1)
+        self.assertEqual([component["departments"] for component in result.components], [[department.pk]])
+        self.assertEqual(result.components[0]["unfilled_hours"], result.unfilled_hours)
+        self.assertEqual(len(result.shifts), Shift.objects.filter(date__range=(date(2025, 2, 10), date(2025, 2, 16))).count())
+
+    def test_parallel_progress_per_component(self):
+        monday, tuesday = date(2025, 2, 10), date(2025, 2, 11)
+        employees = {
+            1: EmployeeInfo(1, "Ana", "A", 40, 12, 1, {1}, [1], {"Monday", "Tuesday"}),
+            2: EmployeeInfo(2, "Branka", "B", 40, 12, 1, {2}, [1], {"Monday", "Tuesday"}),
+        }
+        shift_types = {1: ShiftTypeInfo(1, "20-08", time(20), time(8), 12)}
+        requirements = [
+            RequirementInfo(None, department_id, "Odjel", day, 12, frozenset({1}))
+            for department_id in (1, 2) for day in (monday, tuesday)
+        ]
+        data = ScheduleData(monday, tuesday, employees, shift_types, requirements, IntervalIndex(rest=timedelta(0)))
+        calls = []
+        result = solve_parallel(data, "greedy", seed=0, workers=1, progress=lambda day, shifts: calls.append(
+            (day, sorted((shift.date, shift.employee_id) for shift in shifts))
+        ))
+        # Svaka komponenta nosi pola zahtjeva, pa je nakon prve gotov prvi dan, a nakon druge cijeli raspon
+        self.assertEqual(calls, [
+            (monday, [(monday, 1), (tuesday, 1)]),
+            (tuesday, [(monday, 2), (tuesday, 2)]),
+        ])
+        self.assertEqual(result.unfilled_hours, 0)
+
+
+@override_settings(NURSE_SCHEDULE_JOB_BACKEND="queue")
+class ScheduleJobTests(TestCase):
+    fixtures = FIXTURES
+
+    def test_parallel_job_from_view(self):
+        department = Department.objects.get(name="Nurse")
+        self.client.force_login(User.objects.create_user("planer", "", "password"))
+        response = self.client.get(reverse("generate_schedule"), {
+            **WEEK, "parallel": "1", "workers": "1", "department": department.pk, "seed": "0",
+        })
+        self.assertEqual(response.status_code, 202)
+        job = ScheduleJob.objects.get(pk=response.json()["job_id"])
+        self.assertEqual((job.parallel, job.workers, list(job.departments.all())), (True, 1, [department]))
+        self.assertEqual(self.client.get(reverse("generate_schedule"), {**WEEK, "department": 999}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("generate_schedule"), {**WEEK, "workers": "0"}).status_code, 400)
+
+        with self.assertLogs('nurse.engine', 'INFO'):
+            self.assertEqual(process_jobs(), 1)
+        status = self.client.get(reverse("schedule_job_status", args=[job.pk])).json()
+        self.assertEqual(status["status"], ScheduleJob.DONE)
+        self.assertEqual([component["departments"] for component in status["summary"]["components"]], [[department.pk]])
+
+    def test_admin_action_submits_job_per_date_run(self):
+        self.client.force_login(User.objects.create_superuser("admin", "", "password"))
+        selected = ShiftRequirement.objects.filter(date__in=[date(2025, 2, 10), date(2025, 2, 11), date(2025, 2, 13)])
+        self.assertEqual(selected.count(), 6)
+        response = self.client.post(reverse("admin:nurse_shiftrequirement_changelist"), {
+            "action": "generate_schedule", "_selected_action": list(selected.values_list("pk", flat=True)),
+        })
+        self.assertRedirects(response, reverse("admin:nurse_schedulejob_changelist"), fetch_redirect_response=False)
+        # Dva zahtjeva po danu se ne generiraju dvaput; 10.-11. i 13. su zasebni rasponi
+        self.assertEqual(
+            list(ScheduleJob.objects.order_by("pk").values_list("start_date", "end_date", "status")),
+            [(date(2025, 2, 10), date(2025, 2, 11), ScheduleJob.QUEUED), (date(2025, 2, 13), date(2025, 2, 13), ScheduleJob.QUEUED)],
+        )
+        self.assertFalse(Shift.objects.exists())
+
+    def test_states_and_overlap_blocking(self):
+        first = submit_schedule_job(date(2025, 2, 10), date(2025, 2, 16), seed=0)
+        overlapping = submit_schedule_job(date(2025, 2, 14), date(2025, 2, 20), seed=0)
+        separate = submit_schedule_job(date(2025, 3, 3), date(2025, 3, 4), seed=0)
+        self.assertEqual((first.status, first.days_total, first.percent_complete), (ScheduleJob.QUEUED, 7, 0.0))
+
+        self.assertEqual(claim_next_job(), first)
+        # Preklapajući posao čeka, neovisni smije krenuti
+        self.assertEqual(list(blocking_jobs(overlapping)), [first])
+        self.assertEqual(claim_next_job(), separate)
+        self.assertIsNone(claim_next_job())
+
+        with self.assertLogs('nurse.engine', 'INFO'):
+            run_job(first)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.days_done, first.percent_complete), (ScheduleJob.DONE, 7, 100.0))
+        self.assertIsNotNone(first.finished_at)
+        self.assertEqual(claim_next_job(), overlapping)
+        self.assertEqual(ScheduleJob.objects.get(pk=overlapping.pk).status, ScheduleJob.RUNNING)
+
+        failed = submit_schedule_job(date(2025, 3, 3), date(2025, 3, 4), strategy="unknown")
+        ScheduleJob.objects.filter(pk=separate.pk).update(status=ScheduleJob.DONE)
+        run_job(claim_next_job())
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, ScheduleJob.FAILED)
+        self.assertIn("ValueError", failed.error)
+
+
+    def test_stale_running_job_is_failed_and_unblocks(self):
+        crashed = submit_schedule_job(date(2025, 2, 10), date(2025, 2, 16), seed=0)
+        alive = submit_schedule_job(date(2025, 3, 3), date(2025, 3, 4), seed=0)
+        waiting = submit_schedule_job(date(2025, 2, 14), date(2025, 2, 20), seed=0)
+        self.assertEqual((claim_next_job(), claim_next_job()), (crashed, alive))
+        self.assertIsNone(claim_next_job())
+
+        # Worker prvog posla je pao: heartbeat je star, drugi posao je i dalje živ
+        ScheduleJob.objects.filter(pk=crashed.pk).update(heartbeat_at=now() - timedelta(minutes=10))
+        with override_settings(NURSE_SCHEDULE_JOB_STALE_AFTER=300):
+            self.assertEqual(claim_next_job(), waiting)
+        crashed.refresh_from_db()
+        self.assertEqual(crashed.status, ScheduleJob.FAILED)
+        self.assertIn("heartbeat", crashed.error)
+        self.assertEqual(ScheduleJob.objects.get(pk=alive.pk).status, ScheduleJob.RUNNING)
+
+        # Ako se stari worker ipak javi, posao ostaje FAILED
+        with self.assertLogs('nurse.engine', 'INFO'):
+            run_job(crashed)
+        self.assertEqual(ScheduleJob.objects.get(pk=crashed.pk).status, ScheduleJob.FAILED)
+
+class RepairTests(TestCase):
+    fixtures = FIXTURES
+
+    def setUp(self):
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=0)
+
+    def assertNoOverlaps(self):
+        index = IntervalIndex(rest=timedelta(0))
+        for shift in Shift.objects.exclude(employee=None).order_by('date', 'start_time', 'id'):
+            self.assertFalse(index.overlaps(shift.employee_id, shift.date, shift.start_time, shift.end_time), shift)
+            index.add(shift.employee_id, shift.date, shift.start_time, shift.end_time)
+
+    def test_deleted_shift_repair(self):
+        shift = Shift.objects.exclude(employee=None).order_by('date', 'start_time', 'id').first()
+        removed_employee = shift.employee_id
+        shift.delete()
+        diff = repair_deleted_shift(shift)
+        self.assertEqual(len(diff), 1)
+        self.assertEqual((diff[0]["date"], diff[0]["from_employee_id"]), (shift.date.isoformat(), None))
+        self.assertNotEqual(diff[0]["to_employee_id"], removed_employee)
+        self.assertNoOverlaps()
+
+    def test_time_off_repair(self):
+        employee_id = Shift.objects.exclude(employee=None).values_list('employee_id', flat=True).first()
+        time_off = TimeOff.objects.create(
+            employee_id=employee_id, start_date=date(2025, 2, 10), end_date=date(2025, 2, 16), reason='sick'
+        )
+        moved = Shift.objects.filter(employee_id=employee_id, date__range=(date(2025, 2, 10), date(2025, 2, 16))).count()
+        diff = repair_time_off(time_off)
+        self.assertEqual(len(diff), moved)
+        self.assertFalse(Shift.objects.filter(employee_id=employee_id, date__range=(date(2025, 2, 10), date(2025, 2, 16))).exists())
+        self.assertNoOverlaps()
+
+    def test_overlap_migration_check_and_resolve_command(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Test isključuje SQLite triggere")
+        from django.apps import apps as django_apps
+        migration = import_module("nurse.migrations.0011_shift_no_overlap")
+        schema_editor = mock.Mock(connection=connection)
+        # Stanje prije migracije 0011: baza još ne odbija preklapanja
+        with connection.cursor() as cursor:
+            for statement in migration.SQLITE_BACKWARD:
+                cursor.execute(statement)
+        shift = Shift.objects.exclude(employee=None).order_by('date', 'start_time', 'id').first()
+        overlap = Shift.objects.create(
+            employee_id=shift.employee_id, department_id=shift.department_id, role_id=shift.role_id, date=shift.date,
+            start_time=time(shift.start_time.hour + 1, shift.start_time.minute), end_time=shift.end_time,
+        )
+        with self.assertRaisesMessage(RuntimeError, f"1 smjena se preklapa s ranijom smjenom istog radnika: [{overlap.pk}]"):
+            migration.check_no_overlapping_shifts(django_apps, schema_editor)
+
+        output = io.StringIO()
+        call_command("resolve_shift_overlaps", "--dry-run", stdout=output)
+        self.assertIn(f"#{overlap.pk} ", output.getvalue())
+        self.assertEqual(Shift.objects.get(pk=overlap.pk).employee_id, shift.employee_id)
+
+        version = changes.current_version()
+        call_command("resolve_shift_overlaps", stdout=io.StringIO())
+        overlap.refresh_from_db()
+        self.assertNotEqual(overlap.employee_id, shift.employee_id)
+        # Preko običnog managera: promjena je u dnevniku promjena
+        self.assertTrue(ShiftChange.objects.filter(shift_id=overlap.pk, version__gt=version).exists())
+        migration.check_no_overlapping_shifts(django_apps, schema_editor)
+        self.assertNoOverlaps()
+        with connection.cursor() as cursor:
+            for statement in migration.SQLITE_FORWARD:
+                cursor.execute(statement)
+
+    def test_delete_view_validates_body_before_deleting(self):
+        self.client.force_login(User.objects.create_user("planer", "", "password"))
+        shift = Shift.objects.exclude(employee=None).first()
+        url = reverse("delete_shift", args=[shift.pk])
+        self.assertEqual(self.client.post(url, "{repair", content_type="application/json").status_code, 400)
+        self.assertTrue(Shift.objects.filter(pk=shift.pk).exists())
+
+        # Ako popravak ne uspije, smjena ostaje (bez tombstonea u dnevniku promjena)
+        with mock.patch("nurse.views.repair_deleted_shift", side_effect=RuntimeError("repair failed")):
+            with self.assertRaises(RuntimeError):
+                self.client.post(url, {"repair": True}, content_type="application/json")
+        self.assertTrue(Shift.objects.filter(pk=shift.pk).exists())
+        self.assertFalse(ShiftChange.objects.filter(shift_id=shift.pk, deleted=True).exists())
+
+        response = self.client.post(url, {"repair": True}, content_type="application/json")
+        self.assertEqual(response.json()["message"], "Shift deleted and repaired!")
+        self.assertFalse(Shift.objects.filter(pk=shift.pk).exists())
+        self.assertNoOverlaps()
+
+
+class EngineTests(TestCase):
+    fixtures = FIXTURES
+
+    def schedule(self, seed):
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=seed)
+        return list(Shift.objects.order_by('date', 'start_time', 'employee_id').values_list(
+            'employee_id', 'department_id', 'date', 'start_time', 'end_time',
+        ))
+
+    def test_department_load_only_reads_its_staff(self):
+        nurse = Department.objects.get(name="Nurse")
+        other = Department.objects.create(name="Ward X")
+        outsider = Employee.objects.create(first_name="Iva", last_name="Ivić", max_weekly_hours=40, max_daily_hours=12)
+        outsider.departments.add(other)
+        shared = Employee.objects.filter(departments=nurse).first()
+        shared.departments.add(other)
+        Shift.objects.create(employee=outsider, department=other, date=date(2025, 2, 11), start_time=time(8), end_time=time(20))
+        Shift.objects.create(employee=shared, department=other, date=date(2025, 2, 12), start_time=time(8), end_time=time(20))
+
+        data = ScheduleData.load(date(2025, 2, 10), date(2025, 2, 16), [nurse])
+        self.assertNotIn(outsider.pk, data.employees)
+        self.assertEqual(set(data.employees), set(Employee.objects.filter(departments=nurse).values_list('pk', flat=True)))
+        self.assertNotIn(outsider.pk, data.index)
+        # Smjene zajedničkog radnika u drugim odjelima i dalje ograničavaju dodjelu
+        self.assertEqual(data.index.hours_on(shared.pk, date(2025, 2, 12)), 12)
+
+    def test_same_seed_same_schedule(self):
+        first = self.schedule(seed=3)
+        self.assertTrue(first)
+        self.assertEqual(self.schedule(seed=3), first)
+
+
+@override_settings(NURSE_METRICS_ENABLED=True, NURSE_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Svaki view s budžetom (`@query_budget` / `NURSE_QUERY_BUDGETS`) mora ostati unutar njega."""
+    fixtures = FIXTURES
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=0)
+        cls.user = User.objects.create_superuser("admin", "", "password")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def test_views_within_budget(self):
+        department = Department.objects.first()
+        shift = Shift.objects.exclude(employee=None).first()
+        for url, params in [
+            (reverse('nurse_schedule'), WEEK),
+            (reverse('schedule_data'), WEEK),
+            (reverse('schedule_changes'), {**WEEK, "since": 0}),
+            (reverse('export_schedule_csv'), WEEK),
+            (reverse('export_schedule_excel'), WEEK),
+            (reverse('export_schedule_pdf'), {"department": department.pk, "start_date": WEEK["start_date"]}),
+            (reverse('admin:nurse_shift_changelist'), None),
+            (reverse('admin:nurse_employee_changelist'), None),
+            (reverse('admin:nurse_shift_change', args=[shift.pk]), None),
+        ]:
+            with self.subTest(url=url), tempfile.TemporaryDirectory() as pdf_cache:
+                with override_settings(NURSE_PDF_CACHE_DIR=pdf_cache):
+                    self.get(url, params)
+
+    def test_budget_exceeded_fails(self):
+        with override_settings(NURSE_QUERY_BUDGETS={'schedule_data': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('schedule_data'), WEEK)
+
+    def test_server_timing_and_metrics(self):
+        registry.reset()
+        response = self.get(reverse('schedule_data'), WEEK)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        metrics = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(metrics.status_code, 200)
+        self.assertIn('nurse_db_queries_total{view="schedule_data"}', metrics.content.decode())
+
+    def test_memory_tracing_is_opt_in_and_skips_streams(self):
+        registry.reset()
+        self.get(reverse('schedule_data'), WEEK)
+        self.assertEqual(registry.views['schedule_data']['peak_bytes'], 0)
+
+        with override_settings(NURSE_METRICS_TRACE_MEMORY=True):
+            client = self.client_class()
+            client.force_login(self.user)
+            client.get(reverse('schedule_data'), WEEK)
+            self.assertGreater(registry.views['schedule_data']['peak_bytes'], 0)
+
+            # Dok se stream čita, tracemalloc je već isključen
+            response = client.get(reverse('export_schedule_csv'), WEEK)
+            tracing = [tracemalloc.is_tracing() for _ in response.streaming_content]
+            self.assertTrue(tracing)
+            self.assertFalse(any(tracing))
+            self.assertFalse(tracemalloc.is_tracing())
+            self.assertEqual(registry.views['export_schedule_csv']['requests'], 1)
+
+
+class ScheduleReportTests(TestCase):
+    fixtures = FIXTURES
+
+    def test_report_phases_and_json_log(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(NURSE_SCHEDULE_REPORT_DIR=directory):
+            for strategy in ("greedy", "optimal"):
+                with self.subTest(strategy=strategy), self.assertLogs('nurse.engine', 'INFO') as logs:
+                    result = generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), strategy=strategy, seed=0)
+                    self.assertTrue(any("kandidata/slot" in line for line in logs.output))
+                    report = result.summary()["report"]
+                    self.assertEqual(set(report["phases"]), {"load", "candidates", "overlap", "persist"})
+                    self.assertGreater(report["phases"]["load"]["queries"], 0)
+                    self.assertEqual(report["phases"]["overlap"]["queries"], 0)
+                    self.assertGreater(report["slots"], 0)
+                    self.assertEqual(report["unfilled_hours"], result.unfilled_hours)
+            saved = sorted(Path(directory).glob("*.json"))
+            self.assertEqual(len(saved), 2)
+            self.assertIn("candidates_per_slot", json.loads(saved[0].read_text()))
+
+    def test_slow_run_profile_is_stored(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            NURSE_SCHEDULE_PROFILE_DIR=directory, NURSE_SCHEDULE_PROFILE_THRESHOLD=0,
+        ), self.assertLogs('nurse.engine', 'INFO'):
+            result = generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=0, profile="cprofile")
+            self.assertTrue(result.report.profile_path.exists())
+            self.assertEqual(result.report.profile_path.suffix, ".prof")
+
+
+class CoverageTests(TestCase):
+    """Inkrementalno održavana statistika mora biti jednaka potpunom preračunu."""
+    fixtures = FIXTURES
+
+    def snapshot(self):
+        return (
+            sorted(DepartmentDayCoverage.objects.values_list(
+                'department_id', 'date', 'required_hours', 'assigned_minutes', 'unfilled_minutes',
+                'shift_count', 'unfilled_count',
+            )),
+            sorted(EmployeeWeekHours.objects.values_list('employee_id', 'week_start', 'minutes', 'shift_count')),
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        coverage.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_incremental_updates_match_rebuild(self):
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=0)
+        self.assertMatchesRebuild()
+
+        shift = Shift.objects.exclude(employee=None).first()
+        shift.employee = Employee.objects.exclude(pk=shift.employee_id).first()
+        shift.date = date(2025, 2, 20)
+        shift.save()
+        self.assertMatchesRebuild()
+
+        Shift.objects.filter(pk=shift.pk).update(date=date(2025, 2, 11))
+        Shift.objects.filter(date=date(2025, 2, 14)).delete()
+        Shift.objects.exclude(employee=None).last().delete()
+        self.assertMatchesRebuild()
+
+        requirement = ShiftRequirement.objects.first()
+        requirement.required_hours = 6
+        requirement.save()
+        ShiftRequirement.objects.filter(date=date(2025, 2, 15)).delete()
+        self.assertMatchesRebuild()
+
+        totals = coverage.window_totals(date(2025, 2, 10), date(2025, 2, 16))
+        self.assertEqual(totals["assigned_hours"], Shift.objects.exclude(employee=None).filter(
+            date__range=(date(2025, 2, 10), date(2025, 2, 16))).total_hours())
+
+
+class ShiftHoursTests(TestCase):
+    """Sati smjena računaju se u bazi, i za smjene preko ponoći."""
+    fixtures = FIXTURES
+
+    def setUp(self):
+        self.department = Department.objects.get(name="Nurse")
+        self.role = Role.objects.first()
+        self.ana, self.marko = Employee.objects.get(pk=1), Employee.objects.get(pk=2)
+        self.shift(self.ana, date(2025, 2, 10), time(20), time(8))
+        self.shift(self.ana, date(2025, 2, 12), time(7, 30), time(15, 15))
+        self.shift(self.marko, date(2025, 2, 11), time(22), time(6, 30))
+        self.shift(None, date(2025, 2, 11), time(8), time(20))
+
+    def shift(self, employee, day, start_time, end_time):
+        return Shift.objects.create(
+            employee=employee, department=self.department, role=self.role,
+            date=day, start_time=start_time, end_time=end_time,
+        )
+
+    def test_total_hours_and_hours_by_employee(self):
+        shifts = Shift.objects.filter(date__range=(date(2025, 2, 10), date(2025, 2, 16)))
+        self.assertEqual(shifts.total_hours(), 12 + 7.75 + 8.5 + 12)
+        self.assertEqual(shifts.exclude(employee=None).total_hours(), 28.25)
+        self.assertEqual(shifts.hours_by_employee(), [
+            {"employee_id": 1, "first_name": "Ana", "last_name": "Petrović", "hours": 19.75},
+            {"employee_id": 2, "first_name": "Marko", "last_name": "Kovač", "hours": 8.5},
+        ])
+        self.assertEqual(Shift.objects.filter(date=date(2025, 2, 13)).total_hours(), 0)
+
+    def test_duration_follows_times_across_midnight(self):
+        shift, = Shift.objects.bulk_create([Shift(
+            employee_id=3, department=self.department, role=self.role,
+            date=date(2025, 2, 13), start_time=time(22, 15), end_time=time(6, 45),
+        )])
+        shift.refresh_from_db()
+        self.assertEqual(shift.duration_minutes, 510)
+        self.assertEqual(shift.end_at - shift.start_at, timedelta(hours=8, minutes=30))
+        self.assertEqual(shift.calculate_total_hours(), 8.5)
+
+        shift.end_time = time(23, 45)
+        shift.save(update_fields=["end_time"])
+        shift.refresh_from_db()
+        self.assertEqual((shift.duration_minutes, shift.calculate_total_hours()), (90, 1.5))
+
+        # Jednak početak i kraj je prazna smjena (0 minuta), ne 24 sata
+        shift.end_time = time(22, 15)
+        shift.save()
+        self.assertEqual(Shift.objects.get(pk=shift.pk).duration_minutes, 0)
+
+    def test_duration_backfill_migration(self):
+        from django.apps import apps as django_apps
+        backfill_shift_span = import_module("nurse.migrations.0004_shift_duration").backfill_shift_span
+        no_times = self.shift(self.marko, date(2025, 2, 14), None, None)
+        expected = dict(Shift.objects.values_list("pk", "duration_minutes"))
+        self.assertEqual(sorted(expected.values()), [0, 465, 510, 720, 720])
+
+        # Stanje prije migracije: prazni stupci (bez dnevnika promjena i zbirnih tablica)
+        Shift._base_manager.update(duration_minutes=0, start_at=None, end_at=None)
+        backfill_shift_span(django_apps, None)
+        self.assertEqual(dict(Shift.objects.values_list("pk", "duration_minutes")), expected)
+        self.assertEqual(Shift.objects.get(pk=no_times.pk).start_at, None)
+        self.assertEqual(Shift.objects.filter(date__range=(date(2025, 2, 10), date(2025, 2, 16))).total_hours(), 40.25)
+
+    def test_schedule_view_hours(self):
+        self.client.force_login(User.objects.create_user("planer", "", "password"))
+        # Bez odjela sati dolaze iz tjednih zbirnih redova, s odjelom iz smjena - rezultat mora biti isti
+        for extra in ({}, {"department": self.department.pk}):
+            context = self.client.get(reverse("nurse_schedule"), {**WEEK, **extra}).context
+            self.assertEqual(context["employee_hours"], {"Ana Petrović": 19.75, "Marko Kovač": 8.5})
+            self.assertEqual(context["total_assigned_hours"], 28.25)
+
+
+def pdf_font_characters(content):
+    """{ugrađeni font: znakovi iz njegove ToUnicode tablice} - koji su se znakovi stvarno nacrtali kojim fontom."""
+    characters = {}
+    for header, data in re.findall(rb"<<([^>]*?)>>\s*stream\r?\n(.*?)endstream", content, re.S):
+        if b"ASCII85Decode" in header:
+            data = base64.a85decode(data.strip(), adobe=True)
+        data = zlib.decompress(data)
+        font = re.search(rb"/CMapName /\w+\+([\w-]+) def", data)
+        if font is not None:
+            codes = re.findall(rb"<[0-9A-F]{2}> <([0-9A-F]{4})>", data)
+            characters[font.group(1).decode()] = {chr(int(code, 16)) for code in codes} - {"\0"}
+    return characters
+
+
+class ExportTests(TestCase):
+    fixtures = FIXTURES
+
+    def setUp(self):
+        self.nurse = Department.objects.get(name="Nurse")
+        self.icu = Department.objects.create(name="ICU")
+        Shift.objects.create(employee_id=1, department=self.nurse, role_id=1, date=date(2025, 2, 10),
+                             start_time=time(20), end_time=time(8))
+        Shift.objects.create(employee=None, department=self.nurse, role=None, date=date(2025, 2, 11),
+                             start_time=time(8), end_time=time(20))
+        Shift.objects.create(employee_id=2, department=self.icu, role_id=2, date=date(2025, 2, 18),
+                             start_time=time(7, 30), end_time=time(15, 15))
+        self.client.force_login(User.objects.create_superuser("admin", "", "password"))
+
+    def csv_rows(self, response):
+        self.assertEqual(response["Content-Type"], "text/csv")
+        return list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+
+    def test_csv_export_streams_filtered_rows(self):
+        header = ["Employee", "Department", "Role", "Date", "Start Time", "End Time", "Total Hours"]
+        ana = ["Ana Petrović", "Nurse", "Nurse Senior", "2025-02-10", "20:00:00", "08:00:00", "12.0"]
+        unfilled = ["⚠️ Worker Missing", "Nurse", "⚠️ Role Missing", "2025-02-11", "08:00:00", "20:00:00", "12.0"]
+        marko = ["Marko Kovač", "ICU", "Nurse Junior", "2025-02-18", "07:30:00", "15:15:00", "7.75"]
+
+        response = self.client.get(reverse("export_schedule_csv"), WEEK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.csv_rows(response), [header, ana, unfilled])
+        self.assertEqual(self.csv_rows(self.client.get(reverse("export_schedule_csv"))), [header, ana, unfilled, marko])
+        self.assertEqual(
+            self.csv_rows(self.client.get(reverse("export_schedule_csv"), {"department": self.icu.pk})), [header, marko]
+        )
+        self.assertEqual(self.client.get(reverse("export_schedule_csv"), {"department": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("export_schedule_csv"), {"start_date": "10.2.2025."}).status_code, 400)
+
+        # Broj upita ne ovisi o broju redova
+        def export_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.csv_rows(self.client.get(reverse("export_schedule_csv")))
+            return len(queries)
+        before = export_queries()
+        Shift.objects.create(employee_id=3, department=self.icu, role_id=1, date=date(2025, 2, 19),
+                             start_time=time(8), end_time=time(20))
+        self.assertEqual(export_queries(), before)
+
+        response = self.client.post(reverse("admin:nurse_shift_changelist"), {
+            "action": "export_schedule_to_csv",
+            "_selected_action": list(Shift.objects.filter(department=self.icu).values_list("pk", flat=True)),
+        })
+        self.assertEqual(self.csv_rows(response), [header, marko, [
+            "Luka Horvat", "ICU", "Nurse Senior", "2025-02-19", "08:00:00", "20:00:00", "12.0",
+        ]])
+
+    def test_pdf_roster_draws_croatian_names(self):
+        if pdf_fonts() == FALLBACK_FONTS:
+            self.skipTest("DejaVuSans.ttf nije instaliran")
+        self.icu.name = "Intenzivna njega Čakovec"
+        self.icu.save()
+        employee = Employee.objects.create(first_name="Đurđa", last_name="Šimić-Žužić", max_weekly_hours=40,
+                                           max_daily_hours=12, priority=1)
+        employee.departments.set([self.icu])
+        Shift.objects.create(employee=employee, department=self.icu, role_id=1, date=date(2025, 2, 19),
+                             start_time=time(20), end_time=time(8))
+
+        with tempfile.TemporaryDirectory() as pdf_cache, override_settings(NURSE_PDF_CACHE_DIR=pdf_cache):
+            response = self.client.get(reverse("export_schedule_pdf"), {"department": self.icu.pk, "start_date": "2025-02-17"})
+            self.assertEqual(response.status_code, 200)
+            characters = pdf_font_characters(b"".join(response.streaming_content))
+        regular, bold = UNICODE_FONTS
+        self.assertLessEqual(set("ĐđŠćŽž"), characters[regular])
+        self.assertIn("Č", characters[bold])
+
+        # Font je dio ključa cachea, a neispravan odjel nije 500
+        roster = {"department": "Čakovec", "rows": []}
+        self.assertNotEqual(roster_hash(roster, UNICODE_FONTS), roster_hash(roster, FALLBACK_FONTS))
+        self.assertEqual(self.client.get(reverse("export_schedule_pdf"), {"department": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("export_schedule_pdf")).status_code, 400)
+        self.assertEqual(self.client.get(reverse("export_schedule_pdf"), {"department": 999}).status_code, 404)
+
+    def workbook(self, response):
+        self.assertEqual(response["Content-Type"], "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        return {sheet.title: list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets}
+
+    def test_xlsx_export_sheets_and_summary(self):
+        header = ("Employee", "Department", "Role", "Date", "Start Time", "End Time", "Total Hours")
+        ana = ("Ana Petrović", "Nurse", "Nurse Senior", datetime(2025, 2, 10), time(20), time(8), 12)
+        unfilled = ("⚠️ Worker Missing", "Nurse", "⚠️ Role Missing", datetime(2025, 2, 11), time(8), time(20), 12)
+        marko = ("Marko Kovač", "ICU", "Nurse Junior", datetime(2025, 2, 18), time(7, 30), time(15, 15), 7.75)
+        summary_header = ("Department", "Shifts", "Unfilled Shifts", "Total Hours")
+
+        sheets = self.workbook(self.client.get(reverse("export_schedule_excel"), WEEK))
+        self.assertEqual(sheets, {
+            "Schedule": [header, ana, unfilled],
+            "Summary": [summary_header, ("Nurse", 2, 1, 24), ("Total", 2, 1, 24)],
+        })
+
+        # Listovi po odjelu redom prvog pojavljivanja, Summary je uvijek zadnji
+        response = self.client.get(reverse("export_schedule_excel"), {"per_department": "1"})
+        sheets = self.workbook(response)
+        self.assertEqual(list(sheets), ["Nurse", "ICU", "Summary"])
+        self.assertEqual(sheets["Nurse"], [header, ana, unfilled])
+        self.assertEqual(sheets["ICU"], [header, marko])
+        self.assertEqual(sheets["Summary"], [
+            summary_header, ("ICU", 1, 0, 7.75), ("Nurse", 2, 1, 24), ("Total", 3, 1, 31.75),
+        ])
+
+        response = self.client.post(reverse("admin:nurse_shift_changelist"), {
+            "action": "export_schedule_to_excel",
+            "_selected_action": list(Shift.objects.filter(department=self.icu).values_list("pk", flat=True)),
+        })
+        self.assertEqual(self.workbook(response), {
+            "Schedule": [header, marko],
+            "Summary": [summary_header, ("ICU", 1, 0, 7.75), ("Total", 1, 0, 7.75)],
+        })
+
+
+class AdminTotalsTests(TestCase):
+    fixtures = FIXTURES
+
+    def setUp(self):
+        self.today = now().date()
+        self.department = Department.objects.get(name="Nurse")
+        self.shift(1, 1, time(20), time(8))
+        self.shift(None, 1, time(8), time(20))
+        self.shift(2, 2, time(22), time(6, 30))
+        self.shift(1, 8, time(8), time(20))
+        self.client.force_login(User.objects.create_superuser("admin", "", "password"))
+
+    def shift(self, employee_id, days_ago, start_time, end_time):
+        return Shift.objects.create(employee_id=employee_id, department=self.department, role_id=1,
+                                    date=self.today - timedelta(days=days_ago), start_time=start_time, end_time=end_time)
+
+    def test_shift_changelist_totals(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:nurse_shift_changelist"))
+        self.assertEqual(response.context["total_shift_hours"], "📊 Ukupni sati rasporeda: 44.5")
+        # Zadnjih 7 dana, samo dodijeljene smjene (smjena od prije 8 dana ne ulazi)
+        self.assertEqual(response.context["total_hours_last_week"], "📊 Ukupni Total Hours Last 7 Days: 20.5")
+        max_hours = sum(Employee.objects.values_list("max_weekly_hours", flat=True))
+        self.assertEqual(response.context["total_employee_max_hours"], f"📊 Ukupni max weekly hours: {max_hours}")
+        self.assertEqual(
+            sorted((shift.date, shift.day_total_hours) for shift in response.context["cl"].result_list),
+            sorted([(self.today - timedelta(days=1), 24)] * 2
+                   + [(self.today - timedelta(days=2), 8.5), (self.today - timedelta(days=8), 12)]),
+        )
+        self.assertContains(response, "Total: 24.0h", count=2)
+
+        # Više smjena na stranici ne znači više upita
+        for days_ago in range(3, 8):
+            self.shift(3, days_ago, time(8), time(20))
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get(reverse("admin:nurse_shift_changelist"))
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_employee_changelist_hours_last_week(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:nurse_employee_changelist"))
+        max_hours = sum(Employee.objects.values_list("max_weekly_hours", flat=True))
+        self.assertEqual(response.context["summary_data"], {
+            "📊 Ukupni max weekly hours": max_hours,
+            "📊 Ukupni Total Hours Last 7 Days": 20.5,
+        })
+        hours = {employee.pk: employee.get_total_hours_last_week() for employee in response.context["cl"].result_list}
+        self.assertEqual(hours, {pk: {1: 12, 2: 8.5}.get(pk, 0) for pk in Employee.objects.values_list("pk", flat=True)})
+        # Isti rezultat daje i pojedinačni izračun (bez anotacije)
+        self.assertEqual(Employee.objects.get(pk=1).get_total_hours_last_week(), 12)
+
+        # Odjeli i uloge dolaze iz prefetcha, pa novi radnici ne dodaju upite
+        for number in range(3):
+            employee = Employee.objects.create(first_name="Novi", last_name=str(number), max_weekly_hours=40,
+                                               max_daily_hours=12, priority=1)
+            employee.departments.set([self.department])
+            employee.roles.set(Role.objects.all())
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get(reverse("admin:nurse_employee_changelist"))
+        self.assertEqual(len(more_queries), len(queries))
+
+
+class ApiTests(TestCase):
+    fixtures = FIXTURES
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user("tablet", "", "password")
+
+    def setUp(self):
+        token = self.client.post(reverse('api_token'), {"username": "tablet", "password": "password"})
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token.json()['access']}"}
+
+    def post(self, name, payload):
+        return self.client.post(reverse(name), payload, content_type="application/json", **self.auth)
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(reverse('api-shift-list')).status_code, 401)
+
+    def test_bulk_upsert_delete_and_etag(self):
+        department = Department.objects.first()
+        employees = list(Employee.objects.filter(departments=department)[:2])
+        created = self.post('api-shift-bulk', {"upsert": [
+            {"employee": employee.pk, "department": department.pk, "date": "2025-02-10",
+             "start_time": "08:00", "end_time": "20:00"}
+            for employee in employees
+        ]})
+        self.assertEqual(created.status_code, 200, created.content)
+        first, second = created.json()["created"]
+
+        params = {"date_after": "2025-02-10", "date_before": "2025-02-16", "department": department.pk}
+        listing = self.client.get(reverse('api-shift-list'), params, **self.auth)
+        self.assertEqual([row["id"] for row in listing.json()["results"]], [first, second])
+        self.assertEqual(listing.json()["results"][0]["hours"], 12)
+        unchanged = self.client.get(reverse('api-shift-list'), params, HTTP_IF_NONE_MATCH=listing['ETag'], **self.auth)
+        self.assertEqual(unchanged.status_code, 304)
+
+        changed = self.post('api-shift-bulk', {
+            "upsert": [{"id": first, "employee": None, "department": department.pk, "date": "2025-02-11"}],
+            "delete": [second],
+        })
+        self.assertEqual(changed.json()["deleted"], 1)
+        listing = self.client.get(reverse('api-shift-list'), params, HTTP_IF_NONE_MATCH=listing['ETag'], **self.auth)
+        self.assertEqual(listing.status_code, 200)
+        self.assertEqual(listing.json()["results"][0]["employee"], None)
+
+    def test_bulk_is_all_or_nothing(self):
+        department = Department.objects.first()
+        employee = Employee.objects.filter(departments=department).first()
+        shift = {"employee": employee.pk, "department": department.pk, "date": "2025-02-10",
+                 "start_time": "08:00", "end_time": "20:00"}
+        self.assertEqual(self.post('api-shift-bulk', {"upsert": [shift, {**shift, "role": 999999}]}).status_code, 400)
+        self.assertEqual(self.post('api-shift-bulk', {"upsert": [shift, {**shift, "start_time": "14:00"}]}).status_code, 409)
+        self.assertFalse(Shift.objects.exists())
+
+    def test_bulk_requirements(self):
+        department = Department.objects.first()
+        role_ids = list(department.role_set.values_list('pk', flat=True))
+        response = self.post('api-requirement-bulk', [
+            {"department": department.pk, "date": f"2025-03-{day:02d}", "required_hours": 24,
+             "required_roles": role_ids, "shift_types": []}
+            for day in range(1, 8)
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        listing = self.client.get(reverse('api-requirement-list'), {"date_after": "2025-03-01"}, **self.auth)
+        self.assertEqual(len(listing.json()["results"]), 7)
+        self.assertEqual(listing.json()["results"][0]["required_roles"], sorted(role_ids))
+
+
+class ShiftChangeTests(TestCase):
+    fixtures = FIXTURES
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("nurse", "", "password")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def changes(self, since, **params):
+        return self.client.get(reverse('schedule_changes'), {**WEEK, "since": since, **params})
+
+    def test_delta_since_token(self):
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=0)
+        version = self.client.get(reverse('schedule_data'), WEEK).json()["version"]
+        self.assertEqual(self.changes(version).json(), {"version": version, "has_more": False, "results": [], "deleted": []})
+
+        edited = Shift.objects.exclude(employee=None).filter(date=date(2025, 2, 10)).first()
+        moved = Shift.objects.filter(date=date(2025, 2, 11)).first()
+        removed = Shift.objects.filter(date=date(2025, 2, 12)).first()
+        removed_pk = removed.pk
+        response = self.client.post(
+            reverse('edit_shift', args=[edited.pk]),
+            {"employee": "", "date": "2025-02-10", "start_time": "07:00", "end_time": "15:00"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        Shift.objects.filter(pk=moved.pk).update(date=date(2025, 3, 1))
+        removed.delete()
+
+        delta = self.changes(version).json()
+        self.assertEqual([row["id"] for row in delta["results"]], [edited.pk])
+        self.assertIsNone(delta["results"][0]["employee_id"])
+        self.assertEqual(sorted(delta["deleted"]), sorted([moved.pk, removed_pk]))
+        self.assertTrue(ShiftChange.objects.filter(shift_id=removed_pk, deleted=True).exists())
+
+        # Paginacija: ostatak se dohvaća od vraćenog tokena
+        first = self.changes(version, limit=1).json()
+        self.assertTrue(first["has_more"])
+        rest = self.changes(first["version"]).json()
+        self.assertEqual(rest["version"], delta["version"])
+
+        # Regeneriranje: stare smjene su tombstonei, nove dolaze kao rezultati
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=1)
+        delta = self.changes(delta["version"]).json()
+        self.assertEqual({row["id"] for row in delta["results"]}, set(
+            Shift.objects.filter(date__range=(date(2025, 2, 10), date(2025, 2, 16))).values_list('pk', flat=True)
+        ))
+        self.assertIn(edited.pk, delta["deleted"])
+
+        response = self.changes(version)
+        cached = self.client.get(
+            reverse('schedule_changes'), {**WEEK, "since": version}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_invalid_and_expired_tokens(self):
+        Shift.objects.create(department=Department.objects.first(), date=date(2025, 2, 10))
+        self.assertEqual(self.changes("abc").status_code, 400)
+        self.assertEqual(self.changes(changes.current_version() + 1).status_code, 410)
+
+        Shift.objects.create(department=Department.objects.first(), date=date(2025, 2, 11))
+        ShiftChange.objects.update(changed_at=now() - timedelta(days=60))
+        self.assertEqual(changes.prune(now() - timedelta(days=30)), 1)
+        self.assertEqual(self.changes(0).status_code, 410)
+        self.assertEqual(self.changes(changes.current_version() - 1).status_code, 200)
+
+
+class ChangeLogTransactionTests(TransactionTestCase):
+    """Bez vanjske transakcije (autocommit, kao u viewovima i adminu) smjena i njezina promjena idu zajedno."""
+    fixtures = FIXTURES
+
+    def setUp(self):
+        self.shift = Shift.objects.create(employee_id=1, department_id=1, role_id=1, date=date(2025, 2, 10),
+                                          start_time=time(8), end_time=time(20))
+
+    def test_failed_change_log_write_rolls_back_shift(self):
+        self.assertFalse(connection.in_atomic_block)
+        self.assertTrue(ShiftChange.objects.filter(shift_id=self.shift.pk).exists())
+        failing = mock.patch("nurse.changes.record", side_effect=RuntimeError("change log down"))
+
+        self.client.force_login(User.objects.create_user("planer", "", "password"))
+        with failing:
+            response = self.client.post(reverse("edit_shift", args=[self.shift.pk]), {
+                "employee": 2, "date": "2025-02-11", "start_time": "20:00", "end_time": "08:00",
+            }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+        for write in (
+            lambda: Shift.objects.filter(pk=self.shift.pk).update(employee_id=2),
+            lambda: Shift.objects.filter(pk=self.shift.pk).delete(),
+            lambda: Shift.objects.get(pk=self.shift.pk).delete(),
+            lambda: Shift.objects.bulk_create([Shift(department_id=1, date=date(2025, 2, 12))]),
+        ):
+            with failing, self.assertRaises(RuntimeError):
+                write()
+        self.assertEqual(list(Shift.objects.values_list("pk", "employee_id", "date")),
+                         [(self.shift.pk, 1, date(2025, 2, 10))])
+        self.assertEqual(ShiftChange.objects.count(), 1)
+
+        # Isto vrijedi za zbirnu statistiku zahtjeva
+        requirement = ShiftRequirement.objects.first()
+        requirement.required_hours += 6
+        with mock.patch("nurse.coverage.refresh_shifts", side_effect=RuntimeError("coverage down")):
+            with self.assertRaises(RuntimeError):
+                requirement.save()
+        self.assertEqual(ShiftRequirement.objects.get(pk=requirement.pk).required_hours, requirement.required_hours - 6)
+
+
+class LiveStreamTests(TransactionTestCase):
+    async def read(self, stream):
+        return (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+
+    def test_requires_asgi(self):
+        user = User.objects.create_user("nurse", "", "password")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('schedule_stream'), WEEK).status_code, 501)
+
+    async def test_stream_pushes_window_changes(self):
+        user = await sync_to_async(User.objects.create_user)("nurse", "", "password")
+        await self.async_client.aforce_login(user)
+        department, other = [await Department.objects.acreate(name=name) for name in ("Live", "Other")]
+
+        response = await self.async_client.get(reverse('schedule_stream'), {**WEEK, "department": department.pk})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertIn("retry:", await self.read(stream))
+        self.assertIn("event: hello", await self.read(stream))
+
+        # Promjena drugog odjela se ne šalje, smjena iz prozora i njezino brisanje da
+        await Shift.objects.acreate(department=other, date=date(2025, 2, 11))
+        shift = await Shift.objects.acreate(department=department, date=date(2025, 2, 11))
+        message = await self.read(stream)
+        self.assertIn("event: shifts", message)
+        payload = json.loads(message.split("data: ", 1)[1])
+        self.assertEqual([row["id"] for row in payload["results"]], [shift.pk])
+        self.assertIn(f"id: {payload['version']}", message)
+
+        shift_id = shift.pk
+        await sync_to_async(shift.delete)()
+        payload = json.loads((await self.read(stream)).split("data: ", 1)[1])
+        self.assertEqual(payload["deleted"], [shift_id])
+        # Prekid veze (ASGI handler otkazuje čitanje) odjavljuje pretplatu
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertFalse(live.broadcaster.subscriptions)
+
+
+class BulkImportTests(TestCase):
+    fixtures = FIXTURES
+
+    def write_csv(self, directory, lines):
+        path = Path(directory) / "employees.csv"
+        path.write_text("\n".join(lines), encoding="utf-8")
+        return str(path)
+
+    def test_employee_csv_dry_run_and_import(self):
+        header = "First Name,Last Name,Departments,Roles,Max Weekly Hours,Max Daily Hours,Available Days,Can Work Shifts"
+        lines = [header, "Ana,Petrović,Nurse,Nurse Senior,40,12,Monday;Tuesday,08-14", "Novi,Radnik,Nurse,Nurse Junior,36,8,Friday,"]
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_csv(directory, lines)
+            output = io.StringIO()
+            call_command("bulk_import", "employees", path, "--dry-run", stdout=output)
+            self.assertIn("1 novih, 1 promijenjenih", output.getvalue())
+            self.assertIn("max_weekly_hours: 48 → 40", output.getvalue())
+            self.assertFalse(Employee.objects.filter(first_name="Novi").exists())
+
+            call_command("bulk_import", "employees", path, stdout=io.StringIO())
+            ana = Employee.objects.get(first_name="Ana", last_name="Petrović")
+            self.assertEqual(ana.max_weekly_hours, 40)
+            self.assertEqual(sorted(ana.available_days.values_list("name", flat=True)), ["Monday", "Tuesday"])
+            new = Employee.objects.get(first_name="Novi")
+            self.assertEqual((new.priority, new.can_work_shifts.count()), (1, 0))
+            self.assertEqual(list(new.roles.values_list("name", flat=True)), ["Nurse Junior"])
+
+            # Jedan neispravan red - ništa se ne sprema
+            path = self.write_csv(directory, lines[:2] + ["Treći,Radnik,Nepostojeći,,40,12,,"])
+            with self.assertRaises(CommandError):
+                call_command("bulk_import", "employees", path, stdout=io.StringIO(), stderr=io.StringIO())
+            self.assertFalse(Employee.objects.filter(first_name="Treći").exists())
+
+    def test_requirement_xlsx_admin_upload(self):
+        from openpyxl import Workbook
+
+        def upload(*rows):
+            workbook = Workbook()
+            workbook.active.append(["department", "date", "required_hours", "shift_types", "required_roles"])
+            for row in rows:
+                workbook.active.append(row)
+            content = io.BytesIO()
+            workbook.save(content)
+            content.seek(0)
+            content.name = "requirements.xlsx"
+            response = self.client.post(reverse("admin:nurse_shiftrequirement_bulk_import"), {"file": content})
+            self.assertEqual(response.status_code, 200)
+            return response.context["report"]
+
+        self.client.force_login(User.objects.create_superuser("admin", "", "password"))
+        new = ["Nurse", date(2025, 3, 3), 24, "08-14;14-20", "Nurse Senior"]
+        # Fixture ima dva zahtjeva za isti odjel i dan - ključ nije jednoznačan
+        report = upload(new, ["Nurse", "2025-02-10", 12, None, None])
+        self.assertEqual(report.errors[0][0], 3)
+        self.assertFalse(ShiftRequirement.objects.filter(date=date(2025, 3, 3)).exists())
+
+        self.assertTrue(upload(new).ok)
+        requirement = ShiftRequirement.objects.get(date=date(2025, 3, 3))
+        self.assertEqual(sorted(requirement.shift_types.values_list("name", flat=True)), ["08-14", "14-20"])
+        self.assertEqual(DepartmentDayCoverage.objects.get(date=date(2025, 3, 3)).required_hours, 24)
+
+        report = upload(["Nurse", date(2025, 3, 3), 16, "08-14;14-20", "Nurse Senior"])
+        self.assertEqual((report.updated, report.diff[0][3]), (1, {"required_hours": (24, 16)}))
+        self.assertEqual(DepartmentDayCoverage.objects.get(date=date(2025, 3, 3)).required_hours, 16)
+
+
+class RequirementTemplateTests(TestCase):
+    fixtures = FIXTURES
+
+    def create_template(self, **fields):
+        fields = {"department": Department.objects.get(name="Nurse"), "valid_from": date(2025, 2, 10),
+                  "required_hours": 24, **fields}
+        template = RequirementTemplate.objects.create(**fields)
+        template.shift_types.set(ShiftType.objects.all())
+        template.required_roles.set(Role.objects.all())
+        return template
+
+    def test_occurrence_count_matches_dates(self):
+        templates = [
+            RequirementTemplate(valid_from=date(2025, 2, 12), valid_until=until, weekday=weekday, every_weeks=every)
+            for until in (None, date(2025, 4, 2)) for weekday in (None, 0, 3, 6) for every in (1, 2, 3)
+        ]
+        ranges = [(date(2025, 2, 1), date(2025, 5, 1)), (date(2025, 2, 13), date(2025, 2, 13)),
+                  (date(2025, 3, 5), date(2025, 3, 30)), (date(2025, 1, 1), date(2025, 2, 11))]
+        for template in templates:
+            for start, end in ranges:
+                self.assertEqual(template.occurrence_count(start, end), len(list(template.dates(start, end))),
+                                 (template.weekday, template.every_weeks, template.valid_until, start, end))
+        self.assertEqual(templates[0].occurrence_count(date.min, date.max), (date.max - date(2025, 2, 12)).days + 1)
+
+    def test_generation_and_totals_use_templates_with_overrides(self):
+        self.create_template(valid_until=date(2025, 2, 23))
+        department = Department.objects.get(name="Nurse")
+        # 0 sati: taj dan se ništa ne traži
+        ShiftRequirement.objects.create(department=department, date=date(2025, 2, 20), required_hours=0)
+
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 23), seed=0)
+        hours = {
+            day: Shift.objects.filter(date=day).total_hours()
+            for day in (date(2025, 2, 12), date(2025, 2, 18), date(2025, 2, 20), date(2025, 2, 23))
+        }
+        self.assertEqual(hours[date(2025, 2, 18)], 24)
+        self.assertEqual(hours[date(2025, 2, 23)], 24)
+        self.assertEqual(hours[date(2025, 2, 20)], 0)
+        # Fixture zahtjevi zamjenjuju predložak u prvom tjednu
+        concrete = sum(ShiftRequirement.objects.filter(date=date(2025, 2, 12)).values_list('required_hours', flat=True))
+        self.assertEqual(hours[date(2025, 2, 12)], concrete)
+
+        totals = coverage.window_totals(date(2025, 2, 17), date(2025, 2, 23))
+        self.assertEqual(totals["required_hours"], 24 * 6)
+        first_week = coverage.window_totals(date(2025, 2, 10), date(2025, 2, 16))["required_hours"]
+        self.assertEqual(first_week, sum(ShiftRequirement.objects.filter(
+            date__range=(date(2025, 2, 10), date(2025, 2, 16))).values_list('required_hours', flat=True)))
+
+    def test_admin_totals_skip_templates(self):
+        self.create_template()
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 10), date(2025, 2, 16), seed=0)
+        totals = coverage.shift_totals(date.min, date.max, since=date(2025, 2, 14))
+        window = coverage.window_totals(date.min, date.max)
+        self.assertEqual(totals["total_hours"], window["total_hours"])
+        self.assertEqual(totals["assigned_hours_since"], coverage.window_totals(date(2025, 2, 14), date.max)["assigned_hours"])
+
+        self.client.force_login(User.objects.create_superuser("admin", "", "password"))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse("admin:nurse_shift_changelist")).status_code, 200)
+        self.assertFalse([query for query in queries if "nurse_requirementtemplate" in query["sql"]])
+        self.assertEqual(sum("nurse_departmentdaycoverage" in query["sql"] for query in queries), 2)
+
+    def test_every_weeks_must_be_positive(self):
+        template = self.create_template()
+        template.every_weeks = 0
+        with self.assertRaises(ValidationError) as raised:
+            template.full_clean()
+        self.assertIn('every_weeks', raised.exception.message_dict)
+        # Baza odbija i zapis koji zaobiđe validaciju
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RequirementTemplate.objects.filter(pk=template.pk).update(every_weeks=0)
+
+    def test_zero_hour_requirement_means_nothing_required(self):
+        self.create_template(valid_from=date(2025, 2, 17), valid_until=date(2025, 2, 23))
+        department = Department.objects.get(name="Nurse")
+        day = date(2025, 2, 19)
+        ShiftRequirement.objects.create(department=department, date=day, required_hours=0)
+
+        with self.assertLogs('nurse.engine', 'INFO'):
+            generate_nurse_schedule_range(date(2025, 2, 17), date(2025, 2, 23), seed=0)
+        self.assertFalse(Shift.objects.filter(department=department, date=day).exists())
+        self.assertEqual(Shift.objects.filter(department=department, date=date(2025, 2, 18)).total_hours(), 24)
+        totals = coverage.window_totals(day, day, department.id)
+        self.assertEqual(totals["required_hours"], 0)
+        self.assertEqual(totals["assigned_hours"], 0)
 
-# Create your tests here.
@@ -1,11 +1,24 @@
-from django.urls import path
-from .views import nurse_schedule, generate_schedule, export_schedule_csv, export_schedule_excel, delete_shift, edit_shift
+from django.urls import include, path
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from .api import router
+from .views import nurse_schedule, schedule_data, schedule_changes, schedule_stream, generate_schedule, schedule_job_status, export_schedule_csv, export_schedule_excel, export_schedule_pdf, delete_shift, edit_shift
 
 urlpatterns = [
     path('schedule/', nurse_schedule, name='nurse_schedule'),
+    path('schedule/data/', schedule_data, name='schedule_data'),
+    path('schedule/changes/', schedule_changes, name='schedule_changes'),
+    path('schedule/stream/', schedule_stream, name='schedule_stream'),
     path('schedule/generate/', generate_schedule, name='generate_schedule'),
+    path('schedule/jobs/<int:job_id>/', schedule_job_status, name='schedule_job_status'),
     path('schedule/export/csv/', export_schedule_csv, name='export_schedule_csv'),
     path('schedule/export/excel/', export_schedule_excel, name='export_schedule_excel'),
+    path('schedule/export/pdf/', export_schedule_pdf, name='export_schedule_pdf'),
     path('schedule/delete/<int:shift_id>/', delete_shift, name='delete_shift'),
     path('schedule/edit/<int:shift_id>/', edit_shift, name='edit_shift'),
-]
\ No newline at end of file
+
+    # REST API za tablete (JWT)
+    path('api/v1/token/', TokenObtainPairView.as_view(), name='api_token'),
+    path('api/v1/token/refresh/', TokenRefreshView.as_view(), name='api_token_refresh'),
+    path('api/v1/', include(router.urls)),
+]
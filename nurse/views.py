@@ -1,70 +1,236 @@
-import pandas as pd
-import csv
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from .models import Shift, Employee, ShiftRequirement
-from .utils import generate_nurse_schedule
-from datetime import date, timedelta
+from .models import Shift, Employee, ScheduleJob, Department
+from .jobs import submit_schedule_job
+from .repair import repair_deleted_shift
+from .intervals import shift_conflict
+from .solvers import SOLVERS
+from .exports import filter_shifts, shift_rows, stream_csv, xlsx_response
+from .pdf import roster_pdf, week_start
+from .metrics import query_budget
+from . import changes, coverage, live
+from .changes import shift_json
+from datetime import date, time, timedelta
 from django.urls import reverse
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
+import asyncio
 import json
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+import base64
 
-@login_required
-def nurse_schedule(request):
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+SCHEDULE_PAGE_SIZE = 200
+MAX_SCHEDULE_PAGE_SIZE = 1000
+LIVE_KEEPALIVE = 15  # sekundi; proxyji zatvaraju tihe veze
 
-    shifts = Shift.objects.all().order_by("date", "start_time")
-    shift_requirements = ShiftRequirement.objects.all()
+def schedule_filters(request):
+    """Filteri rasporeda iz GET parametara; bez datuma se prikazuje tekući tjedan."""
+    try:
+        start_date = date.fromisoformat(request.GET["start_date"])
+        end_date = date.fromisoformat(request.GET["end_date"])
+    except (KeyError, ValueError):
+        start_date = date.today() - timedelta(days=date.today().weekday())
+        end_date = start_date + timedelta(days=6)
 
-    if start_date and end_date:
-        shifts = shifts.filter(date__range=[start_date, end_date])
-        shift_requirements = shift_requirements.filter(date__range=[start_date, end_date])
+    department_id = request.GET.get("department")
+    employee_id = request.GET.get("employee")
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "department_id": int(department_id) if department_id and department_id.isdigit() else None,
+        "employee_id": int(employee_id) if employee_id and employee_id.isdigit() else None,
+    }
 
-    employees = Employee.objects.all()
+def filtered_shifts(filters):
+    shifts = Shift.objects.filter(date__range=[filters["start_date"], filters["end_date"]])
+    if filters["department_id"]:
+        shifts = shifts.filter(department_id=filters["department_id"])
+    if filters["employee_id"]:
+        shifts = shifts.filter(employee_id=filters["employee_id"])
+    return shifts
 
-    # 📌 Ispravan izračun ukupnih dodijeljenih sati
-    total_assigned_hours = 0
-    employee_hours = {}
+def encode_cursor(shift):
+    value = f"{shift.date.isoformat()}|{shift.sort_time.isoformat()}|{shift.id}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
 
-    for shift in shifts:
-        if shift.employee:
-            # ✅ Ispravi grešku kod smjena koje prelaze ponoć
-            start_time = shift.start_time
-            end_time = shift.end_time
+def decode_cursor(cursor):
+    day, sort_time, shift_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return date.fromisoformat(day), time.fromisoformat(sort_time), int(shift_id)
 
-            if end_time <= start_time:  # Ako prelazi preko ponoći
-                shift_hours = (24 - start_time.hour) + end_time.hour
-            else:
-                shift_hours = end_time.hour - start_time.hour
-            
-            total_assigned_hours += shift_hours
+@query_budget(10)
+@login_required
+def nurse_schedule(request):
+    filters = schedule_filters(request)
 
-            full_name = f"{shift.employee.first_name} {shift.employee.last_name}"
-            employee_hours[full_name] = employee_hours.get(full_name, 0) + shift_hours
+    # Redovi se učitavaju u stranicama preko schedule_data, ovdje samo statistika za odabrani prozor
+    employees = Employee.objects.only("id", "first_name", "last_name").order_by("first_name", "last_name")
 
-    # 📌 Izračun potrebnih sati iz ShiftRequirement
-    total_required_hours = sum(req.required_hours for req in shift_requirements)
+    # 📌 Potrebni i dodijeljeni sati iz zbirne tablice (red po odjelu i danu, ne po smjeni)
+    totals = coverage.window_totals(filters["start_date"], filters["end_date"], filters["department_id"])
+    total_required_hours = totals["required_hours"]
+
+    # 📌 Sati po zaposleniku - zbirni tjedni redovi kad je prozor cijeli tjedan(i), inače iz smjena
+    employee_rows = None
+    if not filters["department_id"]:
+        employee_rows = coverage.employee_week_hours(filters["start_date"], filters["end_date"], filters["employee_id"])
+    if employee_rows is None:
+        employee_rows = filtered_shifts(filters).hours_by_employee()
+    employee_hours = {f"{row['first_name']} {row['last_name']}": row['hours'] for row in employee_rows}
+    if filters["employee_id"]:
+        total_assigned_hours = round(sum(row['hours'] for row in employee_rows), 2)
+    else:
+        total_assigned_hours = totals["assigned_hours"]
 
     # 📌 Postotak popunjenosti smjena
     percent_filled = (total_assigned_hours / total_required_hours) * 100 if total_required_hours else 0
 
     context = {
-        "shifts": shifts,
         "employees": employees,
+        "departments": Department.objects.order_by("name"),
         "total_assigned_hours": total_assigned_hours,
         "total_required_hours": total_required_hours,
         "percent_filled": percent_filled,
         "employee_hours": employee_hours,
-        "start_date": start_date,
-        "end_date": end_date,
+        "start_date": filters["start_date"].isoformat(),
+        "end_date": filters["end_date"].isoformat(),
+        "department_id": filters["department_id"],
+        "employee_id": filters["employee_id"],
+        "page_size": SCHEDULE_PAGE_SIZE,
     }
     
     return render(request, "nurse/schedule.html", context)
 
+@query_budget(6)
+@login_required
+def schedule_data(request):
+    """Smjene kao JSON, stranice po keyset kursoru (datum, početak, id) - cijena ne raste s poviješću."""
+    filters = schedule_filters(request)
+    try:
+        limit = min(int(request.GET.get("limit", SCHEDULE_PAGE_SIZE)), MAX_SCHEDULE_PAGE_SIZE)
+    except ValueError:
+        limit = SCHEDULE_PAGE_SIZE
+
+    shifts = (
+        filtered_shifts(filters)
+        .select_related("employee", "department", "role")
+        .annotate(sort_time=Coalesce("start_time", Value(time.min)))
+        .order_by("date", "sort_time", "id")
+    )
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            day, sort_time, shift_id = decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return JsonResponse({"status": "error", "message": "Invalid cursor!"}, status=400)
+        shifts = shifts.filter(
+            Q(date__gt=day)
+            | Q(date=day, sort_time__gt=sort_time)
+            | Q(date=day, sort_time=sort_time, id__gt=shift_id)
+        )
+
+    version = changes.current_version() if not cursor else None
+    page = list(shifts[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
 
+    return JsonResponse({
+        "results": [shift_json(shift) for shift in page],
+        "next_cursor": encode_cursor(page[-1]) if has_more else None,
+        # Token za schedule_changes, pročitan prije redova da se ne izgubi promjena između
+        "version": version,
+    })
 
+@query_budget(6)
+@login_required
+def schedule_changes(request):
+    """
+    Smjene promijenjene nakon `?since=<version>` u istom prozoru/filterima kao schedule_data:
+    {"version", "has_more", "results": [...], "deleted": [id]}. Bez `since` vraća samo trenutnu
+    verziju; istekli token (obrisan dnevnik) vraća 410 i klijent ponovno učitava raspored.
+    """
+    filters = schedule_filters(request)
+    since = request.GET.get("since")
+    if since is None:
+        return JsonResponse({"version": changes.current_version()})
+    if not since.isdigit():
+        return JsonResponse({"status": "error", "message": "Invalid since token!"}, status=400)
+    try:
+        limit = min(int(request.GET.get("limit", changes.DEFAULT_LIMIT)), changes.DEFAULT_LIMIT)
+    except ValueError:
+        limit = changes.DEFAULT_LIMIT
+
+    delta = changes.changes_since(int(since), limit=limit, **filters)
+    if delta is None:
+        return JsonResponse({"status": "error", "message": "Token expired, reload the schedule."}, status=410)
+
+    etag = f'"v{since}-{delta["version"]}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponse(status=304)
+    else:
+        response = JsonResponse({
+            "version": delta["version"],
+            "has_more": delta["has_more"],
+            "results": [shift_json(shift) for shift in delta["shifts"]],
+            "deleted": delta["deleted"],
+        })
+    response["ETag"] = etag
+    return response
+
+async def schedule_stream(request):
+    """
+    Server-Sent Events: promjene smjena za odjel/prozor iz GET parametara (kao schedule_data).
+    Poruke `shifts` imaju isti oblik kao schedule_changes; `reset` znači da klijent treba
+    ponovno učitati raspored. Nakon prekida preglednik šalje Last-Event-ID i dobiva propušteno.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"status": "error", "message": "Live updates require an ASGI server."}, status=501)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"status": "error", "message": "Authentication required."}, status=401)
+
+    filters = schedule_filters(request)
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    subscription = await live.broadcaster.subscribe(filters)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            if last_event_id.isdigit():
+                # Pretplata je već aktivna, pa se između ovog čitanja i prve poruke ništa ne gubi
+                delta = await sync_to_async(changes.changes_since)(int(last_event_id), **filters)
+                if delta is None:
+                    yield live.sse("reset", {})
+                    return
+                yield live.sse("shifts", {
+                    "version": delta["version"],
+                    "results": [shift_json(shift) for shift in delta["shifts"]],
+                    "deleted": delta["deleted"],
+                }, event_id=delta["version"])
+            else:
+                yield live.sse("hello", {"version": live.broadcaster.version}, event_id=live.broadcaster.version)
+            while not subscription.overflowed:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=LIVE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield live.sse("shifts", message, event_id=message["version"])
+            yield live.sse("reset", {})
+        finally:
+            live.broadcaster.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx ne smije spremati stream u buffer
+    return response
+
+@query_budget(12)
 @login_required
 def generate_schedule(request):
     start_date_str = request.GET.get("start_date")
@@ -80,63 +246,109 @@ def generate_schedule(request):
         start_date = date.today()
         end_date = start_date + timedelta(days=6)  # Ako nema unosa, generira se za sljedeću sedmicu
 
-    for single_date in (start_date + timedelta(n) for n in range((end_date - start_date).days + 1)):
-        generate_nurse_schedule(single_date)
+    if end_date < start_date:
+        return JsonResponse({"status": "error", "message": "End date is before start date!"}, status=400)
+
+    strategy = request.GET.get("strategy", "greedy")
+    if strategy not in SOLVERS:
+        return JsonResponse({"status": "error", "message": f"Unknown strategy '{strategy}'!"}, status=400)
+    seed = request.GET.get("seed")
+    if seed and not seed.lstrip("-").isdigit():
+        return JsonResponse({"status": "error", "message": "Seed must be an integer!"}, status=400)
+    workers = request.GET.get("workers")
+    if workers and not (workers.isdigit() and int(workers) > 0):
+        return JsonResponse({"status": "error", "message": "Workers must be a positive integer!"}, status=400)
+    department_ids = request.GET.getlist("department")
+    if not all(department_id.isdigit() for department_id in department_ids):
+        return JsonResponse({"status": "error", "message": "Invalid department!"}, status=400)
+    departments = list(Department.objects.filter(pk__in=department_ids))
+    if len(departments) != len(set(department_ids)):
+        return JsonResponse({"status": "error", "message": "Unknown department!"}, status=400)
 
-    return JsonResponse({"status": "success", "message": f"Schedule generated from {start_date} to {end_date}!"})
+    # Generiranje ide u pozadinu, klijent prati napredak preko schedule_job_status
+    job = submit_schedule_job(
+        start_date, end_date,
+        departments=departments,
+        strategy=strategy,
+        seed=int(seed) if seed else None,
+        parallel=request.GET.get("parallel") == "1",
+        workers=int(workers) if workers else None,
+        user=request.user,
+    )
 
+    return JsonResponse({
+        "status": "queued",
+        "message": f"Schedule generation from {start_date} to {end_date} queued!",
+        "job_id": job.id,
+        "status_url": reverse("schedule_job_status", args=[job.id]),
+    }, status=202)
+
+@query_budget(4)
 @login_required
-def export_schedule_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="nurse_schedule.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(["Employee", "Department", "Role", "Date", "Start Time", "End Time", "Total Hours"])
-
-    for shift in Shift.objects.all():
-        writer.writerow([
-            f"{shift.employee.first_name} {shift.employee.last_name}" if shift.employee else "⚠️ Worker Missing",
-            shift.department.name if shift.department else "N/A",
-            shift.role.name if shift.role else "⚠️ Role Missing",
-            shift.date,
-            shift.start_time,
-            shift.end_time,
-            shift.calculate_total_hours()
-        ])
+def schedule_job_status(request, job_id):
+    job = get_object_or_404(ScheduleJob, id=job_id)
+    return JsonResponse(job.as_dict())
 
-    return response
+@query_budget(5)
+@login_required
+def export_schedule_csv(request):
+    try:
+        shifts = filter_shifts(Shift.objects.order_by("date", "start_time", "id"), request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return stream_csv(shift_rows(shifts), "nurse_schedule.csv")
 
+@query_budget(5)
 @login_required
 def export_schedule_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="nurse_schedule.xlsx"'
-
-    df = pd.DataFrame([
-        [
-            f"{shift.employee.first_name} {shift.employee.last_name}" if shift.employee else "⚠️ Worker Missing",
-            shift.department.name if shift.department else "N/A",
-            shift.role.name if shift.role else "⚠️ Role Missing",
-            shift.date,
-            shift.start_time,
-            shift.end_time,
-            shift.calculate_total_hours()
-        ]
-        for shift in Shift.objects.all()
-    ], columns=["Employee", "Department", "Role", "Date", "Start Time", "End Time", "Total Hours"])
-
-    df.to_excel(response, index=False)
-    return response
+    try:
+        shifts = filter_shifts(Shift.objects.order_by("date", "start_time", "id"), request.GET)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return xlsx_response(shifts, "nurse_schedule.xlsx", per_department=request.GET.get("per_department") == "1")
+
+@query_budget(8)
+@login_required
+def export_schedule_pdf(request):
+    department_id = request.GET.get("department", "")
+    if not department_id.isdigit():
+        return JsonResponse({"status": "error", "message": "Invalid department!"}, status=400)
+    department = get_object_or_404(Department, pk=int(department_id))
+    try:
+        day = date.fromisoformat(request.GET["start_date"]) if request.GET.get("start_date") else date.today()
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid start_date."}, status=400)
+    path = roster_pdf(department, day)
+    return FileResponse(
+        open(path, "rb"), as_attachment=True, content_type="application/pdf",
+        filename=f"roster_{department.name}_{week_start(day)}.pdf",
+    )
 
 @csrf_exempt
 @login_required
 def delete_shift(request, shift_id):
     if request.method == "POST":
+        # Tijelo se provjerava prije brisanja - neispravan zahtjev ne smije obrisati smjenu
+        try:
+            data = json.loads(request.body) if request.body else {}
+        except json.JSONDecodeError:
+            return JsonResponse({"status": "error", "message": "Invalid JSON body!"}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"status": "error", "message": "Invalid JSON body!"}, status=400)
+
         shift = get_object_or_404(Shift, id=shift_id)
-        shift.delete()
+        # {"repair": true} odmah traži zamjenu samo za ovu smjenu, ostatak rasporeda ostaje isti;
+        # brisanje i popravak su jedna transakcija
+        with transaction.atomic():
+            shift.delete()
+            diff = repair_deleted_shift(shift) if data.get("repair") else None
+        if diff is not None:
+            return JsonResponse({"status": "success", "message": "Shift deleted and repaired!", "changes": diff})
         return JsonResponse({"status": "success", "message": "Shift deleted successfully!"})
     return JsonResponse({"status": "error", "message": "Invalid request"}, status=400)
 
 @csrf_exempt
+@query_budget(17)  # uključuje osvježavanje zbirne statistike (stari i novi dan/tjedan) i dnevnik promjena
 @login_required
 def edit_shift(request, shift_id):
     if request.method == "POST":
@@ -145,9 +357,14 @@ def edit_shift(request, shift_id):
 
         try:
             shift.employee = Employee.objects.get(id=data["employee"]) if data["employee"] else None
-            shift.date = data["date"]
-            shift.start_time = data["start_time"]
-            shift.end_time = data["end_time"]
+            shift.date = date.fromisoformat(data["date"])
+            shift.start_time = time.fromisoformat(data["start_time"]) if data["start_time"] else None
+            shift.end_time = time.fromisoformat(data["end_time"]) if data["end_time"] else None
+
+            conflict = shift_conflict(shift.employee, shift.date, shift.start_time, shift.end_time, exclude_pk=shift.pk)
+            if conflict:
+                return JsonResponse({"status": "error", "message": conflict}, status=400)
+
             shift.save()
 
             return JsonResponse({"status": "success", "message": "Shift updated successfully!"})